@@ -106,22 +106,91 @@ CACHES = {
     }
 }
 
+# Buffer like/unlike clicks in Redis and write them to the database in batches
+# (`manage.py flush_likes`). Useful when a viral post turns every click into a
+# synchronous M2M write. Off by default: likes are written directly.
+LIKE_WRITE_BEHIND = env.bool("LIKE_WRITE_BEHIND", default=False)
+
+# Hot-post ranking (forum/utils.py): every like/comment/view adds its weight to
+# a Redis ZSET with exponential time decay; a weight counts half after
+# HOT_POSTS_HALF_LIFE seconds. The set is trimmed to HOT_POSTS_MAX members.
+HOT_POSTS_HALF_LIFE = env.int("HOT_POSTS_HALF_LIFE", default=12 * 3600)
+HOT_POSTS_MAX = env.int("HOT_POSTS_MAX", default=1000)
+HOT_POST_WEIGHTS = {
+    "create": 1.0,
+    "like": 1.0,
+    "unlike": -1.0,
+    "comment": 2.0,
+    "view": 0.1,
+}
+
+# Versioned response cache for GET endpoints (seconds, 0 disables)
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=300)
+
+# Delta feed (/api/posts/changes/): change log entries older than this are
+# removed by `manage.py prune_post_changes`; older tokens get 410 Gone.
+POST_CHANGES_RETENTION_DAYS = env.int("POST_CHANGES_RETENTION_DAYS", default=7)
+# Entries younger than this are held back so a change id that commits late is
+# not skipped; keep it well above the time a log insert takes to commit.
+POST_CHANGES_SETTLE_SECONDS = env.int("POST_CHANGES_SETTLE_SECONDS", default=5)
+
+# Live push feed (/api/live/, forum/live.py): SSE heartbeat interval and the
+# per-connection event backlog kept for slow clients before events are dropped.
+LIVE_HEARTBEAT_SECONDS = env.int("LIVE_HEARTBEAT_SECONDS", default=15)
+LIVE_QUEUE_SIZE = env.int("LIVE_QUEUE_SIZE", default=100)
+
+# Admin dashboard rollups (forum/stats.py): older entries are refreshed by a job
+ADMIN_STATS_MAX_AGE = env.int("ADMIN_STATS_MAX_AGE", default=300)
+
+# Background jobs (forum/jobs.py, `manage.py run_worker`). JOBS_EAGER runs jobs
+# inline instead of queueing them (tests, single-process development).
+JOBS_EAGER = env.bool("JOBS_EAGER", default=False)
+JOBS_RETRY_BACKOFF = env.int("JOBS_RETRY_BACKOFF", default=10)
+JOBS_MAX_BACKOFF = env.int("JOBS_MAX_BACKOFF", default=3600)
+# A job RUNNING for longer than this is assumed lost (worker killed) and re-run
+JOBS_TIMEOUT = env.int("JOBS_TIMEOUT", default=600)
+
 # ------------------------
 # REST Framework
 # ------------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication with the user resolved from the cache
+        "forum.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     ),
+    # Token-bucket limits (forum/throttling.py). Views opt in per action with
+    # `throttle_scopes`; counted per user, or per IP for anonymous requests.
+    "DEFAULT_THROTTLE_CLASSES": (
+        "forum.throttling.BucketRateThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "post_create": env("THROTTLE_POST_CREATE", default="10/min"),
+        "comment_create": env("THROTTLE_COMMENT_CREATE", default="30/min"),
+        "like": env("THROTTLE_LIKE", default="120/min"),
+        "report_create": env("THROTTLE_REPORT_CREATE", default="20/hour"),
+        "login": env("THROTTLE_LOGIN", default="10/min"),
+        "password_reset": env("THROTTLE_PASSWORD_RESET", default="5/hour"),
+    },
 }
 
+# Number of newest comments embedded under each post in feed/list responses.
+# The full comment tree is only returned by the post detail endpoint.
+FEED_COMMENT_PREVIEWS = env.int("FEED_COMMENT_PREVIEWS", default=3)
+
+# Longest time (seconds) a process serves its in-memory categories/tags snapshot
+# after another process changed them (see forum/refdata.py)
+REFDATA_CHECK_INTERVAL = env.float("REFDATA_CHECK_INTERVAL", default=2.0)
+
 # ------------------------
 # Simple JWT
 # ------------------------
+# Seconds the lean projection of a JWT-authenticated user is cached (0 disables)
+AUTH_USER_CACHE_TIMEOUT = env.int("AUTH_USER_CACHE_TIMEOUT", default=300)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -133,6 +202,10 @@ SIMPLE_JWT = {
 STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Scheme and host for media URLs in payloads built without a request (live
+# events, cached admin stats), e.g. "https://forum.example.com". Empty keeps
+# them root-relative.
+MEDIA_BASE_URL = env("MEDIA_BASE_URL", default="")
 
 # ------------------------
 # Auth
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ForumConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'forum'
+
+    def ready(self):
+        # Register signal handlers (denormalized counters)
+        from . import signals  # noqa: F401
+        # Register background jobs so the worker can look them up by name
+        from . import tasks  # noqa: F401
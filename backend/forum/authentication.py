@@ -0,0 +1,117 @@
+"""
+JWT authentication that resolves the user from the cache.
+
+simplejwt loads the full `forum.User` row (bio, social, avatar metadata...) on
+every authenticated request just to know who is calling. `CachedJWTAuthentication`
+keeps a lean projection of the row (`AUTH_USER_FIELDS`) in the default cache for
+AUTH_USER_CACHE_TIMEOUT seconds and builds `request.user` from it without a query.
+
+Each user has an auth version counter; a cached entry is only used when it was
+stored under the current version. Saving or deleting a user (profile or role
+edits, password resets; see forum/signals.py) bumps the version after the
+transaction commits, so stale entries are never served again.
+
+The cached user is a deferred model instance: fields outside the projection are
+loaded on access, one query each. Code that needs the whole row (the "me"
+endpoints) should use `full_user`.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Everything permission checks and views read from request.user
+AUTH_USER_FIELDS = ("id", "username", "email", "role", "is_active", "is_staff", "is_superuser")
+
+USER_KEY = "auth:user:{}"
+VERSION_KEY = "auth:ver:{}"
+
+
+def get_timeout():
+    return getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 300)
+
+
+def invalidate_user(user_id):
+    """Stop serving the cached projection of `user_id` (immediately)."""
+    key = VERSION_KEY.format(user_id)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1000, None)
+    except Exception:
+        # Cache down: nothing is being served from it either
+        pass
+
+
+def invalidate_user_on_commit(user_id):
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def _projection(model):
+    # Model.from_db expects the values in concrete field order
+    return [f.attname for f in model._meta.concrete_fields if f.attname in AUTH_USER_FIELDS]
+
+
+def full_user(user):
+    """`user` with every field loaded (one query if it came from the cache)."""
+    if getattr(user, "is_authenticated", False) and user.get_deferred_fields():
+        return type(user).objects.get(pk=user.pk)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if get_timeout() <= 0 or api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = self.get_cached_user(user_id)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def get_cached_user(self, user_id):
+        User = get_user_model()
+        fields = _projection(User)
+        user_key = USER_KEY.format(user_id)
+        version_key = VERSION_KEY.format(user_id)
+        try:
+            found = cache.get_many([user_key, version_key])
+            version = found.get(version_key)
+            if version is None:
+                version = time.time_ns() // 1000
+                if not cache.add(version_key, version, None):
+                    version = cache.get(version_key, version)
+        except Exception:
+            found, version = {}, None
+
+        entry = found.get(user_key)
+        if entry is not None and version is not None and entry[0] == version:
+            return User.from_db("default", fields, entry[1])
+
+        values = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list(*fields).first()
+        )
+        if values is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if version is not None:
+            try:
+                # A save racing with this read bumps the version afterwards,
+                # so an entry stored from a stale row is never used.
+                cache.set(user_key, (version, values), get_timeout())
+            except Exception:
+                pass
+        return User.from_db("default", fields, values)
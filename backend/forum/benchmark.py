@@ -0,0 +1,37 @@
+"""
+Query counting for `manage.py benchmark_http`.
+
+`QueryCountMiddleware` counts the SQL statements a request runs (middleware,
+authentication, view, rendering) and returns the number in the X-Query-Count
+response header. The benchmark installs it for its own run only; it can also
+be added to MIDDLEWARE of a staging server to read counts from the outside.
+"""
+from django.db import connections
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryCountMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        wrapped = []
+        try:
+            for connection in connections.all(initialized_only=False):
+                connection.execute_wrappers.append(counter)
+                wrapped.append(connection)
+            response = self.get_response(request)
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(counter)
+        response[QUERY_COUNT_HEADER] = str(count)
+        return response
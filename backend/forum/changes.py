@@ -0,0 +1,138 @@
+"""
+Post change log behind the delta feed (`/api/posts/changes/?since=<token>`).
+
+Signals (see forum/signals.py) record which posts were created/updated or
+deleted; entries are deduplicated per transaction and written after it commits,
+so a client that sees an entry always reads the committed post. Comments, tags
+and likes count as updates of their post because the feed payload embeds them.
+
+Clients keep an opaque token (the id of the last entry they have seen). A token
+older than the oldest retained entry cannot be resumed and is answered with
+410 Gone: the client must reload the feed and start over from a fresh token.
+
+Ids are handed out when a row is inserted, not when it commits, so on PostgreSQL
+a lower id can become visible after a higher one. A token must never move past a
+row that is still in flight, so reads stop at the first entry younger than
+POST_CHANGES_SETTLE_SECONDS; those entries are returned on a later poll.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .utils import CommitBatch
+
+
+class ChangesExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Change token has expired; reload the feed and use the new token."
+    default_code = "changes_expired"
+
+
+# ------------------------
+# Write path
+# ------------------------
+def _flush(changes):
+    from .models import PostChange
+    PostChange.objects.bulk_create(
+        [PostChange(post_id=post_id, kind=kind) for post_id, kind in changes.items()]
+    )
+
+
+_pending = CommitBatch(_flush, factory=dict)
+
+
+def record(post_ids, kind="upsert"):
+    """Log `post_ids` as changed once the surrounding transaction commits.
+
+    Within one transaction the last kind wins, so a post that is edited and then
+    deleted leaves a single tombstone.
+    """
+    _pending.add((post_id, kind) for post_id in post_ids if post_id is not None)
+
+
+# ------------------------
+# Tokens
+# ------------------------
+def encode_token(change_id):
+    raw = json.dumps({"i": change_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_token(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))["i"])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValidationError({"since": "Invalid change token"})
+
+
+# ------------------------
+# Read path
+# ------------------------
+def settled_before():
+    """Entries created after this may still have lower ids in flight."""
+    return timezone.now() - timedelta(seconds=getattr(settings, "POST_CHANGES_SETTLE_SECONDS", 5))
+
+
+def head():
+    """Token for "now": the newest settled entry in the log."""
+    from .models import PostChange
+    horizon = settled_before()
+    last = PostChange.objects.filter(created_at__lte=horizon).order_by("-id").values_list("id", flat=True).first()
+    if last is None:
+        # Nothing settled yet: start just before the oldest entry
+        first = PostChange.objects.order_by("id").values_list("id", flat=True).first()
+        last = first - 1 if first else 0
+    return encode_token(last)
+
+
+def read(since, limit):
+    """Changes after entry `since`.
+
+    Returns (updated post ids, deleted post ids, last entry id, has_more); each
+    post appears once with its latest state.
+    """
+    from .models import PostChange
+    first = PostChange.objects.order_by("id").values_list("id", flat=True).first()
+    if first is not None and since < first - 1:
+        # Entries after `since` may have been pruned
+        raise ChangesExpired()
+
+    horizon = settled_before()
+    rows = list(
+        PostChange.objects.filter(id__gt=since).order_by("id")
+        .values_list("id", "post_id", "kind", "created_at")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for index, row in enumerate(rows):
+        if row[3] > horizon:
+            # Stop before unsettled entries; the client polls again later
+            rows, has_more = rows[:index], False
+            break
+    latest = {}
+    for _, post_id, kind, _ in rows:
+        latest.pop(post_id, None)
+        latest[post_id] = kind
+    updated = [pk for pk, kind in latest.items() if kind == PostChange.UPSERT]
+    deleted = [pk for pk, kind in latest.items() if kind == PostChange.DELETE]
+    last_id = rows[-1][0] if rows else since
+    return updated, deleted, last_id, has_more
+
+
+def prune(before):
+    """Delete entries created before `before`, always keeping the newest one.
+
+    The newest entry is kept so `read` can still tell expired tokens apart.
+    """
+    from .models import PostChange
+    newest = PostChange.objects.order_by("-id").values_list("id", flat=True).first()
+    if newest is None:
+        return 0
+    deleted, _ = PostChange.objects.filter(created_at__lt=before, id__lt=newest).delete()
+    return deleted
@@ -0,0 +1,208 @@
+"""
+Upload-time image variants.
+
+When a post image, comment image or avatar is saved, the original is re-encoded
+without metadata (EXIF, GPS, ICC comments; orientation is applied first) and a
+fixed set of downsized variants is written next to it, each as WebP plus a
+JPEG/PNG fallback::
+
+    posts/photo.jpg
+    posts/variants/photo-card.webp   posts/variants/photo-card.jpg
+    posts/variants/photo-full.webp   posts/variants/photo-full.jpg
+
+What was generated is recorded on the row (`image_meta` / `avatar_meta`) together
+with the original's dimensions, so serializers can build srcset URLs without
+touching storage. Uploads are processed by a background job after the save
+commits; `manage.py build_image_variants` backfills existing media.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# name -> (max width, max height, crop to fill)
+VARIANTS = {
+    "avatar": {"64": (64, 64, True), "128": (128, 128, True)},
+    "post": {"card": (640, 640, False), "full": (1600, 1600, False)},
+    "comment": {"card": (480, 480, False), "full": (1600, 1600, False)},
+}
+WEBP_QUALITY = 80
+FALLBACK_QUALITY = 85
+ORIGINAL_QUALITY = 92
+
+
+def _open(field_file):
+    from PIL import Image, ImageOps
+    field_file.open("rb")
+    try:
+        image = Image.open(field_file)
+        image.load()
+    finally:
+        field_file.close()
+    animated = getattr(image, "n_frames", 1) > 1
+    source_format = image.format
+    image = ImageOps.exif_transpose(image)
+    return image, source_format, animated
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _encode(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image = image.convert("RGB")
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "PNG":
+        image.save(buffer, "PNG", optimize=True)
+    elif fmt == "WEBP":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, fmt)
+    # Nothing from image.info (exif, icc_profile, comments) is passed on
+    return buffer.getvalue()
+
+
+def _resize(image, width, height, crop):
+    from PIL import Image, ImageOps
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return resized
+
+
+def _replace(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def delete_variants(meta):
+    for variant in (meta or {}).get("variants", {}).values():
+        for name in (variant.get("webp"), variant.get("fallback")):
+            if name:
+                try:
+                    default_storage.delete(name)
+                except Exception:
+                    pass
+
+
+def build_variants(field_file, kind, strip_original=True):
+    """Write the variants of `field_file` and return the metadata to store.
+
+    {"source": <name>, "width": w, "height": h,
+     "variants": {<name>: {"webp": path, "fallback": path, "width": w, "height": h}}}
+    """
+    image, source_format, animated = _open(field_file)
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    alpha = _has_alpha(image)
+    fallback_format, fallback_ext = ("PNG", "png") if alpha else ("JPEG", "jpg")
+
+    name = field_file.name
+    if strip_original and not animated and source_format in ("JPEG", "PNG", "WEBP"):
+        # Re-encode in place so the original no longer carries EXIF/GPS data
+        quality = ORIGINAL_QUALITY if source_format != "PNG" else None
+        name = _replace(name, _encode(image, source_format, quality))
+        field_file.name = name
+
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    variants = {}
+    for variant, (width, height, crop) in VARIANTS[kind].items():
+        resized = _resize(image, width, height, crop)
+        base = os.path.join(directory, "variants", f"{stem}-{variant}")
+        variants[variant] = {
+            "webp": _replace(f"{base}.webp", _encode(resized, "WEBP", WEBP_QUALITY)),
+            "fallback": _replace(f"{base}.{fallback_ext}", _encode(resized, fallback_format, FALLBACK_QUALITY)),
+            "width": resized.width,
+            "height": resized.height,
+        }
+    return {"source": name, "width": image.width, "height": image.height, "variants": variants}
+
+
+def _current_file(instance, field_name):
+    field_file = getattr(instance, field_name)
+    if field_file and field_file.name == instance._meta.get_field(field_name).get_default():
+        # Shared placeholder (the default avatar): served as is, never rewritten
+        return None
+    return field_file or None
+
+
+def refresh_variants(instance, field_name, meta_name, kind, force=False):
+    """Bring `instance.<meta_name>` in line with `instance.<field_name>`.
+
+    Returns True when the metadata changed. Failures are logged and recorded
+    without variants (serializers then fall back to the original URL), so they
+    are not retried on every save; `build_image_variants --force` retries them.
+    """
+    field_file = _current_file(instance, field_name)
+    meta = getattr(instance, meta_name) or {}
+    if not field_file:
+        if meta:
+            delete_variants(meta)
+            setattr(instance, meta_name, {})
+            return True
+        return False
+    if not force and field_file._committed and meta.get("source") == field_file.name:
+        return False
+    if not field_file._committed:
+        # Store the upload now (Model.save would do it in pre_save) so it can be read back
+        field_file.save(field_file.name, field_file.file, save=False)
+    try:
+        new_meta = build_variants(field_file, kind)
+    except Exception:
+        logger.exception("Failed to build %s variants for %s", kind, field_file.name)
+        new_meta = {"source": field_file.name}
+    if meta.get("source") and meta.get("source") != new_meta.get("source"):
+        delete_variants(meta)
+    setattr(instance, meta_name, new_meta)
+    return True
+
+
+class ImageVariantsMixin:
+    """Model mixin: regenerate variants when an image field changed.
+
+    `image_variant_fields` maps an image field to (metadata JSONField, kind).
+    Decoding and encoding happen in a background job (forum.tasks) queued once
+    the save commits; until it has run the metadata is empty and serializers
+    serve the original.
+    """
+    image_variant_fields = {}
+
+    def save(self, *args, **kwargs):
+        changed = []
+        queued = []
+        update_fields = kwargs.get("update_fields")
+        for field_name, (meta_name, kind) in self.image_variant_fields.items():
+            if update_fields is not None and field_name not in update_fields:
+                continue
+            field_file = _current_file(self, field_name)
+            meta = getattr(self, meta_name) or {}
+            if not field_file:
+                # Removed image: only files to delete, done inline
+                if refresh_variants(self, field_name, meta_name, kind):
+                    changed.append(meta_name)
+                continue
+            if field_file._committed and meta.get("source") == field_file.name:
+                continue
+            if meta:
+                delete_variants(meta)
+                setattr(self, meta_name, {})
+                changed.append(meta_name)
+            queued.append((field_name, meta_name, kind))
+        if update_fields is not None and changed:
+            kwargs["update_fields"] = set(update_fields) | set(changed)
+        super().save(*args, **kwargs)
+
+        if queued:
+            from .jobs import delay_on_commit
+            from .tasks import build_image_variants
+            for field_name, meta_name, kind in queued:
+                delay_on_commit(build_image_variants, self._meta.label, self.pk, field_name, meta_name, kind)
@@ -0,0 +1,217 @@
+"""
+Background jobs backed by the database.
+
+Register a function with ``@job`` and call ``func.delay(*args, **kwargs)`` from a
+request: a ``Job`` row is inserted in the request's transaction (so the job exists
+exactly when the data it refers to was committed) and the request returns.
+``manage.py run_worker`` claims due jobs, runs them on a thread pool and retries
+failures with exponential backoff::
+
+    @job(max_attempts=5)
+    def send_email(subject, message, recipients):
+        ...
+
+    send_email.delay("Hello", "...", ["a@example.com"])
+
+Arguments must be JSON serializable (pass ids, not model instances). With
+``settings.JOBS_EAGER`` the function runs inline instead, which is what tests and
+single-process development setups want.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def _settings():
+    return {
+        "eager": getattr(settings, "JOBS_EAGER", False),
+        "backoff": getattr(settings, "JOBS_RETRY_BACKOFF", 10),
+        "max_backoff": getattr(settings, "JOBS_MAX_BACKOFF", 3600),
+        "timeout": getattr(settings, "JOBS_TIMEOUT", 600),
+    }
+
+
+# ------------------------
+# Registering and enqueueing
+# ------------------------
+def job(name=None, max_attempts=3):
+    """Register a function as a job; adds `.delay()` to enqueue it."""
+    def decorator(func):
+        job_name = name or f"{func.__module__}.{func.__name__}"
+        registry[job_name] = func
+        func.job_name = job_name
+        func.max_attempts = max_attempts
+        func.delay = lambda *args, **kwargs: enqueue(job_name, *args, **kwargs)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, **kwargs):
+    """Queue `name` for the worker (or run it now in eager mode); returns the Job or None."""
+    from .models import Job
+    func = registry[name]
+    if _settings()["eager"]:
+        func(*args, **kwargs)
+        return None
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now(),
+    )
+
+
+def retry_delay(attempts):
+    """Seconds before attempt `attempts + 1`: exponential with jitter, capped."""
+    config = _settings()
+    delay = min(config["backoff"] * (2 ** (attempts - 1)), config["max_backoff"])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def delay_on_commit(func, *args, **kwargs):
+    """`func.delay(...)` once the surrounding transaction commits.
+
+    For jobs that need rows or files created by the current request to exist
+    (in eager mode the job would otherwise run before the INSERT).
+    """
+    transaction.on_commit(lambda: func.delay(*args, **kwargs))
+
+
+# ------------------------
+# Worker
+# ------------------------
+def _claimable(now, stale):
+    from .models import Job
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, started_at__lt=stale)
+
+
+class Worker:
+    """Claims due jobs and runs them on `concurrency` threads."""
+
+    def __init__(self, concurrency=2, poll_interval=1.0):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def claim(self, limit):
+        """Atomically mark up to `limit` due jobs as ours; returns their ids.
+
+        A conditional UPDATE per candidate works on every database and never
+        hands a job to two workers. Jobs left RUNNING by a dead worker are
+        claimed again once JOBS_TIMEOUT has passed.
+        """
+        from .models import Job
+        now = timezone.now()
+        stale = now - timedelta(seconds=_settings()["timeout"])
+        candidates = list(
+            Job.objects.filter(_claimable(now, stale)).order_by("run_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        claimed = []
+        for job_id in candidates:
+            updated = Job.objects.filter(_claimable(now, stale), id=job_id).update(
+                status=Job.RUNNING, locked_by=self.name, started_at=now,
+            )
+            if updated:
+                claimed.append(job_id)
+        return claimed
+
+    def run_job(self, job_id):
+        from .models import Job
+        try:
+            job_row = Job.objects.get(pk=job_id)
+            func = registry.get(job_row.name)
+            attempts = job_row.attempts + 1
+            started = time.monotonic()
+            try:
+                if func is None:
+                    raise LookupError(f"Unknown job {job_row.name!r}")
+                func(*job_row.args, **job_row.kwargs)
+            except Exception:
+                self.record_failure(job_row, func, attempts, started, traceback.format_exc())
+                return
+            duration = int((time.monotonic() - started) * 1000)
+            Job.objects.filter(pk=job_id).update(
+                status=Job.DONE, attempts=attempts, duration_ms=duration,
+                finished_at=timezone.now(), locked_by="", last_error="",
+            )
+            logger.info("Job %s #%s done in %sms", job_row.name, job_id, duration)
+            with self.lock:
+                self.processed += 1
+        except Exception:
+            logger.exception("Worker error while running job #%s", job_id)
+        finally:
+            close_old_connections()
+            with self.lock:
+                self.active -= 1
+            self.wakeup.set()
+
+    def record_failure(self, job_row, func, attempts, started, error):
+        from .models import Job
+        duration = int((time.monotonic() - started) * 1000)
+        fields = {"attempts": attempts, "duration_ms": duration, "last_error": error, "locked_by": ""}
+        if func is not None and attempts < job_row.max_attempts:
+            delay = retry_delay(attempts)
+            Job.objects.filter(pk=job_row.pk).update(
+                status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay), **fields
+            )
+            logger.warning("Job %s #%s failed (attempt %s), retrying in %.0fs",
+                           job_row.name, job_row.pk, attempts, delay)
+        else:
+            Job.objects.filter(pk=job_row.pk).update(status=Job.FAILED, finished_at=timezone.now(), **fields)
+            logger.error("Job %s #%s failed permanently after %s attempts", job_row.name, job_row.pk, attempts)
+        with self.lock:
+            self.failed += 1
+
+    def run(self, burst=False):
+        """Process jobs until stop() or, with `burst`, until no job is due.
+
+        Running jobs are finished before returning.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job") as pool:
+            while not self.stopping.is_set():
+                self.wakeup.clear()
+                free = self.concurrency - self.active
+                try:
+                    job_ids = self.claim(free) if free else []
+                except Exception:
+                    logger.exception("Failed to claim jobs")
+                    job_ids = []
+                finally:
+                    close_old_connections()
+                for job_id in job_ids:
+                    with self.lock:
+                        self.active += 1
+                    pool.submit(self.run_job, job_id)
+                if job_ids:
+                    continue
+                if burst and free and not self.active:
+                    break
+                # Woken early when a job finishes and frees a thread
+                self.wakeup.wait(self.poll_interval)
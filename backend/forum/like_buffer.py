@@ -0,0 +1,262 @@
+"""
+Redis write-behind buffer for likes.
+
+When ``settings.LIKE_WRITE_BEHIND`` is on, like/unlike clicks are recorded in
+Redis instead of writing ``forum_post_likes`` / ``forum_comment_likes``
+synchronously. ``manage.py flush_likes`` applies the buffered intents to the
+through-tables in batched statements and recomputes ``like_count``.
+
+Layout (one hash per liked object plus a set of objects with pending intents)::
+
+    likebuf:<kind>:<id>   user_id -> "<state>:<base>"
+    likebuf:dirty         {"<kind>:<id>", ...}
+
+``state`` is the user's latest intent (1 liked, 0 not liked) and ``base`` is what
+the database held when the entry was first buffered. Reads stay consistent by
+overlaying the buffer on the database: the viewer's flag is ``state`` and the
+count is ``like_count + sum(state - base)``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+DIRTY_KEY = "likebuf:dirty"
+
+# Record an intent. Returns 1 when the effective state changed, 0 otherwise.
+# KEYS: object hash, dirty set. ARGV: user id, desired state, db state, dirty member
+RECORD_SCRIPT = """
+local cur = redis.call('HGET', KEYS[1], ARGV[1])
+local state = ARGV[3]
+local base = ARGV[3]
+if cur then
+  state = string.sub(cur, 1, 1)
+  base = string.sub(cur, 3, 3)
+end
+if state == ARGV[2] then
+  return 0
+end
+-- Keep the entry even when it returns to `base`: a flush may be applying the
+-- previous intent right now, and SETTLE_SCRIPT needs this one to undo it.
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. base)
+redis.call('SADD', KEYS[2], ARGV[4])
+return 1
+"""
+
+# Drop entries that were flushed and rebase the ones changed meanwhile.
+# KEYS: object hash, dirty set. ARGV: dirty member, then user id / flushed value pairs
+SETTLE_SCRIPT = """
+for i = 2, #ARGV, 2 do
+  local cur = redis.call('HGET', KEYS[1], ARGV[i])
+  if cur then
+    local flushed = string.sub(ARGV[i + 1], 1, 1)
+    local state = string.sub(cur, 1, 1)
+    if cur == ARGV[i + 1] or state == flushed then
+      redis.call('HDEL', KEYS[1], ARGV[i])
+    else
+      redis.call('HSET', KEYS[1], ARGV[i], state .. ':' .. flushed)
+    end
+  end
+end
+if redis.call('HLEN', KEYS[1]) > 0 then
+  redis.call('SADD', KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+
+def is_enabled():
+    return getattr(settings, "LIKE_WRITE_BEHIND", False)
+
+
+def get_client():
+    """Raw Redis client behind the default cache (patched with fakeredis in tests)."""
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def _kind(obj):
+    return obj._meta.model_name
+
+
+def _key(kind, obj_id):
+    return f"likebuf:{kind}:{obj_id}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _parse(entries):
+    """{user_id: (state, base)} from a raw HGETALL reply."""
+    parsed = {}
+    for user_id, value in entries.items():
+        value = _decode(value)
+        parsed[int(_decode(user_id))] = (int(value[0]), int(value[2]))
+    return parsed
+
+
+# ------------------------
+# Write path
+# ------------------------
+def record(obj, user, liked):
+    """Buffer a like (liked=True) or unlike intent; True when the state changed."""
+    kind = _kind(obj)
+    key = _key(kind, obj.pk)
+    client = get_client()
+    current = client.hget(key, user.pk)
+    if current is not None:
+        db_state = int(_decode(current)[2])
+    else:
+        db_state = int(obj.likes.filter(pk=user.pk).exists())
+    changed = client.eval(
+        RECORD_SCRIPT, 2, key, DIRTY_KEY,
+        user.pk, int(bool(liked)), db_state, f"{kind}:{obj.pk}",
+    )
+    return bool(changed)
+
+
+def is_liked(obj, user):
+    """The user's effective like state (buffer first, then database)."""
+    current = get_client().hget(_key(_kind(obj), obj.pk), user.pk)
+    if current is not None:
+        return _decode(current)[0] == "1"
+    return obj.likes.filter(pk=user.pk).exists()
+
+
+def effective_count(obj):
+    """Persisted like_count plus the net effect of buffered intents."""
+    entries = _parse(get_client().hgetall(_key(_kind(obj), obj.pk)))
+    db_count = type(obj).objects.values_list("like_count", flat=True).get(pk=obj.pk)
+    return db_count + sum(state - base for state, base in entries.values())
+
+
+# ------------------------
+# Read path
+# ------------------------
+def apply_to(objs, user=None):
+    """Overlay buffered likes onto model instances about to be serialized.
+
+    Adjusts `like_count` and, for authenticated viewers with a buffered intent,
+    sets the `viewer_liked` attribute read by the serializers. One pipelined
+    round trip per call regardless of the number of objects.
+    """
+    objs = [o for o in objs if o is not None]
+    if not is_enabled() or not objs:
+        return objs
+    pipe = get_client().pipeline(transaction=False)
+    for obj in objs:
+        pipe.hgetall(_key(_kind(obj), obj.pk))
+    user_id = user.pk if user is not None and getattr(user, "is_authenticated", False) else None
+    for obj, raw in zip(objs, pipe.execute()):
+        if not raw:
+            continue
+        entries = _parse(raw)
+        obj.like_count = obj.like_count + sum(state - base for state, base in entries.values())
+        if user_id in entries:
+            obj.viewer_liked = bool(entries[user_id][0])
+    return objs
+
+
+def viewer_overlay(kind, ids, user, liked):
+    """`liked` (a set of ids the user likes in the database) with buffered intents applied."""
+    pipe = get_client().pipeline(transaction=False)
+    for obj_id in ids:
+        pipe.hget(_key(kind, obj_id), user.pk)
+    liked = set(liked)
+    for obj_id, current in zip(ids, pipe.execute()):
+        if current is None:
+            continue
+        if _decode(current)[0] == "1":
+            liked.add(obj_id)
+        else:
+            liked.discard(obj_id)
+    return liked
+
+
+# ------------------------
+# Flush
+# ------------------------
+def _models():
+    from .models import Comment, Post
+    return {"post": Post, "comment": Comment}
+
+
+def _apply(client, members):
+    """Write the buffered intents of `members` to the database; returns the snapshots applied."""
+    from django.contrib.auth import get_user_model
+    from .models import count_subquery, user_counters
+
+    pipe = client.pipeline(transaction=False)
+    targets = []
+    for member in members:
+        kind, obj_id = member.split(":", 1)
+        targets.append((kind, int(obj_id)))
+        pipe.hgetall(_key(kind, obj_id))
+    snapshots = [(kind, obj_id, _parse(raw)) for (kind, obj_id), raw in zip(targets, pipe.execute())]
+
+    models = _models()
+    user_ids = {uid for _, _, entries in snapshots for uid in entries}
+    live_users = set(get_user_model().objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+
+    authors = set()
+    with transaction.atomic():
+        for kind, model in models.items():
+            wanted = [(obj_id, entries) for k, obj_id, entries in snapshots if k == kind]
+            if not wanted:
+                continue
+            through = model.likes.through
+            fk = f"{kind}_id"
+            live_objs = set(model.objects.filter(pk__in=[o for o, _ in wanted]).values_list("pk", flat=True))
+            rows = []
+            removals = Q()
+            for obj_id, entries in wanted:
+                if obj_id not in live_objs:
+                    continue
+                liked = [uid for uid, (state, _) in entries.items() if state and uid in live_users]
+                unliked = [uid for uid, (state, _) in entries.items() if not state]
+                rows.extend(through(**{fk: obj_id, "user_id": uid}) for uid in liked)
+                if unliked:
+                    removals |= Q(**{fk: obj_id, "user_id__in": unliked})
+            if rows:
+                through.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+            if removals:
+                through.objects.filter(removals).delete()
+            model.objects.filter(pk__in=live_objs).update(
+                like_count=count_subquery(through.objects.all(), fk)
+            )
+            authors.update(
+                model.objects.filter(pk__in=live_objs, user__isnull=False).values_list("user_id", flat=True)
+            )
+        if authors:
+            get_user_model().objects.filter(pk__in=authors).update(likes_received=user_counters()["likes_received"])
+    return snapshots
+
+
+def flush(batch_size=500):
+    """Apply up to `batch_size` dirty objects to the database; returns how many.
+
+    Inserts are one bulk_create(ignore_conflicts=True) per model, deletes one
+    statement per model, and like_count is recomputed from the through-table for
+    every touched row (and likes_received for their authors), all in a single
+    transaction. Entries are settled right after the commit; intents recorded
+    meanwhile are rebased, not lost. If the database step fails the objects go
+    back into the dirty set untouched.
+    """
+    client = get_client()
+    members = [_decode(m) for m in (client.spop(DIRTY_KEY, batch_size) or [])]
+    if not members:
+        return 0
+
+    try:
+        snapshots = _apply(client, members)
+    except Exception:
+        # SPOP already took the members: put them back so the next flush retries
+        client.sadd(DIRTY_KEY, *members)
+        raise
+
+    for kind, obj_id, entries in snapshots:
+        args = [f"{kind}:{obj_id}"]
+        for uid, (state, base) in entries.items():
+            args.extend([uid, f"{state}:{base}"])
+        client.eval(SETTLE_SCRIPT, 2, _key(kind, obj_id), DIRTY_KEY, *args)
+    return len(snapshots)
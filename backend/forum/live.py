@@ -0,0 +1,252 @@
+"""
+Live push feed over Server-Sent Events.
+
+    GET /api/live/                      global feed (new/deleted posts, counters)
+    GET /api/live/?post=12&post=40      also the comment streams of posts 12 and 40
+    GET /api/live/?post=12&feed=0       only post 12 (an open comment section)
+
+Writers publish small JSON events to Redis channels after their transaction
+commits (see `publish` and forum/signals.py)::
+
+    live:feed        post_created, post_deleted, post_counts
+    live:post:<id>   comment_created, comment_deleted, comment_likes
+
+A post page listens to the feed as well (the default) for its own post_counts;
+counters are only published once so a client never receives an event twice.
+
+Each worker process keeps ONE Redis pub/sub connection (`Broker`) and fans the
+messages out to local subscriber queues, subscribing to a per-post channel only
+while some local client watches it. An idle connection therefore costs a small
+bounded queue and a suspended coroutine, not a Redis connection or a thread.
+
+The stream view is async: run under ASGI (e.g. `uvicorn backend.asgi:application`)
+for long-lived connections. Events are not replayed; a reconnecting client
+catches up with the delta feed (/api/posts/changes/).
+"""
+import asyncio
+import json
+import logging
+import weakref
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = "live:feed"
+MAX_POSTS_PER_STREAM = 20
+
+
+def post_channel(post_id):
+    return f"live:post:{post_id}"
+
+
+def _settings():
+    heartbeat = getattr(settings, "LIVE_HEARTBEAT_SECONDS", 15)
+    queue_size = getattr(settings, "LIVE_QUEUE_SIZE", 100)
+    return heartbeat, queue_size
+
+
+# ------------------------
+# Publishing (sync, from views and signals)
+# ------------------------
+def encode_message(event, data):
+    return json.dumps({"event": event, "data": data}, separators=(",", ":"), default=str)
+
+
+def publish(event, data, channels):
+    """Publish `event` to `channels`; live updates are best-effort."""
+    from .utils import get_redis
+    message = encode_message(event, data)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for channel in channels:
+            pipe.publish(channel, message)
+        pipe.execute()
+    except Exception:
+        logger.warning("Failed to publish live event %s", event, exc_info=True)
+
+
+def post_created(post):
+    from .serializers import user_summary
+    publish("post_created", {
+        "id": post.pk,
+        "title": post.title,
+        "user": user_summary(post.user),
+        "created_at": post.created_at.isoformat(),
+    }, [FEED_CHANNEL])
+
+
+def post_deleted(post_id):
+    publish("post_deleted", {"id": post_id}, [FEED_CHANNEL])
+
+
+def post_counts(post_id, **counts):
+    publish("post_counts", {"id": post_id, **counts}, [FEED_CHANNEL])
+
+
+def comment_created(comment):
+    from .serializers import user_summary
+    publish("comment_created", {
+        "id": comment.pk,
+        "post": comment.post_id,
+        "body": comment.body,
+        "user": user_summary(comment.user),
+        "created_at": comment.created_at.isoformat(),
+    }, [post_channel(comment.post_id)])
+
+
+def comment_deleted(comment_id, post_id):
+    publish("comment_deleted", {"id": comment_id, "post": post_id}, [post_channel(post_id)])
+
+
+def like_changed(obj, like_count):
+    """Push a new like total for a Post or Comment."""
+    if obj._meta.model_name == "post":
+        post_counts(obj.pk, like_count=like_count)
+    else:
+        publish("comment_likes", {"id": obj.pk, "post": obj.post_id, "like_count": like_count},
+                [post_channel(obj.post_id)])
+
+
+# ------------------------
+# Fan-out (async, per process)
+# ------------------------
+def get_async_client():
+    """Async Redis client for the broker (same server as the default cache)."""
+    from redis.asyncio import Redis
+    url = getattr(settings, "LIVE_REDIS_URL", None) or settings.CACHES["default"]["LOCATION"]
+    return Redis.from_url(url)
+
+
+class Broker:
+    """Shares one pub/sub connection between every stream of this process."""
+
+    def __init__(self, client):
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.subscribers = {}
+        self.lock = asyncio.Lock()
+        self.reader = None
+
+    async def subscribe(self, channels, queue):
+        async with self.lock:
+            new = [c for c in channels if c not in self.subscribers]
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(queue)
+            if new:
+                await self.pubsub.subscribe(*new)
+            if self.reader is None or self.reader.done():
+                self.reader = asyncio.ensure_future(self.read())
+
+    async def unsubscribe(self, channels, queue):
+        async with self.lock:
+            gone = []
+            for channel in channels:
+                queues = self.subscribers.get(channel)
+                if queues is None:
+                    continue
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[channel]
+                    gone.append(channel)
+            if gone:
+                await self.pubsub.unsubscribe(*gone)
+
+    def deliver(self, channel, data):
+        for queue in list(self.subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Slow client: drop the event rather than grow without bound
+                pass
+
+    async def read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Live pub/sub connection failed; retrying", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"]
+            data = message["data"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if isinstance(data, bytes):
+                data = data.decode()
+            try:
+                frame = format_event(data)
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Dropping malformed live event on %s", channel)
+                continue
+            # Formatted once here, not once per subscriber
+            self.deliver(channel, frame)
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    """The broker of the running event loop (one per loop, so per ASGI worker)."""
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = Broker(get_async_client())
+    return broker
+
+
+# ------------------------
+# Stream view
+# ------------------------
+def format_event(message):
+    payload = json.loads(message)
+    data = json.dumps(payload["data"], separators=(",", ":"))
+    return f"event: {payload['event']}\ndata: {data}\n\n"
+
+
+async def event_stream(channels):
+    heartbeat, queue_size = _settings()
+    broker = get_broker()
+    queue = asyncio.Queue(maxsize=queue_size)
+    await broker.subscribe(channels, queue)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+                continue
+            yield frame
+    finally:
+        await broker.unsubscribe(channels, queue)
+
+
+def stream_channels(request):
+    channels = [] if request.GET.get("feed") == "0" else [FEED_CHANNEL]
+    post_ids = []
+    for value in request.GET.getlist("post"):
+        post_ids.extend(v.strip() for v in value.split(",") if v.strip())
+    if not all(v.isdigit() for v in post_ids) or len(post_ids) > MAX_POSTS_PER_STREAM:
+        return None
+    channels.extend(post_channel(pk) for pk in dict.fromkeys(post_ids))
+    return channels
+
+
+async def live_events(request):
+    channels = stream_channels(request)
+    if not channels:
+        return HttpResponseBadRequest(
+            f"post must be up to {MAX_POSTS_PER_STREAM} post ids; feed=0 needs at least one"
+        )
+    response = StreamingHttpResponse(event_stream(channels), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Disable proxy buffering (nginx) so events are flushed immediately
+    response["X-Accel-Buffering"] = "no"
+    return response
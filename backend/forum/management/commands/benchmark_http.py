@@ -0,0 +1,529 @@
+import asyncio
+import http.client
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+from forum import refdata
+from forum.benchmark import QUERY_COUNT_HEADER
+from forum.images import delete_variants
+from forum.management.commands.seed_load import PASSWORD
+from forum.models import Comment, Post
+from forum.throttling import BucketRateThrottle
+
+# Relative weights of the user actions replayed, after the frontend:
+#   home       Home.jsx fetchData: posts/, posts/popular/, tags/popular/
+#   thread     ThreadDetail.jsx + CommentSection.jsx: the post, then its first comment page
+#   comments   CommentSection.jsx "load more": the next comment page of the last thread
+#   like       ThreadDetail.jsx toggleLike: PUT then DELETE /posts/<id>/like/
+#   post       CreatePost.jsx: multipart POST /posts/ with an image, tags and a category
+#   login      Login.jsx: POST /token/
+MIX = {'home': 40, 'thread': 30, 'comments': 8, 'like': 15, 'post': 3, 'login': 4}
+WRITES = ('like', 'post')
+PERCENTILES = (50, 95, 99)
+# Differences smaller than this are noise on a shared machine
+NOISE_MS = 2.0
+# Latencies of rarer routes (post creation, login) are not compared below this many requests
+MIN_SAMPLES = 20
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def parse_mix(value):
+    mix = dict(MIX)
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in MIX or not weight.isdigit():
+            raise CommandError(f"Bad --mix entry {item!r}: use action=weight with actions {', '.join(MIX)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise CommandError('--mix leaves nothing to run')
+    return mix
+
+
+def multipart(fields, files):
+    """(body, content type) of a multipart/form-data request, as a browser sends FormData."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content, content_type) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image():
+    """A noisy 1600x1200 JPEG, about the size of a phone photo after browser resizing."""
+    from PIL import Image
+    image = Image.merge('RGB', [Image.effect_noise((1600, 1200), 40 + 10 * i) for i in range(3)])
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=85)
+    return out.getvalue()
+
+
+# ------------------------
+# Servers
+# ------------------------
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServer:
+    """The WSGI application behind runserver's threaded server on a free local port."""
+
+    def __init__(self):
+        self.httpd = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        self.httpd.set_app(get_wsgi_application())
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def request(self, method, path, headers, body):
+        for attempt in (1, 2):
+            conn = getattr(self.local, 'conn', None)
+            if conn is None:
+                conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed a kept-alive connection between requests
+                conn.close()
+                self.local.conn = None
+                if attempt == 2:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+                self.local.conn = None
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ASGIServer:
+    """The ASGI application driven in this process from one event loop thread."""
+
+    def __init__(self):
+        self.app = get_asgi_application()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, method, path, headers, body):
+        return asyncio.run_coroutine_threadsafe(self.call(method, path, headers, body), self.loop).result()
+
+    async def call(self, method, path, headers, body):
+        path, _, query = path.partition('?')
+        if body:
+            # Set by an HTTP server from the request line; Django reads the body by it
+            headers = {**headers, 'Content-Length': str(len(body))}
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost')] + [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        done = asyncio.Event()
+        requested = False
+        status = None
+        response_headers = {}
+        chunks = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': body or b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_headers.update(
+                    (k.decode('latin-1').lower(), v.decode('latin-1')) for k, v in message.get('headers', [])
+                )
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            done.set()
+        return status, response_headers, b''.join(chunks)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+SERVERS = {'wsgi': WSGIServer, 'asgi': ASGIServer}
+
+
+# ------------------------
+# Traffic
+# ------------------------
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recording = False
+        self.routes = defaultdict(lambda: {'latencies': [], 'queries': [], 'errors': 0})
+        self.failures = {}
+        self.created_posts = []
+
+    def add(self, route, seconds, status, queries, body):
+        with self.lock:
+            if status >= 400 or status < 200:
+                self.failures.setdefault((route, status), body[:300])
+            if not self.recording:
+                return
+            entry = self.routes[route]
+            entry['latencies'].append(seconds)
+            if queries is not None:
+                entry['queries'].append(queries)
+            if status >= 400 or status < 200:
+                entry['errors'] += 1
+
+
+class VirtualUser:
+    """One signed-in browser: picks an action from the mix, runs its requests, repeats."""
+
+    def __init__(self, server, recorder, username, fixtures, mix, seed):
+        self.server = server
+        self.recorder = recorder
+        self.username = username
+        self.fixtures = fixtures
+        self.rng = random.Random(seed)
+        self.actions = list(mix)
+        self.weights = [mix[name] for name in self.actions]
+        self.token = None
+        self.next_comments = None
+
+    def call(self, route, method, path, body=None, content_type=None, auth=True):
+        headers = {'Accept': 'application/json'}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if auth and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        started = time.perf_counter()
+        status, response_headers, data = self.server.request(method, path, headers, body)
+        elapsed = time.perf_counter() - started
+        queries = response_headers.get(QUERY_COUNT_HEADER.lower())
+        self.recorder.add(route, elapsed, status, int(queries) if queries else None, data)
+        return status, data
+
+    def pick_post(self):
+        ids, weights = self.fixtures['posts']
+        return self.rng.choices(ids, weights)[0]
+
+    def run(self, stop):
+        self.login()
+        while not stop.is_set():
+            getattr(self, 'do_' + self.rng.choices(self.actions, self.weights)[0])()
+
+    def login(self):
+        body = json.dumps({'username': self.username, 'password': PASSWORD}).encode()
+        status, data = self.call('POST /api/token/', 'POST', '/api/token/', body, 'application/json', auth=False)
+        if status == 200:
+            self.token = json.loads(data)['access']
+
+    do_login = login
+
+    def do_home(self):
+        self.call('GET /api/posts/', 'GET', '/api/posts/')
+        self.call('GET /api/posts/popular/', 'GET', '/api/posts/popular/')
+        self.call('GET /api/tags/popular/', 'GET', '/api/tags/popular/')
+
+    def do_thread(self):
+        post_id = self.pick_post()
+        self.call('GET /api/posts/<id>/', 'GET', f'/api/posts/{post_id}/')
+        status, data = self.call('GET /api/comments/?post=<id>', 'GET', f'/api/comments/?post={post_id}')
+        self.next_comments = json.loads(data).get('next') if status == 200 else None
+
+    def do_comments(self):
+        if not self.next_comments:
+            return self.do_thread()
+        url = urlsplit(self.next_comments)
+        status, data = self.call('GET /api/comments/?post=<id>&cursor=', 'GET', f'{url.path}?{url.query}')
+        self.next_comments = json.loads(data).get('next') if status == 200 else None
+
+    def do_like(self):
+        post_id = self.pick_post()
+        # Liking then unliking leaves the counters as they were
+        self.call('PUT /api/posts/<id>/like/', 'PUT', f'/api/posts/{post_id}/like/')
+        self.call('DELETE /api/posts/<id>/like/', 'DELETE', f'/api/posts/{post_id}/like/')
+
+    def do_post(self):
+        categories, tags, image = self.fixtures['categories'], self.fixtures['tags'], self.fixtures['image']
+        fields = {
+            'title': f'[bench] {uuid.uuid4().hex[:12]}',
+            'body': 'Benchmark post. ' * self.rng.randint(5, 60),
+            'tags': json.dumps([{'name': name} for name in self.rng.sample(tags, min(len(tags), 3))]),
+        }
+        if categories:
+            fields['category'] = self.rng.choice(categories)
+        body, content_type = multipart(fields, {'image': ('photo.jpg', image, 'image/jpeg')})
+        status, data = self.call('POST /api/posts/', 'POST', '/api/posts/', body, content_type)
+        if status == 201:
+            with self.recorder.lock:
+                self.recorder.created_posts.append(json.loads(data)['id'])
+
+
+# ------------------------
+# Command
+# ------------------------
+class Command(BaseCommand):
+    help = (
+        "End-to-end HTTP benchmark: serve the app in this process (WSGI through runserver's "
+        "threaded server, or the ASGI application), replay the frontend's traffic mix from "
+        "--clients signed-in users and report throughput plus p50/p95/p99 latency and SQL "
+        "queries per route. Run it on data from seed_load (the users log in with its password). "
+        "--save writes a JSON baseline; --baseline compares against one and fails on regressions "
+        "beyond --threshold. Posts created by the run are deleted at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=sorted(SERVERS), default='wsgi')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+        parser.add_argument('--warmup', type=float, default=5, help='Seconds run before measuring')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='seed_load --seed of the users to sign in as (load<seed>_N)')
+        parser.add_argument('--mix', default='',
+                            help=f"Action weights, e.g. 'home=40,like=0' (defaults: "
+                                 f"{', '.join(f'{k}={v}' for k, v in MIX.items())})")
+        parser.add_argument('--read-only', action='store_true', help='Skip likes and post creation')
+        parser.add_argument('--keep-throttles', action='store_true',
+                            help='Keep the configured rate limits (by default budgets are lifted '
+                                 'so the few benchmark users are not answered with 429s)')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare with a JSON baseline')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative slowdown of p50/p95 and throughput (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if options['read_only']:
+            for name in WRITES:
+                mix[name] = 0
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        fixtures, usernames = self.fixtures(options, mix)
+        # Outermost, so session and authentication queries are counted too
+        middleware = ['forum.benchmark.QueryCountMiddleware'] + list(settings.MIDDLEWARE)
+        rates = {scope: '1000000/min' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+        if options['keep_throttles']:
+            throttles = mock.patch.object(BucketRateThrottle, 'THROTTLE_RATES', BucketRateThrottle.THROTTLE_RATES)
+        else:
+            throttles = mock.patch.object(BucketRateThrottle, 'THROTTLE_RATES', rates)
+
+        recorder = Recorder()
+        with override_settings(MIDDLEWARE=middleware), throttles:
+            server = SERVERS[options['server']]()
+            try:
+                elapsed = self.replay(server, recorder, usernames, fixtures, mix, options)
+            finally:
+                server.close()
+                self.delete_posts(recorder.created_posts)
+
+        results = self.summarize(recorder, elapsed, options, mix)
+        self.print_results(results)
+        if options['save']:
+            Path(options['save']).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f"Baseline written to {options['save']}")
+
+        problems = []
+        for (route, status), body in sorted(recorder.failures.items()):
+            self.stdout.write(self.style.WARNING(f'{route} answered {status}: {body.decode(errors="replace")}'))
+            if status >= 500:
+                problems.append(f'{route} answered {status}')
+        if baseline is not None:
+            problems += self.compare(baseline, results, options['threshold'])
+        if problems:
+            raise CommandError('Benchmark failed:\n  ' + '\n  '.join(problems))
+        if baseline is not None:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def fixtures(self, options, mix):
+        prefix = f"load{options['seed']}_"
+        clients = max(1, options['clients'])
+        usernames = list(
+            get_user_model().objects.filter(username__startswith=prefix, is_active=True)
+            .order_by('id').values_list('username', flat=True)[:clients]
+        )
+        if len(usernames) < clients:
+            raise CommandError(
+                f'Found {len(usernames)} users named {prefix}* for {clients} clients; '
+                f"run seed_load --seed {options['seed']} first or lower --clients."
+            )
+        # Recent posts, weighted by likes: readers pile onto popular threads
+        posts = list(Post.objects.order_by('-id').values_list('id', 'like_count')[:2000])
+        if not posts:
+            raise CommandError('No posts to read; run seed_load first.')
+        snapshot = refdata.get()
+        return {
+            'posts': ([pk for pk, _ in posts], [1 + likes for _, likes in posts]),
+            'categories': [c.name for c in snapshot.categories],
+            'tags': [t.name for t in snapshot.tags[:200]],
+            'image': sample_image() if mix['post'] else b'',
+        }, usernames
+
+    def replay(self, server, recorder, usernames, fixtures, mix, options):
+        stop = threading.Event()
+        users = [
+            VirtualUser(server, recorder, username, fixtures, mix, seed=options['seed'] * 1000 + i)
+            for i, username in enumerate(usernames)
+        ]
+        errors = []
+
+        def run(user):
+            try:
+                user.run(stop)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(
+            f"{options['server'].upper()}: {len(users)} clients, warming up for {options['warmup']:.0f}s..."
+        )
+        stop.wait(max(0, options['warmup']))
+        with recorder.lock:
+            recorder.recording = True
+        started = time.perf_counter()
+        stop.wait(max(1, options['duration']))
+        with recorder.lock:
+            recorder.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(f'A client failed: {errors[0]!r}')
+        return elapsed
+
+    def delete_posts(self, ids):
+        for post in Post.objects.filter(pk__in=ids):
+            # Variant jobs still queued for these posts find nothing and return
+            delete_variants(post.image_meta)
+            if post.image:
+                post.image.delete(save=False)
+            post.delete()
+
+    def summarize(self, recorder, elapsed, options, mix):
+        routes = {}
+        total = 0
+        for route, entry in sorted(recorder.routes.items()):
+            latencies = entry['latencies']
+            total += len(latencies)
+            result = {
+                'requests': len(latencies),
+                'errors': entry['errors'],
+                'rps': round(len(latencies) / elapsed, 1),
+                'queries': round(sum(entry['queries']) / len(entry['queries']), 1) if entry['queries'] else None,
+            }
+            for pct in PERCENTILES:
+                result[f'p{pct}_ms'] = round(percentile(latencies, pct) * 1000, 1)
+            routes[route] = result
+        return {
+            'server': options['server'],
+            'database': connection.vendor,
+            'clients': options['clients'],
+            'duration': options['duration'],
+            'mix': mix,
+            'rows': {'posts': Post.objects.count(), 'comments': Comment.objects.count()},
+            'rps': round(total / elapsed, 1),
+            'routes': routes,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"\n{'route':40} {'reqs':>6} {'err':>4} {'req/s':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}"
+        )
+        for route, r in results['routes'].items():
+            queries = '-' if r['queries'] is None else f"{r['queries']:.1f}"
+            self.stdout.write(
+                f"{route:40} {r['requests']:6} {r['errors']:4} {r['rps']:7.1f} "
+                f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {queries:>7}"
+            )
+        self.stdout.write(f"Total: {results['rps']:.1f} requests/s\n")
+
+    def compare(self, baseline, results, threshold):
+        """Regressions of `results` against `baseline`, as messages."""
+        problems = []
+        if (baseline.get('server'), baseline.get('database')) != (results['server'], results['database']):
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was taken on {baseline.get('server')}/{baseline.get('database')}, "
+                f"this run on {results['server']}/{results['database']}."
+            ))
+        if results['rps'] < baseline.get('rps', 0) * (1 - threshold):
+            problems.append(f"throughput {results['rps']:.1f} req/s, baseline {baseline['rps']:.1f}")
+        for route, old in baseline.get('routes', {}).items():
+            new = results['routes'].get(route)
+            if new is None:
+                continue
+            for key in ('p50_ms', 'p95_ms'):
+                if min(new['requests'], old.get('requests', 0)) < MIN_SAMPLES:
+                    break
+                if new[key] > old[key] * (1 + threshold) and new[key] - old[key] > NOISE_MS:
+                    problems.append(f'{route} {key[:3]} {new[key]:.1f}ms, baseline {old[key]:.1f}ms')
+            # Query counts are deterministic up to cache hits: any real increase is a regression
+            if new['queries'] is not None and old.get('queries') is not None and new['queries'] > old['queries'] + 0.5:
+                problems.append(f"{route} {new['queries']:.1f} queries per request, baseline {old['queries']:.1f}")
+        return problems
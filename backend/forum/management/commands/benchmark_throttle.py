@@ -0,0 +1,81 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import UserRateThrottle
+from forum import utils
+from forum.throttling import BucketRateThrottle
+
+
+class BenchView:
+    action = 'create'
+    throttle_scopes = {'create': 'post_create'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request overhead of the Redis token-bucket throttle "
+        "(one EVALSHA) next to DRF's cache-based UserRateThrottle. "
+        "Use --fake-redis to run without a Redis server (timings then exclude the network)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--clients', type=int, default=100,
+                            help='Distinct client IPs (buckets) the requests are spread over')
+        parser.add_argument('--fake-redis', action='store_true',
+                            help='Use an in-memory fakeredis server instead of REDIS_URL')
+
+    def handle(self, *args, **options):
+        if options['fake_redis']:
+            try:
+                import fakeredis
+            except ImportError:
+                raise CommandError('--fake-redis needs the fakeredis package (pip install fakeredis)')
+            client = fakeredis.FakeRedis()
+            redis_patch = mock.patch.object(utils, 'get_redis', lambda: client)
+        else:
+            redis_patch = mock.patch.object(utils, 'get_redis', utils.get_redis)
+
+        total = max(1, options['requests'])
+        clients = max(1, options['clients'])
+        factory = APIRequestFactory()
+        requests = []
+        for i in range(clients):
+            request = factory.post('/api/posts/', REMOTE_ADDR=f'10.0.{i // 250}.{i % 250 + 1}')
+            request.user = AnonymousUser()
+            requests.append(request)
+        view = BenchView()
+        # Budgets large enough that every request is allowed (the common case)
+        rates = {'post_create': '1000000/min', 'user': '1000000/min'}
+
+        with redis_patch, mock.patch.object(BucketRateThrottle, 'THROTTLE_RATES', rates), \
+                mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', rates):
+            utils._rate_limit_script = None
+            self.report('BucketRateThrottle (Redis script)', BucketRateThrottle, requests, view, total)
+            self.report('UserRateThrottle (DRF, cache)', UserRateThrottle, requests, view, total)
+        utils._rate_limit_script = None
+
+    def report(self, label, throttle_class, requests, view, total):
+        # Warm up: script load, connection pool
+        throttle_class().allow_request(requests[0], view)
+        timings = []
+        denied = 0
+        for i in range(total):
+            request = requests[i % len(requests)]
+            start = time.perf_counter()
+            if not throttle_class().allow_request(request, view):
+                denied += 1
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(p / 100 * len(timings)))] * 1e6
+
+        mean = sum(timings) / len(timings) * 1e6
+        self.stdout.write(
+            f'{label:36} mean {mean:7.1f}us  p50 {pct(50):7.1f}us  '
+            f'p95 {pct(95):7.1f}us  p99 {pct(99):7.1f}us  denied {denied}'
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from forum.images import refresh_variants
+from forum.models import Comment, Post, User
+
+
+class Command(BaseCommand):
+    help = "Generate missing image variants (and strip metadata) for existing posts, comments and avatars."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild variants even when they are already recorded')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Rows loaded per query')
+
+    def handle(self, *args, **options):
+        targets = [
+            (Post, 'image', 'image_meta', 'post'),
+            (Comment, 'image', 'image_meta', 'comment'),
+            (User, 'avatar', 'avatar_meta', 'avatar'),
+        ]
+        for model, field_name, meta_name, kind in targets:
+            built = self.backfill(model, field_name, meta_name, kind, options['force'], max(1, options['batch_size']))
+            self.stdout.write(f'{model.__name__}: {built} {field_name} variants built')
+        self.stdout.write(self.style.SUCCESS('Image variants up to date.'))
+
+    def backfill(self, model, field_name, meta_name, kind, force, batch_size):
+        qs = (
+            model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+            .only('pk', field_name, meta_name).order_by('pk')
+        )
+        built = 0
+        last_pk = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return built
+            for obj in batch:
+                if refresh_variants(obj, field_name, meta_name, kind, force=force):
+                    # update() keeps updated_at and the save signals out of a maintenance job
+                    model.objects.filter(pk=obj.pk).update(**{
+                        meta_name: getattr(obj, meta_name),
+                        field_name: getattr(obj, field_name).name,
+                    })
+                    built += 1
+            last_pk = batch[-1].pk
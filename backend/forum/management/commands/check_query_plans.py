@@ -0,0 +1,151 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from forum.models import Comment, Post, Report, User
+from forum.pagination import keyset_filter
+
+# Full table scans in EXPLAIN output, per vendor
+SEQ_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # "SCAN forum_post" is a full scan; "SCAN forum_post USING INDEX ..." walks an index
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+# Any walk of a table or an index from its start
+WALK = {
+    'postgresql': SEQ_SCAN['postgresql'],
+    'sqlite': re.compile(r'\bSCAN (\w+)\b'),
+}
+# Conditions the planner seeks an index with
+SEEK = {
+    'postgresql': re.compile(r'Index Cond: (.*)'),
+    'sqlite': re.compile(r'\bSEARCH \w+ USING (?:COVERING |PRIMARY KEY|INTEGER PRIMARY KEY|INDEX \w+ )?\((.*)\)'),
+}
+SORT = {
+    'postgresql': re.compile(r'\bSort\b'),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+}
+PAGE = 21
+
+
+def hot_queries():
+    """(name, queryset, seek) for the forum's hot query shapes, with sample values from the data.
+
+    `seek` lists the columns the index must be searched on; a full index walk is
+    then a failure as much as a table scan, because its cost grows with the table
+    (a deep cursor page would cost what OFFSET did). None marks first pages read
+    in index order, where walking the index stops after LIMIT rows.
+    """
+    feed = Post.objects.order_by('-created_at', '-id')
+    cursor = feed.values_list('created_at', 'id')[PAGE - 1:PAGE].first()
+    post_id = Post.objects.order_by('-comment_count').values_list('id', flat=True).first() or 0
+    thread = Comment.objects.filter(post_id=post_id)
+    thread_cursor = thread.order_by('created_at', 'id').values_list('created_at', 'id')[PAGE - 1:PAGE].first()
+    author = Post.objects.order_by('-id').values_list('user_id', flat=True).first() or 0
+    category = (
+        Post.objects.filter(category__isnull=False).order_by('-id')
+        .values_list('category_id', flat=True).first() or 0
+    )
+    user = User.objects.order_by('-id').values_list('username', 'email').first() or ('nobody', 'nobody@example.com')
+
+    queries = [('feed first page', feed[:PAGE], None)]
+    if cursor:
+        queries.append(('feed cursor page', feed.filter(keyset_filter('created_at', *cursor))[:PAGE], ('created_at',)))
+    queries += [
+        ('posts by author', Post.objects.filter(user_id=author).order_by('-created_at', '-id')[:PAGE], ('user_id',)),
+        ('posts by category', Post.objects.filter(category_id=category).order_by('-created_at', '-id')[:PAGE],
+         ('category_id',)),
+        ('comment thread newest', thread.order_by('-created_at', '-id')[:PAGE], ('post_id',)),
+        ('comment thread oldest', thread.order_by('created_at', 'id')[:PAGE], ('post_id',)),
+    ]
+    if thread_cursor:
+        queries.append((
+            'comment thread cursor page',
+            thread.filter(keyset_filter('created_at', *thread_cursor, descending=False))
+            .order_by('created_at', 'id')[:PAGE],
+            ('post_id', 'created_at'),
+        ))
+    queries += [
+        ('comments by author', Comment.objects.filter(user_id=author).order_by('-created_at', '-id')[:PAGE],
+         ('user_id',)),
+        # The partial index holds only open reports: walking it is the seek
+        ('open reports', Report.objects.filter(resolved=False).order_by('-created_at', '-id')[:50], None),
+        ('report queue', Report.objects.order_by('resolved', '-created_at', '-id')[:50], None),
+        ('login by email', User.objects.alias(ident_lower=Lower('email')).filter(ident_lower=user[1].lower()),
+         ('email',)),
+        ('login by username', User.objects.alias(ident_lower=Lower('username')).filter(ident_lower=user[0].lower()),
+         ('username',)),
+    ]
+    return queries
+
+
+def missing_seek(vendor, plan, columns):
+    """The `columns` no index condition in `plan` mentions."""
+    conditions = ' '.join(SEEK[vendor].findall(plan))
+    if vendor == 'sqlite' and '<expr>' in conditions:
+        # Expression indexes (lower(email)) are not spelled out by SQLite
+        return []
+    return [c for c in columns if not re.search(rf'\b{c}\b', conditions)]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the forum's hot queries (feed, author/category pages, comment threads, "
+        "report queue, login) and fail if any of them scans a whole table, or walks a whole "
+        "index where it should seek one (cursor pages, filtered lists). Run it against "
+        "production-sized data (see seed_load): on a few rows the planner rightly prefers "
+        "sequential scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force-index', action='store_true',
+                            help='PostgreSQL: disable sequential scans to check an index is usable on small data')
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Warn when a table has fewer rows than this')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in SEQ_SCAN:
+            raise CommandError(f'Unsupported database: {vendor} (postgresql or sqlite)')
+
+        for model in (Post, Comment, Report, User):
+            rows = model.objects.count()
+            if rows < options['min_rows']:
+                self.stdout.write(self.style.WARNING(
+                    f'{model._meta.db_table} has {rows} rows; plans may not reflect production.'
+                ))
+
+        failed = []
+        with transaction.atomic():
+            if options['force_index'] and vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset, seek in hot_queries():
+                plan = queryset.explain()
+                sorts = bool(SORT[vendor].search(plan))
+                scans = sorted(set(SEQ_SCAN[vendor].findall(plan)))
+                problem = None
+                if scans:
+                    problem = f"SEQ SCAN ({', '.join(scans)})"
+                elif seek is not None:
+                    walks = sorted(set(WALK[vendor].findall(plan)))
+                    missing = missing_seek(vendor, plan, seek)
+                    if walks:
+                        problem = f"INDEX WALK ({', '.join(walks)})"
+                    elif missing:
+                        problem = f"NO INDEX SEEK ON {', '.join(missing)}"
+                if problem:
+                    failed.append(name)
+                    status = self.style.ERROR(problem)
+                else:
+                    status = self.style.SUCCESS('ok')
+                note = ' (sorts in memory)' if sorts else ''
+                self.stdout.write(f'{name:28} {status}{note}')
+                if options['verbosity'] >= 2 or problem:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries scan instead of seeking: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS('All hot queries seek an index.'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from forum import like_buffer
+
+
+class Command(BaseCommand):
+    help = "Apply like/unlike intents buffered in Redis (LIKE_WRITE_BEHIND) to the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Maximum number of liked objects applied per transaction')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running as a worker instead of draining once')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep between polls when --loop finds nothing to do')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        while True:
+            flushed = like_buffer.flush(batch_size=batch_size)
+            total += flushed
+            if flushed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed buffered likes for {total} objects.'))
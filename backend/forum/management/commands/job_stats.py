@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from forum.models import Job
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Show background job counts and timings per job, and optionally prune finished jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Timing window: jobs finished in the last N hours')
+        parser.add_argument('--prune-days', type=int, default=None,
+                            help='Delete done jobs finished more than N days ago')
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            before = timezone.now() - timedelta(days=options['prune_days'])
+            deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=before).delete()
+            self.stdout.write(f'Pruned {deleted} finished jobs.')
+
+        counts = {}
+        for row in Job.objects.values('name', 'status').annotate(n=Count('id')):
+            counts.setdefault(row['name'], {})[row['status']] = row['n']
+
+        since = timezone.now() - timedelta(hours=options['hours'])
+        timings = {}
+        finished = Job.objects.filter(finished_at__gte=since).values_list(
+            'name', 'duration_ms', 'created_at', 'started_at'
+        )
+        for name, duration, created_at, started_at in finished.iterator():
+            entry = timings.setdefault(name, {'duration': [], 'wait': []})
+            if duration is not None:
+                entry['duration'].append(duration)
+            if started_at and created_at:
+                entry['wait'].append(int((started_at - created_at).total_seconds() * 1000))
+
+        if not counts:
+            self.stdout.write('No jobs.')
+            return
+        header = f"{'job':40} {'queued':>7} {'running':>7} {'done':>7} {'failed':>7} {'avg ms':>8} {'p95 ms':>8} {'p95 wait':>9}"
+        self.stdout.write(header)
+        for name in sorted(counts):
+            c = counts[name]
+            t = timings.get(name, {'duration': [], 'wait': []})
+            avg = sum(t['duration']) // len(t['duration']) if t['duration'] else 0
+            self.stdout.write(
+                f"{name[-40:]:40} {c.get(Job.QUEUED, 0):>7} {c.get(Job.RUNNING, 0):>7} "
+                f"{c.get(Job.DONE, 0):>7} {c.get(Job.FAILED, 0):>7} {avg:>8} "
+                f"{percentile(t['duration'], 95):>8} {percentile(t['wait'], 95):>9}"
+            )
+        failed = Job.objects.filter(status=Job.FAILED).order_by('-finished_at')[:5]
+        for job_row in failed:
+            last_line = (job_row.last_error.strip().splitlines() or [''])[-1]
+            self.stdout.write(self.style.WARNING(f'failed #{job_row.pk} {job_row.name}: {last_line}'))
@@ -0,0 +1,148 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+from unittest import mock
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from forum import live
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many idle SSE connections to /api/live/ through the ASGI application "
+        "in this process, push events through Redis pub/sub and report memory per "
+        "connection and delivery time. Use --fake-redis to run without a Redis server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=3000)
+        parser.add_argument('--posts', type=int, default=50,
+                            help='Spread per-post subscriptions over this many post ids')
+        parser.add_argument('--events', type=int, default=20, help='Feed events to publish')
+        parser.add_argument('--fake-redis', action='store_true',
+                            help='Use an in-memory fakeredis server instead of REDIS_URL')
+
+    def handle(self, *args, **options):
+        if options['fake_redis']:
+            try:
+                import fakeredis
+            except ImportError:
+                raise CommandError('--fake-redis needs the fakeredis package (pip install fakeredis)')
+            server = fakeredis.FakeServer()
+            client = mock.patch.object(
+                live, 'get_async_client', lambda: fakeredis.FakeAsyncRedis(server=server)
+            )
+        else:
+            client = mock.patch.object(live, 'get_async_client', live.get_async_client)
+        with client:
+            asyncio.run(self.run(options))
+
+    async def run(self, options):
+        app = get_asgi_application()
+        total = max(1, options['connections'])
+        posts = max(1, options['posts'])
+        connections = []
+
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        for i in range(total):
+            connections.append(Connection(app, f'post={i % posts}'))
+        await asyncio.gather(*(c.ready.wait() for c in connections))
+        opened = time.perf_counter() - started
+        gc.collect()
+        idle = tracemalloc.get_traced_memory()[0] - baseline
+        failed = [c for c in connections if c.status != 200]
+        if failed:
+            raise CommandError(f'{len(failed)} connections failed (first status {failed[0].status})')
+
+        broker = live.get_broker()
+        self.stdout.write(
+            f'{total} connections open in {opened:.2f}s over {len(broker.subscribers)} channels; '
+            f'{idle / 1024 / 1024:.1f} MiB traced ({idle / total / 1024:.1f} KiB per connection)'
+        )
+
+        # Feed events reach every connection, per-post events only their subscribers
+        started = time.perf_counter()
+        for n in range(options['events']):
+            await broker.client.publish(live.FEED_CHANNEL, live.encode_message('post_counts', {'id': n, 'like_count': n}))
+        for pk in range(posts):
+            await broker.client.publish(live.post_channel(pk), live.encode_message('comment_created', {'post': pk}))
+        expected = options['events'] + 1
+        while any(c.events < expected for c in connections):
+            if time.perf_counter() - started > 60:
+                missing = sum(1 for c in connections if c.events < expected)
+                raise CommandError(f'{missing} connections did not receive every event within 60s')
+            await asyncio.sleep(0.05)
+        delivered = time.perf_counter() - started
+        self.stdout.write(
+            f'Delivered {expected * total} events in {delivered:.2f}s '
+            f'({expected * total / delivered:,.0f} events/s)'
+        )
+
+        for c in connections:
+            c.disconnect()
+        await asyncio.gather(*(c.task for c in connections), return_exceptions=True)
+        await asyncio.sleep(0.1)
+        connections.clear()
+        gc.collect()
+        left = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        self.stdout.write(
+            f'After disconnect: {len(broker.subscribers)} channels subscribed, '
+            f'{left / 1024 / 1024:.1f} MiB still traced'
+        )
+        if broker.subscribers:
+            raise CommandError('Subscriptions leaked after disconnect')
+        self.stdout.write(self.style.SUCCESS('Live feed load test passed.'))
+
+
+class Connection:
+    """A minimal ASGI client holding one /api/live/ stream open."""
+
+    def __init__(self, app, query):
+        self.status = None
+        self.events = 0
+        self.ready = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.requested = False
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': '/api/live/',
+            'raw_path': b'/api/live/',
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        self.task = asyncio.ensure_future(app(scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.ready.set()
+        elif message['type'] == 'http.response.body':
+            body = message.get('body', b'')
+            if body.startswith(b'retry:'):
+                # The stream has subscribed before sending its first frame
+                self.ready.set()
+            self.events += body.count(b'event: ')
+
+    def disconnect(self):
+        self.closed.set()
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from forum.models import Post
+from forum.utils import (
+    HOT_POSTS_EPOCH_KEY,
+    HOT_POSTS_KEY,
+    POPULAR_POSTS_KEY,
+    POPULAR_SEEDED_KEY,
+    get_redis,
+    rescale_hot_posts,
+)
+
+
+class Command(BaseCommand):
+    help = "Rescale/prune the hot_posts ZSET; with --rebuild, reseed hot and popular rankings from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute both ZSETs from like/comment counters (e.g. after a Redis flush)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.rebuild()
+        remaining = rescale_hot_posts()
+        self.stdout.write(self.style.SUCCESS(f'hot_posts rescaled; {remaining} posts ranked.'))
+
+    def rebuild(self):
+        half_life = getattr(settings, 'HOT_POSTS_HALF_LIFE', 12 * 3600)
+        max_size = getattr(settings, 'HOT_POSTS_MAX', 1000)
+        weights = getattr(settings, 'HOT_POST_WEIGHTS', {})
+        now = time.time()
+
+        popular = dict(
+            Post.objects.filter(like_count__gt=0)
+            .order_by('-like_count', '-id')
+            .values_list('pk', 'like_count')[:max_size]
+        )
+
+        # Approximate the decayed score by aging each post's totals from its creation time
+        since = timezone.now() - timezone.timedelta(seconds=half_life * 10)
+        hot = {}
+        recent = Post.objects.filter(created_at__gte=since).values_list('pk', 'like_count', 'comment_count', 'created_at')
+        for pk, likes, comments, created_at in recent.iterator():
+            raw = (
+                weights.get('create', 0)
+                + weights.get('like', 0) * likes
+                + weights.get('comment', 0) * comments
+            )
+            score = raw * 2 ** (-(now - created_at.timestamp()) / half_life)
+            if score > 0:
+                hot[pk] = score
+        hot = dict(sorted(hot.items(), key=lambda item: item[1], reverse=True)[:max_size])
+
+        client = get_redis()
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(HOT_POSTS_KEY, POPULAR_POSTS_KEY)
+        pipe.set(HOT_POSTS_EPOCH_KEY, now)
+        if hot:
+            pipe.zadd(HOT_POSTS_KEY, hot)
+        if popular:
+            pipe.zadd(POPULAR_POSTS_KEY, popular)
+        pipe.set(POPULAR_SEEDED_KEY, 1)
+        pipe.execute()
+        self.stdout.write(f'Seeded {len(hot)} hot and {len(popular)} popular posts.')
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from forum import changes
+
+
+class Command(BaseCommand):
+    help = "Delete delta-feed change log entries older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'POST_CHANGES_RETENTION_DAYS', 7),
+                            help='Keep entries from the last N days (default: POST_CHANGES_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = changes.prune(before)
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} change log entries older than {before:%Y-%m-%d %H:%M}.'))
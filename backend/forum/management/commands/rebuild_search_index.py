@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from forum.models import Post
+from forum.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for all posts in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of posts tokenized and written per batch')
+        parser.add_argument('--keep', action='store_true',
+                            help='Upsert over the existing index instead of clearing it first')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(f'Using {type(backend).__name__}')
+
+        if not options['keep']:
+            backend.clear()
+
+        indexed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').prefetch_related('tags')[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                indexed += backend.index(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} posts.'))
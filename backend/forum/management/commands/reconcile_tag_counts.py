@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from forum.models import Post
+from forum.utils import (
+    TAG_BUCKET_SECONDS,
+    TAG_BUCKET_TTL,
+    TAG_COUNTS_KEY,
+    _tag_bucket_key,
+    get_redis,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the popular-tag leaderboard (all-time and hourly buckets) from the database to repair drift."
+
+    def handle(self, *args, **options):
+        through = Post.tags.through.objects
+        totals = dict(
+            through.values('tag_id').annotate(n=Count('*')).values_list('tag_id', 'n')
+        )
+
+        since = timezone.now() - timedelta(seconds=TAG_BUCKET_TTL)
+        buckets = {}
+        rows = (
+            through.filter(post__created_at__gte=since)
+            .annotate(hour=TruncHour('post__created_at'))
+            .values('hour', 'tag_id')
+            .annotate(n=Count('*'))
+            .values_list('hour', 'tag_id', 'n')
+        )
+        for hour_dt, tag_id, n in rows:
+            hour = int(hour_dt.timestamp()) // TAG_BUCKET_SECONDS
+            buckets.setdefault(hour, {})[tag_id] = n
+
+        client = get_redis()
+        now_hour = int(time.time()) // TAG_BUCKET_SECONDS
+        oldest_hour = now_hour - TAG_BUCKET_TTL // TAG_BUCKET_SECONDS
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(TAG_COUNTS_KEY)
+        if totals:
+            pipe.zadd(TAG_COUNTS_KEY, totals)
+        for hour in range(oldest_hour, now_hour + 1):
+            key = _tag_bucket_key(hour)
+            pipe.delete(key)
+            if hour in buckets:
+                pipe.zadd(key, buckets[hour])
+                pipe.expireat(key, hour * TAG_BUCKET_SECONDS + TAG_BUCKET_TTL)
+        pipe.execute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt tag counts for {len(totals)} tags and {len(buckets)} hourly buckets.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from forum import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard rollups served by /api/admin/stats/ (run from cron)."
+
+    def handle(self, *args, **options):
+        data = stats.refresh()
+        totals = ', '.join(f'{k} {v}' for k, v in data['totals'].items())
+        self.stdout.write(self.style.SUCCESS(f'Admin stats refreshed: {totals}, open reports {data["open_reports"]}.'))
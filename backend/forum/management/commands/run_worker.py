@@ -0,0 +1,35 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+from forum.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (password reset emails, image variants) queued by the API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Jobs run at the same time (threads)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between queue polls when idle')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+
+        def shutdown(signum, frame):
+            self.stdout.write('Stopping after running jobs finish...')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(f'Worker {worker.name} started (concurrency {worker.concurrency}).')
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped: {worker.processed} jobs done, {worker.failed} failed attempts.'
+        ))
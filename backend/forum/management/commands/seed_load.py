@@ -0,0 +1,341 @@
+import bisect
+import contextlib
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from forum import refdata
+from forum.models import Category, Comment, Post, Tag, user_counters
+from forum.response_cache import bump
+
+PASSWORD = 'loadtest1234'
+
+CATEGORY_NAMES = [
+    'General', 'Help', 'Announcements', 'Programming', 'ข่าวสาร', 'ถาม-ตอบ', 'เทคโนโลยี',
+    'เกม', 'กีฬา', 'อาหาร', 'ท่องเที่ยว', 'การเงิน', 'Jobs', 'Showcase', 'Off-topic',
+]
+# Tags in co-occurring clusters: a post's extra tags usually come from its first tag's cluster
+TAG_CLUSTERS = [
+    ['python', 'django', 'drf', 'celery', 'pytest', 'fastapi'],
+    ['javascript', 'react', 'vite', 'tailwind', 'typescript', 'nodejs'],
+    ['database', 'postgresql', 'redis', 'sql', 'index', 'performance'],
+    ['ฟุตบอล', 'พรีเมียร์ลีก', 'ทีมชาติไทย', 'มวยไทย', 'วอลเลย์บอล', 'กีฬา'],
+    ['อาหาร', 'สตรีทฟู้ด', 'กาแฟ', 'ของหวาน', 'สูตรอาหาร', 'ร้านอร่อย'],
+    ['ท่องเที่ยว', 'เชียงใหม่', 'ภูเก็ต', 'ญี่ปุ่น', 'รีวิวที่พัก', 'แบกเป้'],
+    ['การเงิน', 'หุ้น', 'กองทุน', 'ภาษี', 'คริปโต', 'ออมเงิน'],
+    ['gaming', 'rov', 'valorant', 'steam', 'nintendo', 'esports'],
+]
+WORDS_EN = (
+    'the a how to why is it with for and on in my your this that can not help need question '
+    'django react python api cache database query index page load slow fast error bug deploy '
+    'server docker token login image upload comment post like feed update release review tips '
+    'guide first time anyone know best way please thanks example problem solved working'
+).split()
+WORDS_TH = (
+    'สวัสดี ครับ ค่ะ ช่วย ด้วย หน่อย อยาก ถาม ว่า ทำไม อย่างไร ได้ ไม่ ใช้ งาน ระบบ เว็บ ข้อมูล '
+    'ปัญหา แก้ เร็ว ช้า มาก น้อย วันนี้ เมื่อวาน ลอง แล้ว ยัง รีวิว แนะนำ ร้าน อาหาร เที่ยว '
+    'เกม ทีม ฟุตบอล ราคา ถูก แพง ขอบคุณ ทุกคน เพื่อน ที่ นี่ มี อะไร ดี ที่สุด'
+).split()
+
+
+def zipf_cum_weights(n, skew):
+    """Cumulative Zipf weights 1/rank^skew for ranks 1..n (for random.choices)."""
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def zipf_counts(total, n, skew, rng, cap=None):
+    """Split `total` over `n` ranks following Zipf (stochastic rounding, capped at `cap`)."""
+    if n <= 0:
+        return []
+    cum = zipf_cum_weights(n, skew)
+    scale = total / cum[-1]
+    counts = []
+    previous = 0.0
+    for weight in cum:
+        expected = (weight - previous) * scale
+        previous = weight
+        count = int(expected)
+        if rng.random() < expected - count:
+            count += 1
+        counts.append(min(count, cap) if cap is not None else count)
+    return counts
+
+
+class ZipfPicker:
+    """Draws items with Zipf skew; the hot items are a random subset, not the first ones."""
+
+    def __init__(self, items, skew, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum = zipf_cum_weights(len(self.items), skew)
+        self.rng = rng
+
+    def pick(self):
+        return self.items[bisect.bisect_left(self.cum, self.rng.random() * self.cum[-1])]
+
+
+def text(rng, words_min, words_max):
+    # Mostly Thai or mostly English, with some code-switching as on the real forum
+    primary, secondary = (WORDS_TH, WORDS_EN) if rng.random() < 0.6 else (WORDS_EN, WORDS_TH)
+    count = min(words_max, max(words_min, int(rng.lognormvariate(0, 0.7) * words_min)))
+    words = [rng.choice(secondary if rng.random() < 0.15 else primary) for _ in range(count)]
+    joiner = '' if primary is WORDS_TH and rng.random() < 0.5 else ' '
+    return joiner.join(words)
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the given created_at/updated_at instead of now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate production-shaped load-test data in chunked bulk inserts: users, posts, "
+        "comments and likes with Zipf-skewed popularity and hot authors, Thai/English text "
+        "and co-occurring tags. Deterministic for a given --seed. For capacity planning, e.g. "
+        "--users 200000 --posts 1000000 --comments 10000000 --likes 50000000."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--likes', type=int, default=2000000, help='Post likes')
+        parser.add_argument('--comment-likes', type=int, default=500000)
+        parser.add_argument('--tags', type=int, default=200, help='Number of distinct tags')
+        parser.add_argument('--days', type=int, default=365, help='Posts are spread over the last N days')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent for post popularity and author/commenter activity')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        self.skew = options['skew']
+        self.started = time.monotonic()
+        self.prefix = f"load{options['seed']}_"
+        User = get_user_model()
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f'Users named {self.prefix}* already exist; use another --seed.')
+
+        user_ids = self.create_users(options['users'])
+        categories = self.create_categories()
+        tags = self.create_tags(options['tags'])
+        stats = self.create_content(user_ids, categories, tags, options)
+        self.update_user_totals(user_ids)
+
+        # bulk_create sends no signals: invalidate what the signals would have
+        bump('posts', 'comments', 'tags', 'categories', 'users')
+        refdata.bump()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(user_ids)} users, {stats['posts']} posts, {stats['comments']} comments, "
+            f"{stats['likes']} post likes and {stats['comment_likes']} comment likes "
+            f"in {time.monotonic() - self.started:.0f}s. Users log in with password {PASSWORD!r}."
+        ))
+        self.stdout.write(
+            'Next: manage.py rebuild_search_index, reconcile_tag_counts and maintain_hot_posts --rebuild.'
+        )
+
+    def progress(self, message):
+        self.stdout.write(f'[{time.monotonic() - self.started:7.1f}s] {message}')
+
+    # -- reference data and users --------------------------------------------
+    def create_users(self, count):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        joined_since = timezone.now() - timedelta(days=730)
+        ids = []
+        for start in range(0, count, self.batch_size):
+            batch = [
+                User(
+                    username=f'{self.prefix}{i}',
+                    email=f'{self.prefix}{i}@example.com',
+                    password=password,
+                    date_joined=joined_since + timedelta(seconds=self.rng.randrange(730 * 86400)),
+                )
+                for i in range(start, min(count, start + self.batch_size))
+            ]
+            User.objects.bulk_create(batch)
+            ids.extend(user.pk for user in batch)
+        if None in ids:
+            raise CommandError('The database did not return primary keys from bulk_create.')
+        self.progress(f'{len(ids)} users')
+        return ids
+
+    def create_categories(self):
+        categories = []
+        for name in CATEGORY_NAMES:
+            category = Category.objects.filter(name__iexact=name).order_by('pk').first()
+            categories.append(category or Category.objects.create(name=name))
+        return categories
+
+    def create_tags(self, count):
+        """Tag ids grouped in clusters of co-occurring tags."""
+        named = [(name, c) for c, cluster in enumerate(TAG_CLUSTERS) for name in cluster]
+        for i in range(max(0, count - len(named))):
+            cluster = i % len(TAG_CLUSTERS)
+            named.append((f'{TAG_CLUSTERS[cluster][0]}-{i}', cluster))
+        named = named[:count]
+        ids = {tag.name.lower(): tag.pk for tag in Tag.objects.resolve([name for name, _ in named])}
+        clusters = [[] for _ in TAG_CLUSTERS]
+        for name, cluster in named:
+            clusters[cluster].append(ids[name.lower()])
+        self.progress(f'{len(named)} tags')
+        return [cluster for cluster in clusters if cluster]
+
+    # -- posts, comments, likes ------------------------------------------------
+    def pick_tags(self, clusters, cluster_picker):
+        if not clusters:
+            return set()
+        cluster = clusters[cluster_picker.pick()]
+        count = self.rng.choices((0, 1, 2, 3), weights=(15, 40, 30, 15))[0]
+        chosen = set()
+        for _ in range(count):
+            source = cluster if self.rng.random() < 0.8 else self.rng.choice(clusters)
+            # Within a cluster the first tags are the common ones
+            chosen.add(source[min(int(self.rng.expovariate(0.6)), len(source) - 1)])
+        return chosen
+
+    def create_content(self, user_ids, categories, clusters, options):
+        rng = self.rng
+        posts = options['posts']
+        users = len(user_ids)
+        if posts and not users:
+            raise CommandError('Posts need at least one user.')
+        # Popularity: Zipf-distributed like/comment totals over a shuffled post order
+        popularity = list(range(posts))
+        rng.shuffle(popularity)
+        like_counts = zipf_counts(options['likes'], posts, self.skew, rng, cap=users)
+        comment_counts = zipf_counts(options['comments'], posts, self.skew, rng)
+        likes_of = [0] * posts
+        comments_of = [0] * posts
+        for rank, index in enumerate(popularity):
+            likes_of[index] = like_counts[rank]
+            comments_of[index] = comment_counts[rank]
+        del popularity, like_counts, comment_counts
+
+        authors = ZipfPicker(user_ids, self.skew, rng) if users else None
+        category_picker = ZipfPicker(categories, 1.0, rng)
+        cluster_picker = ZipfPicker(range(len(clusters)), 1.0, rng) if clusters else None
+        total_comments = max(1, options['comments'])
+        # Mean likes per comment, spread with a heavy tail (Pareto)
+        comment_like_mean = options['comment_likes'] / total_comments
+        now = timezone.now()
+        start = now - timedelta(days=options['days'])
+        span = (now - start).total_seconds()
+        stats = {'posts': 0, 'comments': 0, 'likes': 0, 'comment_likes': 0}
+
+        PostTag = Post.tags.through
+        PostLike = Post.likes.through
+        CommentLike = Comment.likes.through
+        with explicit_timestamps(Post, Comment):
+            for first in range(0, posts, self.batch_size):
+                indexes = range(first, min(posts, first + self.batch_size))
+                batch = []
+                for i in indexes:
+                    # Ids follow time order, as in production; a little jitter keeps ties rare
+                    created = start + timedelta(seconds=span * (i + rng.random()) / posts)
+                    batch.append(Post(
+                        user_id=authors.pick(),
+                        category=category_picker.pick() if rng.random() < 0.9 else None,
+                        title=text(rng, 3, 14),
+                        body=text(rng, 10, 300),
+                        created_at=created,
+                        updated_at=created,
+                        like_count=likes_of[i],
+                        comment_count=comments_of[i],
+                    ))
+                with transaction.atomic():
+                    Post.objects.bulk_create(batch)
+                    PostTag.objects.bulk_create(
+                        [PostTag(post_id=post.pk, tag_id=tag_id)
+                         for post in batch for tag_id in self.pick_tags(clusters, cluster_picker)],
+                        batch_size=self.batch_size,
+                    )
+                    likes = (
+                        PostLike(post_id=post.pk, user_id=user_id)
+                        for post, i in zip(batch, indexes)
+                        for user_id in rng.sample(user_ids, likes_of[i])
+                    )
+                    stats['likes'] += self.insert(PostLike, likes)
+                stats['posts'] += len(batch)
+
+                comments = (
+                    self.make_comment(post, authors, now, comment_like_mean)
+                    for post, i in zip(batch, indexes)
+                    for _ in range(comments_of[i])
+                )
+                for chunk in self.chunks(comments):
+                    with transaction.atomic():
+                        Comment.objects.bulk_create(chunk)
+                        likes = (
+                            CommentLike(comment_id=comment.pk, user_id=user_id)
+                            for comment in chunk
+                            for user_id in rng.sample(user_ids, comment.like_count)
+                        )
+                        stats['comment_likes'] += self.insert(CommentLike, likes)
+                    stats['comments'] += len(chunk)
+                self.progress(
+                    f"{stats['posts']}/{posts} posts, {stats['comments']} comments, "
+                    f"{stats['likes'] + stats['comment_likes']} likes"
+                )
+        return stats
+
+    def make_comment(self, post, authors, now, like_mean):
+        rng = self.rng
+        # Most replies arrive within hours of the post, a long tail much later
+        created = min(now, post.created_at + timedelta(seconds=rng.expovariate(1 / 21600)))
+        likes = 0
+        if like_mean > 0:
+            # Pareto(1.5) - 1 has mean 2: rescale to the requested mean
+            expected = (rng.paretovariate(1.5) - 1) * like_mean / 2
+            likes = int(expected) + (rng.random() < expected - int(expected))
+        return Comment(
+            post_id=post.pk,
+            user_id=authors.pick(),
+            body=text(rng, 2, 80),
+            created_at=created,
+            updated_at=created,
+            like_count=min(likes, len(authors.items)),
+        )
+
+    def chunks(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, self.batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def insert(self, model, rows):
+        inserted = 0
+        for chunk in self.chunks(rows):
+            model.objects.bulk_create(chunk)
+            inserted += len(chunk)
+        return inserted
+
+    def update_user_totals(self, user_ids):
+        User = get_user_model()
+        for start in range(0, len(user_ids), self.batch_size):
+            ids = user_ids[start:start + self.batch_size]
+            User.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**user_counters())
+        self.progress('user totals')
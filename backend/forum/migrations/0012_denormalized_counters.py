@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:35
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, fk_name):
+    counted = (
+        queryset.filter(**{fk_name: OuterRef("pk")})
+        .order_by()
+        .values(fk_name)
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("forum", "Post")
+    Comment = apps.get_model("forum", "Comment")
+    Post.objects.update(
+        like_count=_count(Post.likes.through.objects.all(), "post_id"),
+        comment_count=_count(Comment.objects.all(), "post_id"),
+    )
+    Comment.objects.update(like_count=_count(Comment.likes.through.objects.all(), "comment_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0011_post_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_engine_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        # Expression must match forum.search.PostgresSearchBackend.VECTOR
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS forum_searchdocument_content_gin "
+            "ON forum_searchdocument USING gin "
+            "(to_tsvector('simple'::regconfig, COALESCE(content, '')))"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS forum_post_fts "
+            "USING fts5(content, tokenize='unicode61 remove_diacritics 0')"
+        )
+
+
+def drop_engine_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS forum_searchdocument_content_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS forum_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0012_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='forum.post')),
+                ('content', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_engine_index, drop_engine_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0014_post_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
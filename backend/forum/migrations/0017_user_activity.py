@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def _aggregate(queryset, fk_name, aggregate):
+    value = (
+        queryset.filter(**{fk_name: OuterRef("pk")})
+        .order_by()
+        .values(fk_name)
+        .annotate(n=aggregate)
+        .values("n")
+    )
+    return Coalesce(Subquery(value, output_field=IntegerField()), Value(0))
+
+
+def backfill_totals(apps, schema_editor):
+    User = apps.get_model("forum", "User")
+    Post = apps.get_model("forum", "Post")
+    Comment = apps.get_model("forum", "Comment")
+    User.objects.update(
+        post_count=_aggregate(Post.objects.all(), "user_id", Count("*")),
+        comment_count=_aggregate(Comment.objects.all(), "user_id", Count("*")),
+        likes_received=(
+            _aggregate(Post.objects.all(), "user_id", Sum("like_count"))
+            + _aggregate(Comment.objects.all(), "user_id", Sum("like_count"))
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0016_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='likes_received',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='comment_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='post_user_created_idx'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:08
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def merge_case_duplicates(apps, schema_editor):
+    """Fold tags differing only in case into the oldest one before the unique index."""
+    Tag = apps.get_model("forum", "Tag")
+    Through = apps.get_model("forum", "Post").tags.through
+    keep = {}
+    duplicates = {}
+    for tag_id, name in Tag.objects.order_by("id").values_list("id", "name"):
+        key = name.lower()
+        if key in keep:
+            duplicates[tag_id] = keep[key]
+        else:
+            keep[key] = tag_id
+    if not duplicates:
+        return
+    affected = set(duplicates) | set(duplicates.values())
+    links = set(Through.objects.filter(tag_id__in=affected).values_list("post_id", "tag_id"))
+    moved = {
+        (post_id, duplicates[tag_id]) for post_id, tag_id in links
+        if tag_id in duplicates and (post_id, duplicates[tag_id]) not in links
+    }
+    Through.objects.bulk_create([Through(post_id=p, tag_id=t) for p, t in moved])
+    Tag.objects.filter(id__in=list(duplicates)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0018_comment_thread_index'),
+    ]
+
+    operations = [
+        # Redis tag counters still name the merged ids; run reconcile_tag_counts afterwards
+        migrations.RunPython(merge_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='tag_name_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0020_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-like_count', '-id'], name='post_like_count_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Lower
 from django.contrib.auth.models import AbstractUser, Group, Permission
 
+from .images import ImageVariantsMixin
+
 # ------------------------
 # User
 # ------------------------
-class User(AbstractUser):
+class User(ImageVariantsMixin, AbstractUser):
     ROLE_CHOICES = (
         ("admin", "Admin"),
         ("user", "User"),
@@ -12,6 +16,8 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default="user")
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True, default="avatars/default-avatar.png")
+    # Dimensions and 64/128px variants of the avatar (see forum/images.py)
+    avatar_meta = models.JSONField(default=dict, blank=True)
     social_link = models.URLField(blank=True, null=True)
     # Store multiple social links (facebook/twitter/instagram/github) as JSON
     try:
@@ -21,6 +27,11 @@ class User(AbstractUser):
     except Exception:
         # Fallback: if JSONField not available, use TextField and store JSON string
         social = models.TextField(blank=True, null=True, default='{}')
+    # Denormalized profile totals, maintained by forum/signals.py, LikeCounterMixin
+    # and like_buffer.flush. `manage.py reconcile_counters` repairs any drift.
+    post_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
 
     groups = models.ManyToManyField(
         Group,
@@ -37,6 +48,15 @@ class User(AbstractUser):
         verbose_name="user permissions",
     )
 
+    image_variant_fields = {"avatar": ("avatar_meta", "avatar")}
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive login / password reset lookups (see find_user)
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+            models.Index(Lower("username"), name="user_username_lower_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if self.role == "admin":
             self.is_staff = True
@@ -44,6 +64,21 @@ class User(AbstractUser):
         super().save(*args, **kwargs)
 
 
+def find_user(identifier):
+    """The user with this email (when it contains "@") or username, ignoring case.
+
+    Compares Lower(...) rather than using __iexact (UPPER(...) on PostgreSQL,
+    LIKE on SQLite) so the lookup can use the Lower() indexes above. The oldest
+    account wins if several share an email.
+    """
+    ident = str(identifier).strip()
+    field = "email" if "@" in ident else "username"
+    return (
+        User.objects.alias(ident_lower=Lower(field))
+        .filter(ident_lower=ident.lower()).order_by("pk").first()
+    )
+
+
 # ------------------------
 # Category
 # ------------------------
@@ -57,18 +92,171 @@ class Category(models.Model):
 # ------------------------
 # Tag
 # ------------------------
+def normalize_tag_name(name):
+    return " ".join(str(name).split())
+
+
+class TagQuerySet(models.QuerySet):
+    def resolve(self, names):
+        """Tags named `names` (case-insensitively), creating the missing ones.
+
+        One SELECT when every tag exists; otherwise one bulk INSERT that skips
+        names created concurrently, and one SELECT for them. A tag keeps the
+        spelling it was first created with. Returned in the order of `names`.
+        """
+        wanted = {}
+        for name in names:
+            name = normalize_tag_name(name)
+            if name:
+                wanted.setdefault(name.lower(), name)
+        if not wanted:
+            return []
+        lowered = self.annotate(name_lower=Lower("name"))
+        found = {t.name.lower(): t for t in lowered.filter(name_lower__in=list(wanted))}
+        missing = [key for key in wanted if key not in found]
+        if missing:
+            self.bulk_create([Tag(name=wanted[key]) for key in missing], ignore_conflicts=True)
+            # bulk_create sends no post_save
+            from . import refdata
+            refdata.bump_on_commit()
+            found.update((t.name.lower(), t) for t in lowered.filter(name_lower__in=missing))
+        return [found[key] for key in wanted if key in found]
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # "Python" and "python" are the same tag
+            models.UniqueConstraint(Lower("name"), name="tag_name_ci_unique"),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name = normalize_tag_name(self.name)
+        super().save(*args, **kwargs)
+
+
+# ------------------------
+# Like-aware querysets
+# ------------------------
+def count_subquery(queryset, fk_name):
+    """COUNT(*) of `queryset` rows pointing at the outer row, as a scalar subquery.
+
+    Used to recompute the denormalized counters (see reconcile_counters) without
+    multiplying join rows when several counters are updated at once.
+    """
+    counted = (
+        queryset.filter(**{fk_name: OuterRef("pk")})
+        .order_by()
+        .values(fk_name)
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def sum_subquery(queryset, fk_name, field):
+    """SUM(`field`) of `queryset` rows pointing at the outer row, as a scalar subquery."""
+    summed = (
+        queryset.filter(**{fk_name: OuterRef("pk")})
+        .order_by()
+        .values(fk_name)
+        .annotate(n=Sum(field))
+        .values("n")
+    )
+    return Coalesce(Subquery(summed, output_field=IntegerField()), Value(0))
+
+
+class LikeableQuerySet(models.QuerySet):
+    """Annotates the viewer's liked flag in the list statement itself.
+
+    Like totals are persisted on the row (`like_count`), so only the per-viewer
+    EXISTS needs computing. Subclasses set `like_fk` to the through-table column
+    pointing at the model.
+    """
+    like_fk = None
+
+    def with_like_info(self, user=None):
+        through = self.model.likes.through
+        if user is not None and getattr(user, "is_authenticated", False):
+            liked = through.objects.filter(**{self.like_fk: OuterRef("pk"), "user_id": user.pk})
+            return self.annotate(viewer_liked=Exists(liked))
+        return self.annotate(viewer_liked=Value(False))
+
+
+class PostQuerySet(LikeableQuerySet):
+    like_fk = "post_id"
+
+
+class CommentQuerySet(LikeableQuerySet):
+    like_fk = "comment_id"
+
+
+class LikeCounterMixin:
+    """Idempotent like()/unlike() that keep the persisted `like_count` in step.
+
+    Each call is one conditional statement against the through-table (an
+    INSERT ... ON CONFLICT DO NOTHING or a DELETE) whose row count tells whether
+    the state changed; only then is the counter moved with an F() expression, in
+    the same transaction. No likers are loaded and double clicks cannot double
+    count. Both return True when the like state actually changed.
+    """
+
+    def _like_columns(self):
+        manager = self.likes
+        through = manager.through
+        source = through._meta.get_field(manager.source_field_name).column
+        target = through._meta.get_field(manager.target_field_name).column
+        return through, source, target
+
+    def like(self, user):
+        through, source, target = self._like_columns()
+        qn = connection.ops.quote_name
+        sql = (
+            f"INSERT INTO {qn(through._meta.db_table)} ({qn(source)}, {qn(target)}) "
+            f"VALUES (%s, %s) ON CONFLICT DO NOTHING"
+        )
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [self.pk, user.pk])
+                changed = cursor.rowcount > 0
+            if changed:
+                type(self).objects.filter(pk=self.pk).update(like_count=F("like_count") + 1)
+                self.add_author_likes(1)
+        return changed
+
+    def unlike(self, user):
+        through, source, target = self._like_columns()
+        with transaction.atomic():
+            deleted, _ = through.objects.filter(**{source: self.pk, target: user.pk}).delete()
+            if deleted:
+                type(self).objects.filter(pk=self.pk, like_count__gt=0).update(like_count=F("like_count") - 1)
+                self.add_author_likes(-1)
+        return bool(deleted)
+
+    def add_author_likes(self, delta):
+        """Move the author's `likes_received` total by `delta` (never below zero)."""
+        if self.user_id:
+            User.objects.filter(pk=self.user_id).update(
+                likes_received=Greatest(F("likes_received") + delta, Value(0))
+            )
+
+    def refresh_like_count(self):
+        self.like_count = type(self).objects.values_list("like_count", flat=True).get(pk=self.pk)
+        return self.like_count
+
 
 # ------------------------
 # Post
 # ------------------------
-class Post(models.Model):
+class Post(ImageVariantsMixin, LikeCounterMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     # Allow title to be optional so users can post images without typing text
@@ -76,40 +264,174 @@ class Post(models.Model):
     # Allow body to be empty so users can post images without text
     body = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    # Dimensions and card/full variants of the image (see forum/images.py)
+    image_meta = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(User, related_name="liked_posts", blank=True)
     tags = models.ManyToManyField(Tag, related_name="posts", blank=True)
+    # Denormalized counters, maintained by like()/unlike() and comment signals.
+    # `manage.py reconcile_counters` repairs any drift.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+    image_variant_fields = {"image": ("image_meta", "post")}
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def __str__(self):
         return self.title
     
     class Meta:
-        # Default ordering: newest posts first
-        ordering = ["-created_at"]
+        # Default ordering: newest posts first (id breaks ties for keyset pagination)
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Backs the (created_at, id) keyset cursor used by the feed
+            models.Index(fields=["-created_at", "-id"], name="post_created_id_idx"),
+            models.Index(fields=["updated_at"], name="post_updated_idx"),
+            # One author's posts, newest first (?user=, profile activity)
+            models.Index(fields=["user", "-created_at", "-id"], name="post_user_created_idx"),
+            # One category's posts, newest first (?category=)
+            models.Index(fields=["category", "-created_at", "-id"], name="post_category_created_idx"),
+            # Most liked first (popular posts without Redis, seeding popular_posts)
+            models.Index(fields=["-like_count", "-id"], name="post_like_count_idx"),
+        ]
+
+
+# ------------------------
+# Search document
+# ------------------------
+class SearchDocument(models.Model):
+    """Tokenized title/body/tags of a post, maintained by forum.search.
+
+    Matched through a GIN index on to_tsvector('simple', content) on PostgreSQL;
+    the SQLite backend keeps its documents in an FTS5 table instead.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    content = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"Search document for post {self.post_id}"
 
 
 # ------------------------
 # Comment
 # ------------------------
-class Comment(models.Model):
+class Comment(ImageVariantsMixin, LikeCounterMixin, models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     # Allow comment body to be empty when an image is provided
     body = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to="comments/", blank=True, null=True)
+    image_meta = models.JSONField(default=dict, blank=True)
     likes = models.ManyToManyField(User, related_name="liked_comments", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized like counter (see LikeCounterMixin)
+    like_count = models.PositiveIntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
+    image_variant_fields = {"image": ("image_meta", "comment")}
 
     def __str__(self):
         return f"{self.user} - {self.body[:30]}"
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="comment_updated_idx"),
+            # Keyset pages of a post's thread, in either order (CommentCursorPagination)
+            models.Index(fields=["post", "created_at", "id"], name="comment_post_created_idx"),
+            models.Index(fields=["user", "-created_at", "-id"], name="comment_user_created_idx"),
+        ]
+
+
+def user_counters():
+    """Expressions recomputing User's denormalized totals from the content tables."""
+    return {
+        "post_count": count_subquery(Post.objects.all(), "user_id"),
+        "comment_count": count_subquery(Comment.objects.all(), "user_id"),
+        "likes_received": (
+            sum_subquery(Post.objects.all(), "user_id", "like_count")
+            + sum_subquery(Comment.objects.all(), "user_id", "like_count")
+        ),
+    }
+
+
+# ------------------------
+# Post change log
+# ------------------------
+class PostChange(models.Model):
+    """Append-only log of post changes read by the delta feed (/api/posts/changes/).
+
+    `post_id` is a plain integer so a "delete" entry outlives the post as its
+    tombstone. The auto-incrementing id is the client's position in the log.
+    Entries are written by forum.changes and pruned by `manage.py prune_post_changes`.
+    """
+    UPSERT = "upsert"
+    DELETE = "delete"
+    KIND_CHOICES = [
+        (UPSERT, "Created or updated"),
+        (DELETE, "Deleted"),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    post_id = models.IntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=UPSERT)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.kind} post {self.post_id}"
+
+
+# ------------------------
+# Background jobs
+# ------------------------
+class Job(models.Model):
+    """A queued call of a function registered with forum.jobs.job.
+
+    Rows are claimed by `manage.py run_worker` with a conditional UPDATE, so
+    several workers can share the table. Timing columns feed `manage.py job_stats`.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Wall time of the last attempt, in milliseconds
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Backs the worker's "next due job" scan
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
 
 
 # ------------------------
@@ -136,6 +458,17 @@ class Report(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            # Moderation queue: open reports first, newest first
+            models.Index(fields=["resolved", "-created_at", "-id"], name="report_resolved_created_idx"),
+            # Open reports only. filter(resolved=False) compiles to NOT "resolved",
+            # which SQLite cannot match against the index above.
+            models.Index(
+                fields=["-created_at", "-id"], condition=Q(resolved=False), name="report_open_created_idx"
+            ),
+        ]
+
     def __str__(self):
         target = self.post or self.comment
         return f"Report by {self.user} on {target}"
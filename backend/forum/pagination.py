@@ -0,0 +1,178 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ------------------------
+# Keyset (cursor) pagination
+# ------------------------
+def keyset_filter(field, value, pk, descending=True):
+    """Rows after (value, pk) when ordered on (`field`, id).
+
+    The OR alone is not an index range: planners walk the (field, id) index from
+    its start and filter. The redundant `field <= value` (>= ascending) bound
+    lets them seek to the cursor first, so deep pages cost the same as page 1.
+    """
+    op, bound = ('lt', 'lte') if descending else ('gt', 'gte')
+    return Q(**{f'{field}__{bound}': value}) & (
+        Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+    )
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination on (<timestamp field>, id).
+
+    Unlike OFFSET pagination, every page is fetched with a
+    `WHERE (created_at, id) < (:t, :id) ORDER BY created_at DESC, id DESC LIMIT n`
+    style query, so page N costs the same as page 1 as long as a composite
+    index on (created_at, id) exists. The id tie-breaker keeps the cursor stable
+    when several rows share the same timestamp or new rows are inserted while
+    a client is paging.
+
+    Cursors are opaque base64 tokens: {"v": <timestamp>, "i": <id>, "r": <reverse>}.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # Timestamp field to page on; the primary key is always the tie-breaker
+    ordering_field = 'created_at'
+    # Newest first by default; subclasses/views may flip this
+    descending = True
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_descending(self, request, view):
+        return self.descending
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is not None:
+            try:
+                size = int(raw)
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (TypeError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.descending = self.get_descending(request, view)
+        field = self.ordering_field
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+
+        # Walking backwards (previous page) means scanning in the opposite direction
+        scan_descending = self.descending != reverse
+        prefix = '-' if scan_descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+        if cursor is not None:
+            queryset = queryset.filter(keyset_filter(field, cursor['v'], cursor['i'], scan_descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            # We came from a later page, so there is always something after this one
+            self.has_next = bool(rows)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None and bool(rows)
+
+        self.page = rows
+        return rows
+
+    # -- cursor encoding -------------------------------------------------
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            value = parse_datetime(data['v'])
+            if value is None:
+                raise ValueError('bad timestamp')
+            return {'v': value, 'i': int(data['i']), 'r': bool(data.get('r', False))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse=False):
+        value = getattr(obj, self.ordering_field)
+        payload = {'v': value.isoformat(), 'i': obj.pk}
+        if reverse:
+            payload['r'] = True
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        token = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PostCursorPagination(KeysetCursorPagination):
+    """Newest-first feed pagination on (created_at, id)."""
+    page_size = 20
+
+
+class CommentCursorPagination(KeysetCursorPagination):
+    """Comment thread pagination on (created_at, id), ?order=newest|oldest.
+
+    Both directions walk the same (post, created_at, id) index, so loading more
+    of a long thread costs the same at comment 10,000 as at comment 20.
+    """
+    page_size = 20
+    order_query_param = 'order'
+
+    def get_descending(self, request, view):
+        return request.query_params.get(self.order_query_param, 'newest') != 'oldest'
+
+
+class SearchPagination(PageNumberPagination):
+    """Page-number pagination for rank-ordered search results (?page=<n>)."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
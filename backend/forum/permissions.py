@@ -1,5 +1,21 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+def is_admin(user):
+    """
+    role == 'admin', staff หรือ superuser
+    Reads only fields of the lean cached user (forum/authentication.py).
+    """
+    return bool(
+        user and
+        getattr(user, "is_authenticated", False) and
+        (
+            getattr(user, "role", None) == "admin"
+            or getattr(user, "is_staff", False)
+            or getattr(user, "is_superuser", False)
+        )
+    )
+
+
 # ------------------------
 # Admin Only
 # ------------------------
@@ -8,16 +24,7 @@ class IsAdminUser(BasePermission):
     อนุญาตเฉพาะผู้ใช้ที่ role == 'admin'
     """
     def has_permission(self, request, view):
-        user = request.user
-        return bool(
-            user and
-            getattr(user, "is_authenticated", False) and
-            (
-                getattr(user, "role", None) == "admin"
-                or getattr(user, "is_staff", False)
-                or getattr(user, "is_superuser", False)
-            )
-        )
+        return is_admin(request.user)
 
 # ------------------------
 # Owner or Admin
@@ -32,19 +39,18 @@ class IsOwnerOrAdmin(BasePermission):
             return True
         # Admin ได้สิทธิ์เต็ม
         user = request.user
-        if (
-            getattr(user, "role", None) == "admin"
-            or getattr(user, "is_staff", False)
-            or getattr(user, "is_superuser", False)
-        ):
+        if is_admin(user):
             return True
+        if not getattr(user, "is_authenticated", False):
+            return False
 
         # ถ้า object มี field user (เช่น Post, Comment)
-        if hasattr(obj, "user"):
-            return obj.user == request.user
+        # Compare ids: loading obj.user would cost a query per check
+        if hasattr(obj, "user_id"):
+            return obj.user_id == user.pk
 
         # ถ้า object เป็น User เอง (profile)
-        if obj == request.user:
+        if obj._meta.model is user._meta.model and obj.pk == user.pk:
             return True
 
         return False
@@ -0,0 +1,142 @@
+"""
+Process-local snapshot of the reference data: categories and tags.
+
+Both tables are small and rarely change, yet they are read on every post write
+(category_id, category given by name), every ?tag= / ?category= filter and every
+category or tag validation. `get()` returns an immutable `Snapshot` built with
+two queries and kept in process memory.
+
+Each snapshot remembers the shared version counter (VERSION_KEY in the default
+cache) it was built under. Saving or deleting a category or tag bumps the
+counter once the transaction commits (see forum/signals.py), which also drops
+this process's copy; other processes compare their version at most every
+REFDATA_CHECK_INTERVAL seconds, which bounds how long they serve a stale copy.
+If the cache is down the snapshot is simply rebuilt once per interval.
+
+Inside a transaction the snapshot is loaded fresh and not kept: it may contain
+uncommitted (or later rolled back) rows that other requests must not see.
+
+Snapshot entries are shared model instances: read them, never modify them.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "refdata:ver"
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+
+
+def get_check_interval():
+    return getattr(settings, "REFDATA_CHECK_INTERVAL", 2.0)
+
+
+class Snapshot:
+    def __init__(self, version, categories, tags):
+        self.version = version
+        self.categories = tuple(categories)
+        self.tags = tuple(tags)
+        self.categories_by_id = {c.pk: c for c in self.categories}
+        self.tags_by_id = {t.pk: t for t in self.tags}
+        self.category_ids_by_name = {}
+        for category in self.categories:
+            # Category names are not unique in the schema; the oldest wins, as with .first()
+            self.category_ids_by_name.setdefault(category.name.lower(), category.pk)
+        self.tag_ids_by_name = {t.name.lower(): t.pk for t in self.tags}
+
+    def category_named(self, name):
+        """The category named `name` (case-insensitively), or None."""
+        return self.categories_by_id.get(self.category_ids_by_name.get(str(name).strip().lower()))
+
+    def tag_named(self, name):
+        return self.tags_by_id.get(self.tag_ids_by_name.get(str(name).strip().lower()))
+
+    def category(self, value):
+        """The category with id `value` if it is numeric, else named `value`."""
+        if str(value).isdigit():
+            return self.categories_by_id.get(int(value))
+        return self.category_named(value)
+
+    def tag(self, value):
+        if str(value).isdigit():
+            return self.tags_by_id.get(int(value))
+        return self.tag_named(value)
+
+    def category_ids(self, values):
+        """Ids of the categories named or numbered in `values`; unknown ones are dropped."""
+        return {c.pk for c in map(self.category, values) if c is not None}
+
+    def tag_ids(self, values):
+        return {t.pk for t in map(self.tag, values) if t is not None}
+
+
+def _load(version):
+    from .models import Category, Tag
+    return Snapshot(
+        version,
+        Category.objects.order_by("id"),
+        Tag.objects.order_by("id").only("id", "name"),
+    )
+
+
+def _shared_version():
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Seeded from the clock so an evicted counter never repeats an old value
+            version = time.time_ns() // 1000
+            if not cache.add(VERSION_KEY, version, None):
+                version = cache.get(VERSION_KEY, version)
+        return version
+    except Exception:
+        return None
+
+
+def get():
+    """The current snapshot, rebuilt when another process changed the data."""
+    global _snapshot, _checked_at
+    if transaction.get_connection().in_atomic_block:
+        return _load(None)
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < get_check_interval():
+        return snapshot
+    version = _shared_version()
+    if snapshot is None or version is None or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or version is None or snapshot.version != version:
+                # The version is read before the rows: a write committing in between
+                # bumps it again, so this copy is replaced at the next check.
+                snapshot = _snapshot = _load(version)
+    _checked_at = now
+    return snapshot
+
+
+def clear():
+    """Forget this process's snapshot (the next get() reloads it)."""
+    global _snapshot
+    _snapshot = None
+
+
+def bump():
+    """Make every process reload the snapshot."""
+    clear()
+    try:
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns() // 1000, None)
+    except Exception:
+        # Cache down: other processes rebuild every interval anyway
+        pass
+
+
+def bump_on_commit():
+    """Categories or tags were written in the current transaction."""
+    transaction.on_commit(bump)
@@ -0,0 +1,268 @@
+"""
+Versioned response cache for read endpoints.
+
+Every cacheable resource ("posts", "comments", "tags", "categories", "users") has
+a generation counter in the default cache. A cached response is stored under a
+key built from the view, the host, the path, the normalized query string and the
+generations of every resource the response depends on::
+
+    resp:<view>:<gen>-<gen>-...:<sha1(host + path + query)>
+
+Writes never delete entries; signals (see forum/signals.py) bump the affected
+generations after the transaction commits, so the next read builds a new key and
+old entries simply expire. Invalidation is O(1) regardless of how many pages,
+filters or search terms were cached.
+
+The stored body is viewer independent: `liked_by_user` is reset before storing
+and, for authenticated viewers, overlaid again from the like tables (and the
+write-behind buffer) in one query per model.
+
+The same generations double as HTTP validators: responses carry an ETag derived
+from the cache key and the viewer, and a Last-Modified taken from the latest bump
+of their resources. A matching If-None-Match / If-Modified-Since is answered with
+304 Not Modified before any serializer runs; list views skip the database
+entirely, detail views run one EXISTS query for the requested object first.
+"""
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import like_buffer
+from .utils import CommitBatch
+
+GENERATION_KEY = "resp:gen:{}"
+MODIFIED_KEY = "resp:modified:{}"
+
+
+def get_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+# ------------------------
+# Generations
+# ------------------------
+def _fresh_generation():
+    # Seeded from the clock so an evicted counter never repeats an old value
+    return time.time_ns() // 1000
+
+
+def _get_or_add(found, key, default):
+    value = found.get(key)
+    if value is None:
+        value = default
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+    return value
+
+
+def get_versions(resources):
+    """(generations, last modified timestamp) of `resources` in one round trip."""
+    gen_keys = [GENERATION_KEY.format(r) for r in resources]
+    mod_keys = [MODIFIED_KEY.format(r) for r in resources]
+    found = cache.get_many(gen_keys + mod_keys)
+    generations = [_get_or_add(found, key, _fresh_generation()) for key in gen_keys]
+    modified = [_get_or_add(found, key, int(time.time())) for key in mod_keys]
+    return generations, max(modified, default=None)
+
+
+def bump(*resources):
+    """Invalidate every cached response depending on `resources` (immediately)."""
+    for resource in resources:
+        key = GENERATION_KEY.format(resource)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _fresh_generation(), None)
+            cache.set(MODIFIED_KEY.format(resource), int(time.time()), None)
+        except Exception:
+            # Cache down: nothing is being served from it either
+            pass
+
+
+_pending_bumps = CommitBatch(lambda resources: bump(*sorted(resources)))
+
+
+def bump_on_commit(*resources):
+    """Bump once the surrounding transaction commits (deduplicated per transaction).
+
+    Bumping after the commit means a read racing with the write can at worst fill
+    the old generation, which is discarded by the bump.
+    """
+    _pending_bumps.add(resources)
+
+
+# ------------------------
+# Viewer overlay
+# ------------------------
+def _walk(data, kind):
+    """Yield (dict, kind) for every post/comment object in a serialized body."""
+    if isinstance(data, list):
+        for item in data:
+            yield from _walk(item, kind)
+    elif isinstance(data, dict):
+        if "results" in data and isinstance(data["results"], list):
+            yield from _walk(data["results"], kind)
+            return
+        if "liked_by_user" in data:
+            yield data, kind
+        if isinstance(data.get("comments"), list):
+            yield from _walk(data["comments"], "comment")
+
+
+def strip_viewer_fields(data):
+    data = copy.deepcopy(data)
+    for item, _ in _walk(data, None):
+        item["liked_by_user"] = False
+    return data
+
+
+def overlay_viewer_fields(data, kind, user):
+    """Set `liked_by_user` on a cached body for an authenticated viewer."""
+    from .models import Comment, Post
+    models = {"post": Post, "comment": Comment}
+    items = {"post": [], "comment": []}
+    for item, item_kind in _walk(data, kind):
+        if item.get("id") is not None:
+            items[item_kind].append(item)
+
+    for item_kind, objs in items.items():
+        if not objs:
+            continue
+        model = models[item_kind]
+        ids = [o["id"] for o in objs]
+        liked = set(
+            model.likes.through.objects.filter(user_id=user.pk, **{f"{item_kind}_id__in": ids})
+            .values_list(f"{item_kind}_id", flat=True)
+        )
+        if like_buffer.is_enabled():
+            liked = like_buffer.viewer_overlay(item_kind, ids, user, liked)
+        for obj in objs:
+            obj["liked_by_user"] = obj["id"] in liked
+    return data
+
+
+# ------------------------
+# View mixin
+# ------------------------
+class CachedResponseMixin:
+    """Serve `list`/`retrieve` (and actions wrapped in `cached_response`) from the
+    cache, with ETag / Last-Modified validators.
+
+    `cache_resources` lists the generations a response depends on (override
+    `get_cache_resources` to vary it per action) and `cache_kind` ("post" or
+    "comment") names the top-level objects for the `liked_by_user` overlay.
+    """
+    cache_resources = ()
+    cache_kind = None
+
+    def get_cache_resources(self):
+        return self.cache_resources
+
+    def object_exists(self):
+        """Whether the object a detail request names exists; checked before a 304.
+
+        The validators only cover the generations, so without this check any
+        If-Modified-Since would get a 304 for an id that was never there.
+        """
+        lookup_field = getattr(self, "lookup_field", None)
+        lookup_url_kwarg = getattr(self, "lookup_url_kwarg", None) or lookup_field
+        if not lookup_url_kwarg or lookup_url_kwarg not in self.kwargs:
+            return True
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            return queryset.filter(**{lookup_field: self.kwargs[lookup_url_kwarg]}).exists()
+        except (TypeError, ValueError, ValidationError):
+            return False
+
+    def should_cache_response(self, request):
+        return request.method == "GET" and get_timeout() > 0
+
+    def get_cache_key(self, request, generations):
+        query = sorted(
+            (k, v) for k in request.query_params for v in request.query_params.getlist(k)
+        )
+        raw = "|".join([request.get_host(), request.path, repr(query)])
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        generations = "-".join(str(g) for g in generations)
+        action = getattr(self, "action", None) or request.method.lower()
+        return f"resp:{type(self).__name__}:{action}:{generations}:{digest}"
+
+    def get_etag(self, request, key):
+        # liked_by_user differs per viewer and the renderer per Accept header
+        viewer = request.user.pk if request.user.is_authenticated else ""
+        raw = "|".join([key, str(viewer), request.META.get("HTTP_ACCEPT", "")])
+        return 'W/"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def set_validators(self, response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        # Let browsers keep the body but revalidate it on every request
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def cached_response(self, request, render):
+        """Answer a conditional GET with 304, serve the cached body, or `render()` and store it."""
+        if request.method != "GET":
+            return render()
+        try:
+            generations, last_modified = get_versions(self.get_cache_resources())
+            key = self.get_cache_key(request, generations)
+        except Exception:
+            return render()
+        etag = self.get_etag(request, key)
+
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            if not self.object_exists():
+                raise Http404
+            return self.set_validators(not_modified, etag, last_modified)
+
+        if not self.should_cache_response(request):
+            response = render()
+            if response.status_code == 200:
+                self.set_validators(response, etag, last_modified)
+            return response
+
+        user = request.user
+        try:
+            data = cache.get(key)
+        except Exception:
+            data = None
+        if data is not None:
+            if self.cache_kind and user.is_authenticated:
+                data = overlay_viewer_fields(data, self.cache_kind, user)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return self.set_validators(response, etag, last_modified)
+
+        response = render()
+        if response.status_code == 200:
+            body = response.data
+            if self.cache_kind and user.is_authenticated:
+                body = strip_viewer_fields(body)
+            try:
+                cache.set(key, body, get_timeout())
+            except Exception:
+                pass
+            response["X-Cache"] = "MISS"
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,170 @@
+"""
+Full-text search over posts.
+
+Every post has a search document built from its title, body and tag names. The
+text is tokenized in Python first (see `tokenize`) so Thai, which is written
+without spaces between words, is split the same way at index and query time.
+The database engine then only has to match whitespace separated tokens:
+
+- PostgreSQL: `forum_searchdocument.content` with a GIN index on
+  `to_tsvector('simple', content)`, matched with `SearchQuery` and ranked
+  with `SearchRank` (ts_rank).
+- SQLite: an FTS5 table `forum_post_fts` (rowid = post id), ranked with `bm25`.
+- Anything else: substring matching on the search document, unranked.
+
+The index is kept up to date by signals (see forum/signals.py) and can be rebuilt
+with `manage.py rebuild_search_index`.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+try:
+    # Optional dictionary-based Thai word segmentation
+    from pythainlp.tokenize import word_tokenize as thai_word_tokenize
+except ImportError:  # pragma: no cover - depends on the environment
+    thai_word_tokenize = None
+
+THAI_RUN = re.compile(r"[\u0E00-\u0E7F]+")
+WORD_RUN = re.compile(r"[\u0E00-\u0E7F]+|\w+", re.UNICODE)
+FTS_TABLE = "forum_post_fts"
+
+
+# ------------------------
+# Tokenization
+# ------------------------
+def _thai_tokens(run):
+    if thai_word_tokenize is not None:
+        return [t for t in thai_word_tokenize(run, keep_whitespace=False) if t.strip()]
+    # Without a dictionary, overlapping character bigrams still give good recall
+    if len(run) < 2:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """Split text into lower-cased search tokens (Thai runs are segmented)."""
+    tokens = []
+    for run in WORD_RUN.findall((text or "").lower()):
+        if THAI_RUN.fullmatch(run):
+            tokens.extend(_thai_tokens(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def build_document(post):
+    """Space separated tokens of the post's title, body and tag names."""
+    parts = [post.title or "", post.body or ""]
+    parts.extend(tag.name for tag in post.tags.all())
+    return " ".join(tokenize(" ".join(parts)))
+
+
+# ------------------------
+# Backends
+# ------------------------
+class BaseSearchBackend:
+    """Stores documents in SearchDocument and matches them by substring."""
+
+    def index(self, posts):
+        from .models import SearchDocument
+        posts = list(posts)
+        docs = [SearchDocument(post_id=p.pk, content=build_document(p)) for p in posts]
+        SearchDocument.objects.bulk_create(
+            docs,
+            update_conflicts=True,
+            unique_fields=["post"],
+            update_fields=["content"],
+        )
+        return len(docs)
+
+    def remove(self, post_ids):
+        from .models import SearchDocument
+        SearchDocument.objects.filter(post_id__in=list(post_ids)).delete()
+
+    def clear(self):
+        from .models import SearchDocument
+        SearchDocument.objects.all().delete()
+
+    def search(self, queryset, query):
+        """Filter `queryset` to posts matching `query`, annotated with `search_rank`."""
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        match = Q()
+        for token in tokens:
+            match &= Q(search_document__content__contains=token)
+        return queryset.filter(match).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    # Must match the expression of the GIN index created in the migration
+    VECTOR = "to_tsvector('simple'::regconfig, COALESCE(forum_searchdocument.content, ''))"
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        # The vector stays raw SQL so the planner can use the expression index;
+        # the INNER JOIN from `search_document__isnull=False` provides its table
+        vector = RawSQL(self.VECTOR, [], output_field=SearchVectorField())
+        terms = SearchQuery(" ".join(tokens), config="simple", search_type="plain")
+        return (
+            queryset.filter(search_document__isnull=False)
+            .alias(search_vector=vector)
+            .filter(search_vector=terms)
+            .annotate(search_rank=SearchRank(vector, terms))
+        )
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """FTS5 backend; the virtual table holds the tokenized documents itself."""
+
+    def index(self, posts):
+        posts = list(posts)
+        rows = [(p.pk, build_document(p)) for p in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk, _ in rows])
+            cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, content) VALUES (%s, %s)", rows)
+        return len(rows)
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in post_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        # Quote every token so FTS5 treats it literally; adjacent terms are ANDed
+        match = " ".join('"%s"' % t.replace('"', '""') for t in tokens)
+        matched = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        # bm25() is lower-is-better; negate it so every backend sorts rank descending
+        rank = (
+            f"(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = forum_post.id)"
+        )
+        return queryset.filter(pk__in=RawSQL(matched, [match])).annotate(
+            search_rank=RawSQL(rank, [match], output_field=FloatField())
+        )
+
+
+def get_backend():
+    """Backend from settings.SEARCH_BACKEND, or the best one for the database."""
+    path = getattr(settings, "SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite":
+        return SqliteSearchBackend()
+    return BaseSearchBackend()
@@ -1,8 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import Post, Comment, Category, Report, Tag
+from django.db import transaction
+from . import refdata
+from .models import Post, Comment, Category, Report, Tag, find_user, normalize_tag_name
 import json
+from urllib.parse import urljoin
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
@@ -10,6 +14,55 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+# ------------------------
+# Image variants
+# ------------------------
+def absolute_media_url(url, request=None):
+    """Absolute form of a storage URL.
+
+    Built from the request when there is one; payloads made without a request
+    (live events, admin stats refreshed by the worker) use MEDIA_BASE_URL.
+    """
+    if not url:
+        return url
+    if request is not None:
+        return request.build_absolute_uri(url)
+    base = getattr(settings, "MEDIA_BASE_URL", "")
+    return urljoin(base, url) if base else url
+
+
+def image_variants(meta, request=None):
+    """srcset-ready URLs of the variants recorded by forum.images (None without variants).
+
+    {"width", "height", "srcset" (WebP), "fallback_srcset",
+     <variant>: {"webp", "fallback", "width", "height"}, ...}
+    """
+    variants = (meta or {}).get("variants")
+    if not variants:
+        return None
+    from django.core.files.storage import default_storage
+
+    def url(name):
+        return absolute_media_url(default_storage.url(name), request)
+
+    data = {"width": meta.get("width"), "height": meta.get("height")}
+    webp, fallback = [], []
+    for name, variant in variants.items():
+        item = {
+            "webp": url(variant["webp"]),
+            "fallback": url(variant["fallback"]),
+            "width": variant["width"],
+            "height": variant["height"],
+        }
+        data[name] = item
+        webp.append(f"{item['webp']} {item['width']}w")
+        fallback.append(f"{item['fallback']} {item['width']}w")
+    data["srcset"] = ", ".join(webp)
+    data["fallback_srcset"] = ", ".join(fallback)
+    return data
+
+
 # ------------------------
 # User Serializers
 # ------------------------
@@ -18,6 +71,10 @@ class UserSerializer(serializers.ModelSerializer):
     bio = serializers.CharField(required=False, allow_blank=True)
     # writable social JSON (handles JSONField or text storage)
     social = serializers.JSONField(required=False)
+    avatar_variants = serializers.SerializerMethodField()
+
+    def get_avatar_variants(self, obj):
+        return image_variants(getattr(obj, "avatar_meta", None), self.context.get("request"))
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -63,9 +120,10 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ["id", "username", "email", "bio", "avatar", "role", "is_staff", "is_active", "social"]
+        fields = ["id", "username", "email", "bio", "avatar", "avatar_variants", "role", "is_staff", "is_active", "social",
+                  "post_count", "comment_count", "likes_received"]
         # allow is_staff to be writable via API, but guard in the viewset
-        read_only_fields = ["id", "role", "is_active"]
+        read_only_fields = ["id", "role", "is_active", "post_count", "comment_count", "likes_received"]
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -98,17 +156,26 @@ class CategorySerializer(serializers.ModelSerializer):
             # If name unchanged (case-insensitive), it's fine
             if str(self.instance.name).lower() == str(value).lower():
                 return value
-            # Otherwise exclude this instance when checking uniqueness
-            if Category.objects.filter(name__iexact=value).exclude(pk=self.instance.pk).exists():
-                raise serializers.ValidationError("หมวดหมู่นี้มีอยู่แล้ว")
-            return value
 
-        # Create: ensure name doesn't already exist
-        if Category.objects.filter(name__iexact=value).exists():
+        # Names are unique case-insensitively; checked against the in-memory snapshot
+        existing = refdata.get().category_named(value)
+        if existing is not None and (self.instance is None or existing.pk != self.instance.pk):
             raise serializers.ValidationError("หมวดหมู่นี้มีอยู่แล้ว")
         return value
 
 
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """Category by id, resolved from the reference data snapshot (no query)."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not str(data).isdigit():
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        category = refdata.get().category(data)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
 # ------------------------
 # Tag Serializer
 # ------------------------
@@ -116,27 +183,118 @@ class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
+        # validate_name covers the exact-match unique check, without a query
+        extra_kwargs = {'name': {'validators': []}}
+
+    def validate_name(self, value):
+        # Tag names are unique case-insensitively (see Tag.Meta.constraints)
+        value = normalize_tag_name(value)
+        existing = refdata.get().tag_named(value)
+        if existing is not None and (self.instance is None or existing.pk != self.instance.pk):
+            raise serializers.ValidationError("แท็กนี้มีอยู่แล้ว")
+        return value
+
+
+MAX_POST_TAGS = 5
+
+
+class TagListField(serializers.Field):
+    """Post tags, [{"id", "name"}] on read.
+
+    Writes take a list of names or {"name": ...} objects, or the same list as a
+    JSON string (multipart forms). Names are validated here and resolved to
+    tags, created on demand, by PostSerializer.
+    """
+    default_error_messages = {
+        'invalid': 'แท็กต้องเป็นรายการของชื่อ/วัตถุ',
+        'too_many': f'โพสต์สามารถมีได้ไม่เกิน {MAX_POST_TAGS} Tag',
+        'too_long': 'ชื่อแท็กต้องยาวไม่เกิน {max_length} ตัวอักษร',
+    }
+
+    def to_representation(self, value):
+        return [{"id": tag.id, "name": tag.name} for tag in value.all()]
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail('invalid')
+        if not isinstance(data, (list, tuple)):
+            self.fail('invalid')
+        max_length = Tag._meta.get_field('name').max_length
+        names = {}
+        for item in data:
+            name = item.get('name') if isinstance(item, dict) else item
+            if not isinstance(name, (str, int)) or isinstance(name, bool):
+                self.fail('invalid')
+            name = normalize_tag_name(name)
+            if len(name) > max_length:
+                self.fail('too_long', max_length=max_length)
+            if name:
+                names.setdefault(name.lower(), name)
+        if len(names) > MAX_POST_TAGS:
+            self.fail('too_many')
+        return list(names.values())
+
+
+# ------------------------
+# Author / like helpers
+# ------------------------
+def user_summary(user, request=None):
+    """Small author card used by list payloads instead of the full UserSerializer.
+
+    Avatar URLs are absolute, as UserSerializer renders them (see absolute_media_url).
+    """
+    if user:
+        return {
+            "id": user.id,
+            "username": user.username,
+            "avatar": absolute_media_url(user.avatar.url, request) if user.avatar else None,
+            "avatar_variants": image_variants(getattr(user, "avatar_meta", None), request),
+        }
+    return {"id": None, "username": "Anonymous", "avatar": None, "avatar_variants": None}
+
+
+def liked_by_viewer(obj, request):
+    """Whether the requesting user likes `obj` (Post or Comment).
+
+    Uses the `viewer_liked` annotation from with_like_info() when present and
+    otherwise issues a single EXISTS query instead of loading every liker.
+    """
+    flag = getattr(obj, 'viewer_liked', None)
+    if flag is not None:
+        return bool(flag)
+    user = getattr(request, 'user', None)
+    if user and user.is_authenticated:
+        return obj.likes.filter(pk=user.pk).exists()
+    return False
 
 
 # ------------------------
 # Comment Serializers
 # ------------------------
 class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+    # Author card only: the full profile (absolute URIs, parsed social links) per
+    # comment made long threads expensive to render
+    user = serializers.SerializerMethodField()
     likes_count = serializers.IntegerField(source='total_likes', read_only=True)
     liked_by_user = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ["id", "post", "body", "image", "user", "created_at", "likes_count", "liked_by_user"]
+        fields = ["id", "post", "body", "image", "image_variants", "user", "created_at", "likes_count", "liked_by_user"]
         read_only_fields = ["id", "user", "created_at", "likes_count", "liked_by_user"]
 
+    def get_user(self, obj):
+        return user_summary(obj.user, self.context.get('request'))
+
     def get_liked_by_user(self, obj):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if user and user.is_authenticated:
-            return user in obj.likes.all()
-        return False
+        return liked_by_viewer(obj, self.context.get('request'))
+
+    def get_image_variants(self, obj):
+        return image_variants(obj.image_meta, self.context.get('request'))
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -165,13 +323,78 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+# ------------------------
+# Lightweight projections (feed/list)
+# ------------------------
+class CommentPreviewSerializer(serializers.ModelSerializer):
+    """A comment as shown under a feed card: no likes, no full author profile."""
+    user = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = ["id", "body", "image", "image_variants", "user", "created_at"]
+        read_only_fields = fields
+
+    def get_user(self, obj):
+        return user_summary(obj.user, self.context.get("request"))
+
+    def get_image_variants(self, obj):
+        return image_variants(obj.image_meta, self.context.get("request"))
+
+
+class PostListSerializer(serializers.ModelSerializer):
+    """Feed representation of a post.
+
+    Carries counters and at most `FEED_COMMENT_PREVIEWS` newest comments instead of
+    the whole comment/like graph; the full tree stays on PostSerializer (retrieve).
+    Counters come from the persisted columns. The view is expected to prefetch
+    previews into `comment_previews` and annotate like info; each falls back to a
+    per-row query otherwise.
+    """
+    user = serializers.SerializerMethodField()
+    category = CategorySerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+    like_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+    liked_by_user = serializers.SerializerMethodField()
+    latest_comments = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            "id", "user", "category", "title", "body", "image", "image_variants",
+            "created_at", "updated_at", "tags",
+            "like_count", "comment_count", "liked_by_user", "latest_comments",
+        ]
+        read_only_fields = fields
+
+    def get_user(self, obj):
+        return user_summary(obj.user, self.context.get("request"))
+
+    def get_liked_by_user(self, obj):
+        return liked_by_viewer(obj, self.context.get("request"))
+
+    def get_image_variants(self, obj):
+        return image_variants(obj.image_meta, self.context.get("request"))
+
+    def get_latest_comments(self, obj):
+        previews = getattr(obj, "comment_previews", None)
+        if previews is None:
+            from django.conf import settings
+            limit = getattr(settings, "FEED_COMMENT_PREVIEWS", 3)
+            previews = obj.comments.select_related("user").order_by("-created_at", "-id")[:limit]
+        return CommentPreviewSerializer(previews, many=True, context=self.context).data
+
+
 # ------------------------
 # Post Serializer
 # ------------------------
 class PostSerializer(serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
-    category_id = serializers.PrimaryKeyRelatedField(
+    category_id = CategoryField(
         queryset=Category.objects.all(),
         source='category',
         write_only=True,
@@ -182,13 +405,14 @@ class PostSerializer(serializers.ModelSerializer):
     likes_count = serializers.IntegerField(source="total_likes", read_only=True)
     liked_by_user = serializers.SerializerMethodField()
     likes = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
-    tags = TagSerializer(many=True, required=False)
+    tags = TagListField(required=False)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = [
             "id", "user", "category", "category_id",
-            "title", "body", "image", "comments", "created_at",
+            "title", "body", "image", "image_variants", "comments", "created_at",
             "likes", "likes_count", "total_likes",
             "liked_by_user", "tags"
         ]
@@ -198,13 +422,7 @@ class PostSerializer(serializers.ModelSerializer):
         ]
 
     def get_user(self, obj):
-        if obj.user:
-            return {
-                "id": obj.user.id,
-                "username": obj.user.username,
-                "avatar": obj.user.avatar.url if obj.user.avatar else None
-            }
-        return {"id": None, "username": "Anonymous", "avatar": None}
+        return user_summary(obj.user, self.context.get("request"))
 
     def get_social(self, obj):
         val = getattr(obj, 'social', None)
@@ -220,69 +438,10 @@ class PostSerializer(serializers.ModelSerializer):
         return val
 
     def get_liked_by_user(self, obj):
-        user = self.context.get("request").user
-        if user.is_authenticated:
-            return user in obj.likes.all()
-        return False
-
-    def validate_tags(self, value):
-        # Accept tags provided as JSON string (from multipart/form-data) or as list
-        try:
-            if isinstance(value, str):
-                import json as _json
-                value = _json.loads(value)
-        except Exception:
-            # If parsing failed, let later logic handle invalid content
-            pass
-
-        if isinstance(value, (list, tuple)):
-            if len(value) > 5:
-                raise serializers.ValidationError("โพสต์สามารถมีได้ไม่เกิน 5 Tag")
-            return value
+        return liked_by_viewer(obj, self.context.get("request"))
 
-        # If we couldn't interpret tags as a list, it's invalid
-        raise serializers.ValidationError('แท็กต้องเป็นรายการของชื่อ/วัตถุ')
-
-    def create(self, validated_data):
-        # Pull tags out (may be parsed already by DRF) or embedded as JSON string in initial_data
-        tags_data = validated_data.pop('tags', None)
-        post = super().create(validated_data)
-
-        # Support tags passed as JSON string in multipart requests
-        if tags_data is None and isinstance(getattr(self, 'initial_data', None), dict) and 'tags' in self.initial_data:
-            raw = self.initial_data.get('tags')
-            try:
-                import json as _json
-                tags_data = _json.loads(raw) if isinstance(raw, str) else raw
-            except Exception:
-                tags_data = None
-
-        if tags_data:
-            # Ensure tag count limit respected
-            if isinstance(tags_data, (list, tuple)) and len(tags_data) > 5:
-                raise serializers.ValidationError("โพสต์สามารถมีได้ไม่เกิน 5 Tag")
-            for tag in tags_data:
-                name = tag.get('name') if isinstance(tag, dict) else tag
-                if name:
-                    tag_obj, _ = Tag.objects.get_or_create(name=name)
-                    post.tags.add(tag_obj)
-
-        # Support category provided directly in form-data (e.g., 'category' or 'category_id')
-        try:
-            cat_input = None
-            if isinstance(getattr(self, 'initial_data', None), dict):
-                cat_input = self.initial_data.get('category') or self.initial_data.get('category_id')
-            if cat_input:
-                if str(cat_input).isdigit():
-                    post.category = Category.objects.get(pk=int(cat_input))
-                else:
-                    post.category = Category.objects.filter(name__iexact=str(cat_input)).first()
-                post.save()
-        except Exception:
-            # ignore category assignment errors here
-            pass
-
-        return post
+    def get_image_variants(self, obj):
+        return image_variants(obj.image_meta, self.context.get("request"))
 
     def validate(self, attrs):
         # Require at least one of title/body/image when creating/updating a post
@@ -291,45 +450,42 @@ class PostSerializer(serializers.ModelSerializer):
         image = attrs.get('image')
         if (not title or str(title).strip() == '') and (not body or str(body).strip() == '') and not image:
             raise serializers.ValidationError('โพสต์ต้องมีหัวข้อหรือเนื้อหาหรือรูปภาพอย่างน้อยหนึ่งอย่าง')
+        self.resolve_category_input(attrs)
         return attrs
 
-    def update(self, instance, validated_data):
-        tags_data = validated_data.pop('tags', None)
-        instance = super().update(instance, validated_data)
+    def resolve_category_input(self, attrs):
+        """Also accept the category by id or name under 'category' (form-data).
+
+        Resolved before saving so the post is written once.
+        """
+        data = getattr(self, 'initial_data', None)
+        if not isinstance(data, dict):
+            return
+        cat_input = data.get('category') or data.get('category_id')
+        if cat_input is None or (self.instance is None and not cat_input):
+            # An empty value only clears the category of an existing post
+            return
+        category = refdata.get().category(cat_input)
+        if category is not None or not str(cat_input).isdigit():
+            # An unknown id leaves the category alone, an unknown name clears it
+            attrs['category'] = category
 
-        # If tags not provided in parsed validated_data, attempt to read from raw initial_data (multipart)
-        if tags_data is None and isinstance(getattr(self, 'initial_data', None), dict) and 'tags' in self.initial_data:
-            raw = self.initial_data.get('tags')
-            try:
-                import json as _json
-                tags_data = _json.loads(raw) if isinstance(raw, str) else raw
-            except Exception:
-                tags_data = None
-
-        if tags_data is not None:
-            # Enforce maximum tag count
-            if isinstance(tags_data, (list, tuple)) and len(tags_data) > 5:
-                raise serializers.ValidationError("โพสต์สามารถมีได้ไม่เกิน 5 Tag")
-            instance.tags.clear()
-            for tag in tags_data:
-                name = tag.get('name') if isinstance(tag, dict) else tag
-                if name:
-                    tag_obj, _ = Tag.objects.get_or_create(name=name)
-                    instance.tags.add(tag_obj)
-
-        # Also support updating category via raw initial_data keys
-        try:
-            if isinstance(getattr(self, 'initial_data', None), dict):
-                cat_input = self.initial_data.get('category') or self.initial_data.get('category_id')
-                if cat_input is not None:
-                    if str(cat_input).isdigit():
-                        instance.category = Category.objects.get(pk=int(cat_input))
-                    else:
-                        instance.category = Category.objects.filter(name__iexact=str(cat_input)).first()
-                    instance.save()
-        except Exception:
-            pass
+    def create(self, validated_data):
+        tag_names = validated_data.pop('tags', None)
+        with transaction.atomic():
+            post = super().create(validated_data)
+            if tag_names:
+                # One SELECT (plus one INSERT for new names) for all tags, one INSERT for the links
+                post.tags.add(*Tag.objects.resolve(tag_names))
+        return post
 
+    def update(self, instance, validated_data):
+        tag_names = validated_data.pop('tags', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if tag_names is not None:
+                # set() only inserts/deletes the links that differ
+                instance.tags.set(Tag.objects.resolve(tag_names))
         return instance
 
 
@@ -374,13 +530,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             raise serializers.ValidationError('กรุณากรอกชื่อผู้ใช้/อีเมลและรหัสผ่าน')
 
         ident = str(identifier).strip()
-        # Prefer email lookup when identifier looks like an email; use case-insensitive match.
-        # Otherwise attempt a case-insensitive username lookup so users can enter different case.
-        user_obj = None
-        if '@' in ident:
-            user_obj = User.objects.filter(email__iexact=ident).first()
-        else:
-            user_obj = User.objects.filter(username__iexact=ident).first()
+        # Email lookup when identifier looks like an email, otherwise username;
+        # both case-insensitive so users can enter different case.
+        user_obj = find_user(ident)
 
         # If we found a user via email or username, resolve the exact username for authentication.
         username = user_obj.username if user_obj else ident
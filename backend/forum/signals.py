@@ -0,0 +1,328 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from django.contrib.auth import get_user_model
+
+from . import changes, jobs, live, refdata, search, tasks
+from .authentication import AUTH_USER_FIELDS, invalidate_user_on_commit
+from .models import Category, Comment, Post, Tag
+from .response_cache import bump_on_commit
+from .utils import CommitBatch, forget_post, forget_tag, record_post_event, update_tag_counts
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------
+# Denormalized comment counter
+# ------------------------
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F("comment_count") + 1)
+        post_id = instance.post_id
+        transaction.on_commit(lambda: record_post_event(post_id, "comment"))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Also fires for cascaded deletes; updating a post that is being deleted is harmless
+    if instance.post_id:
+        Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+            comment_count=F("comment_count") - 1
+        )
+
+
+# ------------------------
+# Denormalized user totals
+# ------------------------
+def _add_user_totals(user_id, **deltas):
+    if not user_id:
+        return
+    get_user_model().objects.filter(pk=user_id).update(**{
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items() if delta
+    })
+
+
+@receiver(post_save, sender=Post)
+def post_created_totals(sender, instance, created, **kwargs):
+    if created:
+        _add_user_totals(instance.user_id, post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_totals(sender, instance, **kwargs):
+    _add_user_totals(instance.user_id, post_count=-1, likes_received=-instance.like_count)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created_totals(sender, instance, created, **kwargs):
+    if created:
+        _add_user_totals(instance.user_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted_totals(sender, instance, **kwargs):
+    # Also fires for comments cascaded with their post
+    _add_user_totals(instance.user_id, comment_count=-1, likes_received=-instance.like_count)
+
+
+# ------------------------
+# Search index
+# ------------------------
+def _flush_search_index(post_ids):
+    try:
+        posts = Post.objects.filter(pk__in=post_ids).prefetch_related("tags")
+        search.get_backend().index(posts)
+    except Exception:
+        # Search must never break a write; rebuild_search_index repairs misses
+        logger.exception("Failed to index posts %s", sorted(post_ids))
+
+
+_pending_index = CommitBatch(_flush_search_index)
+
+
+def schedule_search_index(post_ids):
+    """Reindex posts once, after the surrounding transaction commits."""
+    _pending_index.add(post_ids)
+
+
+@receiver(post_save, sender=Post)
+def post_saved_index(sender, instance, **kwargs):
+    schedule_search_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed_index(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # tag.posts.add(...): instance is the Tag, pk_set the posts
+        post_ids = pk_set or list(instance.posts.values_list("pk", flat=True))
+    else:
+        post_ids = [instance.pk]
+    schedule_search_index(post_ids)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_index(sender, instance, **kwargs):
+    try:
+        search.get_backend().remove([instance.pk])
+    except Exception:
+        logger.exception("Failed to remove post %s from the search index", instance.pk)
+
+
+# ------------------------
+# Hot-post ranking
+# ------------------------
+@receiver(post_save, sender=Post)
+def post_created_rank(sender, instance, created, **kwargs):
+    if created:
+        post_id = instance.pk
+        transaction.on_commit(lambda: record_post_event(post_id, "create"))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_rank(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: forget_post(post_id))
+
+
+# ------------------------
+# Popular-tag counters
+# ------------------------
+def _tag_links(instance, reverse, pk_set):
+    """(post_id, tag_id) pairs currently linked for an m2m_changed call."""
+    through = Post.tags.through.objects
+    if reverse:
+        links = through.filter(tag_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(post_id__in=pk_set)
+    else:
+        links = through.filter(post_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(tag_id__in=pk_set)
+    return list(links.values_list("post_id", "tag_id"))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # Remember which links really exist; pk_set may name tags that were not attached
+        instance._removed_tag_links = _tag_links(instance, reverse, pk_set if action == "pre_remove" else None)
+        return
+    if action == "post_add":
+        # Django only reports the ids that were actually added
+        links = [(pk, instance.pk) for pk in pk_set] if reverse else [(instance.pk, pk) for pk in pk_set]
+        delta = 1
+    elif action in ("post_remove", "post_clear"):
+        links = getattr(instance, "_removed_tag_links", [])
+        instance._removed_tag_links = []
+        delta = -1
+    else:
+        return
+    if not links:
+        return
+    if reverse:
+        created = dict(Post.objects.filter(pk__in={p for p, _ in links}).values_list("pk", "created_at"))
+    else:
+        created = {instance.pk: instance.created_at}
+    changes = [(tag_id, created.get(post_id), delta) for post_id, tag_id in links]
+    transaction.on_commit(lambda: update_tag_counts(changes))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting_counts(sender, instance, **kwargs):
+    # Through rows are removed by the cascade without m2m_changed, so count them here
+    tag_ids = list(Post.tags.through.objects.filter(post_id=instance.pk).values_list("tag_id", flat=True))
+    if tag_ids:
+        changes = [(tag_id, instance.created_at, -1) for tag_id in tag_ids]
+        transaction.on_commit(lambda: update_tag_counts(changes))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted_counts(sender, instance, **kwargs):
+    tag_id = instance.pk
+    transaction.on_commit(lambda: forget_tag(tag_id))
+
+
+# ------------------------
+# Response cache generations
+# ------------------------
+# Which cached payloads embed each model (see response_cache.py)
+CACHE_DEPENDENCIES = {
+    Post: ("posts", "tags"),
+    Comment: ("comments", "posts"),
+    Tag: ("tags", "posts"),
+    Category: ("categories", "posts"),
+    get_user_model(): ("users",),
+}
+
+
+def _bump_cached(sender, **kwargs):
+    if kwargs.get("update_fields") and set(kwargs["update_fields"]) <= {"last_login"}:
+        return
+    bump_on_commit(*CACHE_DEPENDENCIES[sender])
+
+
+for _model in CACHE_DEPENDENCIES:
+    post_save.connect(_bump_cached, sender=_model, dispatch_uid=f"resp_cache_save_{_model.__name__}")
+    post_delete.connect(_bump_cached, sender=_model, dispatch_uid=f"resp_cache_delete_{_model.__name__}")
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed_cache(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_on_commit("posts", "tags")
+
+
+# ------------------------
+# Reference data snapshot
+# ------------------------
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reference_data_changed(sender, **kwargs):
+    refdata.bump_on_commit()
+
+
+# ------------------------
+# Delta feed change log
+# ------------------------
+@receiver(post_save, sender=Post)
+def post_saved_change(sender, instance, **kwargs):
+    changes.record([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_change(sender, instance, **kwargs):
+    changes.record([instance.pk], "delete")
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed_change(sender, instance, **kwargs):
+    # comment_count and the comment previews are part of the post payload
+    changes.record([instance.post_id])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            changes.record([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        changes.record(pk_set)
+    elif action == "pre_clear":
+        # tag.posts.clear(): the posts are only known before the clear
+        changes.record(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def reference_renamed_change(sender, instance, created, update_fields=None, **kwargs):
+    # Every post of a tag/category embeds its name; the fan-out (change log and,
+    # for tags, the search index) is O(posts), so it runs in the worker
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    jobs.delay_on_commit(tasks.refresh_renamed_posts, sender._meta.model_name, instance.pk)
+
+
+# ------------------------
+# Live push (SSE)
+# ------------------------
+def _push_comment_count(post_id):
+    count = Post.objects.filter(pk=post_id).values_list("comment_count", flat=True).first()
+    if count is not None:
+        live.post_counts(post_id, comment_count=count)
+
+
+@receiver(post_save, sender=Post)
+def post_created_live(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: live.post_created(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_live(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: live.post_deleted(post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created_live(sender, instance, created, **kwargs):
+    if created:
+        post_id = instance.post_id
+
+        def push():
+            live.comment_created(instance)
+            _push_comment_count(post_id)
+        transaction.on_commit(push)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted_live(sender, instance, **kwargs):
+    comment_id, post_id = instance.pk, instance.post_id
+
+    def push():
+        live.comment_deleted(comment_id, post_id)
+        _push_comment_count(post_id)
+    transaction.on_commit(push)
+
+
+# ------------------------
+# Cached authenticated user (forum/authentication.py)
+# ------------------------
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed_auth_cache(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and not set(update_fields) & set(AUTH_USER_FIELDS):
+        # e.g. last_login or avatar metadata: not part of the cached projection
+        return
+    invalidate_user_on_commit(instance.pk)
@@ -0,0 +1,118 @@
+"""
+Rollups behind the admin dashboard (`/api/admin/stats/`).
+
+All aggregates are computed together by `compute` and stored as one cache entry,
+so serving the dashboard is a single cache lookup. The entry is refreshed by
+`manage.py refresh_admin_stats` (run it from cron) and, when a request finds it
+older than ADMIN_STATS_MAX_AGE, by a background job while the stale copy is
+served. Only the very first request after a cache flush computes inline.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+STATS_KEY = "admin:stats"
+REFRESH_LOCK_KEY = "admin:stats:refreshing"
+DAYS = 30
+TOP = 5
+
+
+def get_max_age():
+    return getattr(settings, "ADMIN_STATS_MAX_AGE", 300)
+
+
+def _daily(queryset, field, since, days):
+    counts = dict(
+        queryset.filter(**{f"{field}__gte": since})
+        .annotate(day=TruncDate(field)).values("day")
+        .annotate(n=Count("id")).values_list("day", "n")
+    )
+    first = since.date()
+    return [
+        {"date": (first + timedelta(days=i)).isoformat(), "count": counts.get(first + timedelta(days=i), 0)}
+        for i in range(days)
+    ]
+
+
+def compute(days=DAYS, top=TOP):
+    """Every dashboard number, straight from the database."""
+    from .models import Category, Comment, Post, Report, Tag
+    from .serializers import user_summary
+    User = get_user_model()
+
+    # Midnight (local time) `days - 1` days ago, so today is the last bucket
+    since = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    top_categories = (
+        Category.objects.annotate(num_posts=Count("post")).filter(num_posts__gt=0)
+        .order_by("-num_posts", "name").values("id", "name", "num_posts")[:top]
+    )
+    top_tags = (
+        Tag.objects.annotate(num_posts=Count("posts")).filter(num_posts__gt=0)
+        .order_by("-num_posts", "name").values("id", "name", "num_posts")[:top]
+    )
+    recent_posts = (
+        Post.objects.select_related("user", "category").only(
+            "id", "title", "created_at", "user__id", "user__username", "category__name"
+        ).order_by("-created_at", "-id")[:top]
+    )
+    recent_users = User.objects.only("id", "username", "avatar", "avatar_meta").order_by("-date_joined", "-id")[:top]
+
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "generated_ts": time.time(),
+        "totals": {
+            "users": User.objects.count(),
+            "posts": Post.objects.count(),
+            "comments": Comment.objects.count(),
+            "categories": Category.objects.count(),
+            "tags": Tag.objects.count(),
+        },
+        "open_reports": Report.objects.filter(resolved=False).count(),
+        "daily": {
+            "posts": _daily(Post.objects.all(), "created_at", since, days),
+            "comments": _daily(Comment.objects.all(), "created_at", since, days),
+            "users": _daily(User.objects.all(), "date_joined", since, days),
+        },
+        "top_categories": list(top_categories),
+        "top_tags": list(top_tags),
+        "recent_posts": [
+            {
+                "id": p.pk,
+                "title": p.title,
+                "user": {"id": p.user_id, "username": p.user.username if p.user else "Anonymous"},
+                "category": p.category.name if p.category else None,
+                "created_at": p.created_at.isoformat(),
+            }
+            for p in recent_posts
+        ],
+        "recent_users": [user_summary(u) for u in recent_users],
+    }
+
+
+def refresh():
+    data = compute()
+    cache.set(STATS_KEY, data, None)
+    cache.delete(REFRESH_LOCK_KEY)
+    return data
+
+
+def get_stats():
+    """The cached rollups; a stale entry is served while a job refreshes it."""
+    try:
+        data = cache.get(STATS_KEY)
+    except Exception:
+        return compute()
+    if data is None:
+        return refresh()
+    if time.time() - data.get("generated_ts", 0) > get_max_age():
+        # One refresh at a time; the lock expires in case the job is lost
+        if cache.add(REFRESH_LOCK_KEY, 1, 600):
+            from .tasks import refresh_admin_stats
+            refresh_admin_stats.delay()
+    return data
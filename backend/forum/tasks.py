@@ -0,0 +1,71 @@
+"""
+Jobs run by `manage.py run_worker` (see forum/jobs.py).
+"""
+from django.apps import apps
+from django.core.mail import send_mail
+from django.db import transaction
+
+from .jobs import job
+
+RENAME_BATCH_SIZE = 500
+
+
+@job(max_attempts=5)
+def send_email(subject, message, from_email, recipients):
+    # fail_silently=False so SMTP errors are retried by the worker
+    send_mail(subject, message, from_email, recipients)
+
+
+@job()
+def build_image_variants(model_label, pk, field_name, meta_name, kind):
+    """Re-encode an uploaded image and write its variants (forum/images.py)."""
+    from . import changes, response_cache
+    from .images import delete_variants, refresh_variants
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only("pk", field_name, meta_name).first()
+    if instance is None:
+        return
+    name = getattr(instance, field_name).name
+    if not refresh_variants(instance, field_name, meta_name, kind):
+        return
+    # The image may have been replaced while this job waited; only record
+    # variants that still belong to the current file.
+    meta = getattr(instance, meta_name)
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(**{
+        meta_name: meta,
+        field_name: getattr(instance, field_name).name,
+    })
+    if not updated:
+        delete_variants(meta)
+        return
+    if kind == "post":
+        response_cache.bump("posts")
+        changes.record([pk])
+    else:
+        # Authors and comments are embedded in post payloads
+        response_cache.bump("comments" if kind == "comment" else "users", "posts")
+
+
+@job()
+def refresh_admin_stats():
+    from . import stats
+    stats.refresh()
+
+
+@job()
+def refresh_renamed_posts(kind, pk):
+    """Log (and for tags reindex) every post of a renamed tag or category."""
+    from . import changes
+    from .models import Post
+    from .signals import schedule_search_index
+
+    lookup = {"tag": "tags", "category": "category"}[kind]
+    post_ids = list(Post.objects.filter(**{lookup: pk}).order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(post_ids), RENAME_BATCH_SIZE):
+        batch = post_ids[start:start + RENAME_BATCH_SIZE]
+        # One change-log insert and one index call per batch
+        with transaction.atomic():
+            changes.record(batch)
+            if kind == "tag":
+                schedule_search_index(batch)
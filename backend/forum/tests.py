@@ -1,3 +1,985 @@
-from django.test import TestCase
+import asyncio
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import changes, jobs, like_buffer, live, refdata, response_cache, stats, tasks, utils
+from .benchmark import QUERY_COUNT_HEADER
+from .management.commands import benchmark_http
+from .models import Category, Comment, Job, Post, PostChange, Tag, TagQuerySet, User
+from .serializers import PostSerializer
+from .throttling import BucketRateThrottle
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+# Live events go through Redis pub/sub, which the local-memory cache lacks
+no_live_events = mock.patch("forum.live.publish", lambda *args, **kwargs: None)
+
+
+# ------------------------
+# Like write-behind buffer
+# ------------------------
+@skipUnless(fakeredis is not None, "fakeredis is required for the like buffer tests")
+@override_settings(LIKE_WRITE_BEHIND=True)
+class LikeBufferTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch.object(like_buffer, "get_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.author = User.objects.create_user("author", "author@example.com", "pw")
+        self.reader = User.objects.create_user("reader", "reader@example.com", "pw")
+        self.post = Post.objects.create(user=self.author, title="hello", body="world")
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_like_is_buffered_until_flush(self):
+        res = self.client.put(f"/api/posts/{self.post.pk}/like/")
+        self.assertEqual(res.data, {"liked": True, "total_likes": 1})
+        self.assertFalse(self.post.likes.exists())
+
+        # Reads overlay the buffer on the database
+        detail = self.client.get(f"/api/posts/{self.post.pk}/").data
+        self.assertTrue(detail["liked_by_user"])
+        self.assertEqual(detail["likes_count"], 1)
+
+        self.assertEqual(like_buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(self.post.likes.filter(pk=self.reader.pk).exists())
+        self.assertEqual(self.redis.hlen(f"likebuf:post:{self.post.pk}"), 0)
+
+    def test_repeated_intents_are_idempotent(self):
+        for _ in range(3):
+            self.client.put(f"/api/posts/{self.post.pk}/like/")
+        res = self.client.delete(f"/api/posts/{self.post.pk}/like/")
+        self.assertEqual(res.data, {"liked": False, "total_likes": 0})
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_intent_recorded_during_flush_is_not_lost(self):
+        self.client.put(f"/api/posts/{self.post.pk}/like/")
+        real_atomic = like_buffer.transaction.atomic
+
+        def unlike_mid_flush(*args, **kwargs):
+            # Simulate a click racing with the flusher's database transaction
+            like_buffer.record(self.post, self.reader, False)
+            return real_atomic(*args, **kwargs)
+
+        with mock.patch.object(like_buffer.transaction, "atomic", side_effect=unlike_mid_flush):
+            like_buffer.flush()
+        self.assertFalse(like_buffer.is_liked(self.post, self.reader))
+        self.assertEqual(like_buffer.effective_count(self.post), 0)
+
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_failed_flush_keeps_the_intents(self):
+        self.client.put(f"/api/posts/{self.post.pk}/like/")
+        through = Post.likes.through
+        with mock.patch.object(through.objects, "bulk_create", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                like_buffer.flush()
+        self.assertTrue(self.redis.sismember(like_buffer.DIRTY_KEY, f"post:{self.post.pk}"))
+        self.assertFalse(self.post.likes.exists())
+
+        self.assertEqual(like_buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(self.post.likes.filter(pk=self.reader.pk).exists())
+
+
+
+# ------------------------
+# Like endpoints
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class LikeEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw")
+        cls.reader = User.objects.create_user("reader", "reader@example.com", "pw")
+        cls.post = Post.objects.create(user=cls.author, title="hello")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_put_and_delete_are_idempotent(self):
+        url = f"/api/posts/{self.post.pk}/like/"
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.put(url)
+            self.assertEqual(res.data, {"liked": True, "total_likes": 1})
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.likes_received, 1)
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.delete(url)
+            self.assertEqual(res.data, {"liked": False, "total_likes": 0})
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.likes_received, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_repeated_like_does_not_bump_the_cache(self):
+        url = f"/api/posts/{self.post.pk}/like/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url)
+        before = response_cache.get_versions(["posts"])[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url)
+        self.assertEqual(response_cache.get_versions(["posts"])[0], before)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_feed_like_fields_do_not_scale_with_likers(self):
+        other = Post.objects.create(user=self.author, title="other")
+        self.post.like(self.reader)
+
+        def feed():
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get("/api/posts/")
+            return {p["id"]: (p["like_count"], p["liked_by_user"]) for p in res.data["results"]}, len(queries)
+
+        items, count = feed()
+        self.assertEqual(items, {self.post.pk: (1, True), other.pk: (0, False)})
+        for i in range(5):
+            other.like(User.objects.create_user(f"fan{i}", f"fan{i}@example.com", "pw"))
+        items, more_likers = feed()
+        self.assertEqual(items, {self.post.pk: (1, True), other.pk: (5, False)})
+        self.assertEqual(more_likers, count)
+
+# ------------------------
+# Post tag writes
+# ------------------------
+class PostTagWriteTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user("author", "author@example.com", "pw")
+        self.category = Category.objects.create(name="General")
+        self.python = Tag.objects.create(name="python")
+        self.django = Tag.objects.create(name="django")
+
+    def save(self, data, instance=None, **kwargs):
+        serializer = PostSerializer(instance, data=data, partial=instance is not None)
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            post = serializer.save(**kwargs)
+        return post, [q["sql"] for q in queries.captured_queries]
+
+    def test_create_upserts_tags_in_bulk(self):
+        post, queries = self.save(
+            {"title": "hello", "tags": ["Python", {"name": "django"}, "New tag", "new  TAG"]},
+            user=self.author,
+        )
+        # savepoint, post INSERT, author totals, tag SELECT + INSERT + SELECT,
+        # link SELECT + INSERT, release
+        self.assertEqual(len(queries), 9)
+        self.assertEqual(
+            sorted(post.tags.values_list("name", flat=True)), ["New tag", "django", "python"]
+        )
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_existing_tags_cost_one_select(self):
+        _, queries = self.save({"title": "hello", "tags": ["PYTHON", "Django"]}, user=self.author)
+        self.assertEqual(len(queries), 7)
+        self.assertEqual(sum(sql.startswith('SELECT "forum_tag"') for sql in queries), 1)
+
+    def test_update_writes_the_post_once(self):
+        post = Post.objects.create(user=self.author, title="hello")
+        post.tags.add(self.python)
+        post, queries = self.save(
+            {"title": "edited", "category": "general", "tags": ["django"]}, instance=post
+        )
+        self.assertEqual(sum(sql.startswith('UPDATE "forum_post"') for sql in queries), 1)
+        self.assertEqual(post.category, self.category)
+        self.assertEqual(list(post.tags.all()), [self.django])
+
+    def test_json_post_with_existing_tag(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        res = client.post(
+            "/api/posts/", {"title": "hello", "tags": [{"name": "python"}]}, format="json"
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data["tags"], [{"id": self.python.pk, "name": "python"}])
+
+    def test_resolve_picks_up_a_tag_created_concurrently(self):
+        real_bulk_create = TagQuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, **kwargs):
+            # Another request creates "Rust" between our SELECT and INSERT
+            Tag.objects.create(name="Rust")
+            return real_bulk_create(queryset, objs, **kwargs)
+
+        with mock.patch.object(TagQuerySet, "bulk_create", racing_bulk_create):
+            tags = Tag.objects.resolve(["rust", " Django ", "new", "RUST"])
+        self.assertEqual([t.name for t in tags], ["Rust", "django", "new"])
+        self.assertTrue(all(t.pk for t in tags))
+        self.assertEqual(Tag.objects.count(), 4)
+
+
+# ------------------------
+# Response cache
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw")
+
+    def generation(self):
+        return response_cache.get_versions(["posts"])[0][0]
+
+    def test_bump_after_a_rolled_back_write(self):
+        before = self.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Post.objects.create(user=self.author, title="rolled back")
+                    raise RuntimeError
+        self.assertEqual(self.generation(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.author, title="committed")
+        self.assertNotEqual(self.generation(), before)
+
+    def test_etag_revalidation_until_a_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.author, title="first")
+        client = APIClient()
+        res = client.get("/api/posts/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Cache"], "MISS")
+        etag = res["ETag"]
+
+        self.assertEqual(client.get("/api/posts/")["X-Cache"], "HIT")
+        with self.assertNumQueries(0):
+            res = client.get("/api/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.author, title="second")
+        res = client.get("/api/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(res.data["results"][0]["id"], post.pk)
+
+    def test_detail_304_only_for_an_existing_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.author, title="here")
+        client = APIClient()
+        since = client.get(f"/api/posts/{post.pk}/")["Last-Modified"]
+        with mock.patch("forum.views.record_post_event") as record:
+            res = client.get(f"/api/posts/{post.pk}/", HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(res.status_code, 304)
+            record.assert_called_once_with(post.pk, "view")
+            record.reset_mock()
+
+            for pk in (post.pk + 1000, "abc"):
+                res = client.get(f"/api/posts/{pk}/", HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(res.status_code, 404)
+            record.assert_not_called()
+
+
+# ------------------------
+# Post change feed
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+@override_settings(POST_CHANGES_SETTLE_SECONDS=0)
+class PostChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw")
+
+    def test_rolled_back_write_does_not_stop_the_log(self):
+        client = APIClient()
+        since = client.get("/api/posts/changes/").data["next"]
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Post.objects.create(user=self.author, title="rolled back")
+                    raise RuntimeError
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.author, title="committed")
+
+        res = client.get("/api/posts/changes/", {"since": since})
+        self.assertEqual([p["id"] for p in res.data["results"]], [post.pk])
+        self.assertEqual(res.data["deleted"], [])
+
+        post_id = post.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        res = client.get("/api/posts/changes/", {"since": res.data["next"]})
+        self.assertEqual(res.data["deleted"], [post_id])
+
+    @override_settings(POST_CHANGES_SETTLE_SECONDS=5)
+    def test_token_does_not_pass_a_change_that_commits_late(self):
+        now = timezone.now()
+        PostChange.objects.create(id=10, post_id=1)
+        PostChange.objects.filter(id=10).update(created_at=now - timedelta(seconds=60))
+        # id 12 is visible while id 11 is still in flight
+        PostChange.objects.create(id=12, post_id=3)
+
+        updated, _, last_id, _ = changes.read(9, 100)
+        self.assertEqual((updated, last_id), ([1], 10))
+        self.assertEqual(changes.decode_token(changes.head()), 10)
+
+        PostChange.objects.create(id=11, post_id=2)
+        with mock.patch("forum.changes.timezone.now", return_value=now + timedelta(seconds=10)):
+            updated, _, last_id, has_more = changes.read(last_id, 100)
+        self.assertEqual((updated, last_id, has_more), ([2, 3], 12, False))
+
+    def test_rename_fans_out_in_a_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name="python")
+            posts = [Post.objects.create(user=self.author, title=f"post {i}") for i in range(3)]
+            tag.posts.add(*posts[:2])
+        start = PostChange.objects.order_by("-id").values_list("id", flat=True).first()
+
+        with override_settings(JOBS_EAGER=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.name = "Python 3"
+                tag.save()
+        self.assertFalse(PostChange.objects.filter(id__gt=start).exists())
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.args), ("forum.tasks.refresh_renamed_posts", ["tag", tag.pk]))
+
+        backend = mock.Mock()
+        with mock.patch("forum.search.get_backend", return_value=backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.refresh_renamed_posts(*job.args)
+        updated, _, _, _ = changes.read(start, 100)
+        self.assertEqual(sorted(updated), [posts[0].pk, posts[1].pk])
+        self.assertEqual(sorted(p.pk for p in backend.index.call_args.args[0]), sorted(updated))
+
+
+# ------------------------
+# Search index
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw")
+
+    def test_indexing_resumes_after_a_rolled_back_write(self):
+        backend = mock.Mock()
+        with mock.patch("forum.search.get_backend", return_value=backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        Post.objects.create(user=self.author, title="rolled back")
+                        raise RuntimeError
+            backend.index.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(user=self.author, title="committed")
+        backend.index.assert_called_once()
+        self.assertEqual([p.pk for p in backend.index.call_args.args[0]], [post.pk])
+
+
+# ------------------------
+# Cursor pagination
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author", "author@example.com", "pw")
+        cls.posts = [Post.objects.create(user=author, title=f"post {i}") for i in range(7)]
+        # Five posts share one timestamp: only the id tie-breaker orders them
+        same = cls.posts[1].created_at
+        Post.objects.filter(pk__in=[p.pk for p in cls.posts[1:6]]).update(created_at=same)
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            pages.append([p["id"] for p in res.data["results"]])
+            url = res.data[link]
+        return pages
+
+    def test_next_and_previous_are_stable_across_ties(self):
+        newest_first = sorted((p.pk for p in self.posts), reverse=True)
+        pages = self.walk("/api/posts/?page_size=2", "next")
+        self.assertEqual(sum(pages, []), newest_first)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+        last = self.client.get("/api/posts/?page_size=2")
+        for _ in range(3):
+            last = self.client.get(last.data["next"])
+        back = self.walk(last.data["previous"], "previous")
+        self.assertEqual(back, pages[-2::-1])
+
+
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw", avatar="avatars/a.png")
+        cls.post = Post.objects.create(user=cls.author, title="thread")
+        cls.comments = [Comment.objects.create(post=cls.post, user=cls.author, body=f"c{i}") for i in range(5)]
+
+    def test_author_avatar_is_absolute(self):
+        res = self.client.get("/api/comments/", {"post": self.post.pk})
+        self.assertEqual(res.data["results"][0]["user"]["avatar"], "http://testserver/media/avatars/a.png")
+
+    def walk(self, order):
+        ids, url, params = [], "/api/comments/", {"post": self.post.pk, "order": order, "page_size": 2}
+        while url:
+            res = self.client.get(url, params)
+            ids += [c["id"] for c in res.data["results"]]
+            url, params = res.data["next"], None
+        return ids
+
+    def test_thread_pages_in_both_orders(self):
+        oldest_first = [c.pk for c in self.comments]
+        self.assertEqual(self.walk("oldest"), oldest_first)
+        self.assertEqual(self.walk("newest"), oldest_first[::-1])
+
+    def test_new_comments_do_not_shift_the_next_page(self):
+        res = self.client.get("/api/comments/", {"post": self.post.pk, "page_size": 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.author, body="late")
+        more = self.client.get(res.data["next"])
+        self.assertEqual([c["id"] for c in more.data["results"]], [self.comments[2].pk, self.comments[1].pk])
+
+    @override_settings(MEDIA_BASE_URL="https://forum.example.com")
+    def test_request_less_payloads_use_media_base_url(self):
+        published = []
+        with mock.patch("forum.live.publish", lambda event, data, channels: published.append(data)):
+            live.comment_created(self.comments[0])
+        self.assertEqual(published[0]["user"]["avatar"], "https://forum.example.com/media/avatars/a.png")
+
+
+
+
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProfileActivityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", "author@example.com", "pw")
+        cls.other = User.objects.create_user("other", "other@example.com", "pw")
+        cls.posts = [Post.objects.create(user=cls.author, title=f"post {i}") for i in range(3)]
+        Post.objects.create(user=cls.other, title="not theirs")
+        cls.comments = [Comment.objects.create(post=cls.posts[0], user=cls.author, body=f"c{i}") for i in range(3)]
+        Comment.objects.create(post=cls.posts[0], user=cls.other, body="not theirs")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+
+    def test_activity_pages_posts_and_comments_separately(self):
+        url = f"/api/users/{self.author.pk}/activity/"
+        res = self.client.get(url, {"page_size": 2})
+        self.assertEqual(res.data["totals"], {"posts": 3, "comments": 3, "likes_received": 0})
+        self.assertEqual([p["id"] for p in res.data["posts"]["results"]], [self.posts[2].pk, self.posts[1].pk])
+        self.assertEqual([c["id"] for c in res.data["comments"]["results"]],
+                         [self.comments[2].pk, self.comments[1].pk])
+
+        # Following the posts cursor keeps the comments on their first page
+        more = self.client.get(res.data["posts"]["next"])
+        self.assertEqual([p["id"] for p in more.data["posts"]["results"]], [self.posts[0].pk])
+        self.assertIsNone(more.data["posts"]["next"])
+        self.assertEqual(more.data["comments"]["results"], res.data["comments"]["results"])
+
+    def test_post_list_filters_by_author(self):
+        res = self.client.get("/api/posts/", {"user": self.author.pk})
+        self.assertEqual([p["id"] for p in res.data["results"]], [p.pk for p in reversed(self.posts)])
+
+# ------------------------
+# Image variants
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES, JOBS_EAGER=True)
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user("author", "author@example.com", "pw")
+
+    def upload(self):
+        from PIL import Image
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = "Camera maker"
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 800), "red").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_is_stripped_and_gets_variants(self):
+        from PIL import Image
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.author, title="photo", image=self.upload())
+        post.refresh_from_db()
+        meta = post.image_meta
+        # Orientation applied before the metadata was dropped
+        self.assertEqual((meta["width"], meta["height"]), (800, 1200))
+        with Image.open(post.image.path) as original:
+            self.assertEqual(len(original.getexif()), 0)
+            self.assertEqual(original.size, (800, 1200))
+        card = meta["variants"]["card"]
+        self.assertEqual((card["width"], card["height"]), (427, 640))
+        for name in (card["webp"], card["fallback"]):
+            self.assertTrue(default_storage.exists(name))
+
+        data = self.client.get(f"/api/posts/{post.pk}/").data["image_variants"]
+        self.assertEqual(data["card"]["webp"], f"http://testserver/media/{card['webp']}")
+        self.assertTrue(data["srcset"].endswith(" 800w"))
+
+# ------------------------
+# Rankings
+# ------------------------
+@skipUnless(fakeredis is not None, "fakeredis is required for the ranking tests")
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class PopularPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author", "author@example.com", "pw")
+        cls.posts = [Post.objects.create(user=author, title=f"post {i}") for i in range(4)]
+        for post, likes in zip(cls.posts, (3, 7, 0, 5)):
+            Post.objects.filter(pk=post.pk).update(like_count=likes)
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch("forum.utils.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def popular_ids(self):
+        res = self.client.get("/api/posts/popular/", {"limit": 4})
+        self.assertEqual(res.status_code, 200)
+        return [p["id"] for p in res.data]
+
+    def test_first_like_on_a_fresh_redis_does_not_hide_the_rest(self):
+        utils.set_popular_score(self.posts[0].pk, 4)
+        expected = [self.posts[1].pk, self.posts[3].pk, self.posts[0].pk, self.posts[2].pk]
+        self.assertEqual(self.popular_ids(), expected)
+        # Seeded once; the score from the like event wins over the database's
+        self.assertEqual(self.redis.zscore(utils.POPULAR_POSTS_KEY, self.posts[0].pk), 4)
+        self.assertEqual(self.redis.zcard(utils.POPULAR_POSTS_KEY), 3)
+
+
+@skipUnless(fakeredis is not None, "fakeredis is required for the ranking tests")
+@override_settings(HOT_POSTS_HALF_LIFE=3600, HOT_POST_WEIGHTS={"create": 1.0, "like": 1.0, "unlike": -1.0})
+class HotPostsTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch("forum.utils.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1_000_000.0
+        self.redis.set(utils.HOT_POSTS_EPOCH_KEY, self.now)
+
+    def score(self, post_id):
+        return self.redis.zscore(utils.HOT_POSTS_KEY, post_id) or 0
+
+    def test_unlike_takes_back_exactly_its_like(self):
+        utils.add_hot_post(1, 1.0, now=self.now)
+        utils.add_hot_post(1, 1.0, now=self.now + 60, liker=7)
+        utils.add_hot_post(1, -1.0, now=self.now + 3 * 3600, liker=7, undo=True)
+        # Only the create is left, not create + like - (a like weighed hours later)
+        self.assertAlmostEqual(self.score(1), 1.0)
+
+        # A second unlike has no like to take back
+        utils.add_hot_post(1, -1.0, now=self.now + 4 * 3600, liker=7, undo=True)
+        self.assertAlmostEqual(self.score(1), 1.0)
+
+    def test_score_never_goes_negative(self):
+        utils.add_hot_post(2, 1.0, now=self.now)
+        utils.add_hot_post(2, -1.0, now=self.now + 5 * 3600)
+        self.assertEqual(self.score(2), 0)
+
+
+
+@skipUnless(fakeredis is not None, "fakeredis is required for the ranking tests")
+class PopularTagsTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch("forum.utils.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_windows_count_posts_created_in_them(self):
+        now = timezone.now()
+        utils.update_tag_counts(
+            [(1, now, 1)] * 2
+            + [(2, now - timedelta(days=3), 1)] * 3
+            + [(3, now - timedelta(days=10), 1)] * 4
+            # A post removed again only moves its own bucket
+            + [(1, now - timedelta(hours=30), 1), (1, now - timedelta(hours=30), -1)]
+        )
+        self.assertEqual(utils.get_popular_tags(5), [(3, 4), (2, 3), (1, 2)])
+        self.assertEqual(utils.get_popular_tags(5, "24h"), [(1, 2)])
+        self.assertEqual(utils.get_popular_tags(5, "7d"), [(2, 3), (1, 2)])
+        # Hourly buckets outlive the widest window
+        ttl = self.redis.ttl(f"tag_counts:h:{int(now.timestamp()) // utils.TAG_BUCKET_SECONDS}")
+        self.assertGreater(ttl, 7 * 24 * 3600)
+
+
+# ------------------------
+# Live push
+# ------------------------
+@skipUnless(fakeredis is not None, "fakeredis is required for the live tests")
+class LiveBrokerTests(SimpleTestCase):
+    def channels(self, query):
+        return live.stream_channels(RequestFactory().get("/api/live/", query))
+
+    def test_stream_channels(self):
+        self.assertEqual(
+            self.channels({"post": ["12,40", "12"]}),
+            [live.FEED_CHANNEL, "live:post:12", "live:post:40"],
+        )
+        self.assertEqual(self.channels({"post": "7", "feed": "0"}), ["live:post:7"])
+        self.assertEqual(self.channels({"feed": "0"}), [])
+        self.assertIsNone(self.channels({"post": "abc"}))
+        self.assertIsNone(self.channels({"post": ",".join(map(str, range(live.MAX_POSTS_PER_STREAM + 1)))}))
+
+    async def test_one_connection_fans_out_to_every_stream(self):
+        server = fakeredis.FakeServer()
+        broker = live.Broker(fakeredis.FakeAsyncRedis(server=server))
+        feed_only, with_post = asyncio.Queue(), asyncio.Queue()
+        await broker.subscribe([live.FEED_CHANNEL], feed_only)
+        await broker.subscribe([live.FEED_CHANNEL, live.post_channel(1)], with_post)
+        try:
+            with mock.patch("forum.utils.get_redis", return_value=fakeredis.FakeRedis(server=server)):
+                live.post_deleted(5)
+                live.comment_deleted(9, 1)
+            deleted = 'event: post_deleted\ndata: {"id":5}\n\n'
+            self.assertEqual(await asyncio.wait_for(feed_only.get(), 5), deleted)
+            self.assertEqual(await asyncio.wait_for(with_post.get(), 5), deleted)
+            self.assertEqual(
+                await asyncio.wait_for(with_post.get(), 5),
+                'event: comment_deleted\ndata: {"id":9,"post":1}\n\n',
+            )
+            self.assertTrue(feed_only.empty())
+
+            # The post channel is dropped with its last local subscriber
+            await broker.unsubscribe([live.FEED_CHANNEL, live.post_channel(1)], with_post)
+            self.assertEqual(set(broker.subscribers), {live.FEED_CHANNEL})
+        finally:
+            broker.reader.cancel()
+
+# ------------------------
+# Throttling
+# ------------------------
+@skipUnless(fakeredis is not None, "fakeredis is required for the throttle tests")
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class BucketRateThrottleTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        for patcher in (
+            mock.patch("forum.utils.get_redis", return_value=self.redis),
+            mock.patch("forum.utils._rate_limit_script", None),
+            mock.patch.object(BucketRateThrottle, "THROTTLE_RATES", {"like": "2/min"}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user("reader", "reader@example.com", "pw")
+        author = User.objects.create_user("author", "author@example.com", "pw")
+        self.post = Post.objects.create(user=author, title="hello")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_over_budget_is_429_with_retry_after(self):
+        url = f"/api/posts/{self.post.pk}/like/"
+        self.assertEqual(self.client.put(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        res = self.client.put(url)
+        self.assertEqual(res.status_code, 429)
+        # One token refills every 30s at 2/min
+        self.assertTrue(0 < int(res["Retry-After"]) <= 30)
+
+        # Budgets are per user
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", "other@example.com", "pw"))
+        self.assertEqual(other.put(url).status_code, 200)
+
+
+# ------------------------
+# Authentication
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reader", "reader@example.com", "pw")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        # Writes without signals are not seen: the projection is cached
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+
+        # save() bumps the user's auth version once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+
+
+
+# ------------------------
+# Background jobs
+# ------------------------
+@override_settings(JOBS_EAGER=False, JOBS_TIMEOUT=600)
+class JobWorkerTests(TestCase):
+    def queue(self, run_at=None, **fields):
+        return Job.objects.create(name="forum.tasks.refresh_admin_stats", run_at=run_at or timezone.now(), **fields)
+
+    def test_a_job_is_claimed_once(self):
+        due = [self.queue() for _ in range(3)]
+        self.queue(run_at=timezone.now() + timedelta(minutes=5))
+        first, second = jobs.Worker(), jobs.Worker()
+        second.name = "other:1"
+
+        self.assertEqual(first.claim(2), [due[0].pk, due[1].pk])
+        # `second` read its candidates before `first` updated them
+        with mock.patch("forum.jobs.list", create=True, return_value=[job.pk for job in due]):
+            self.assertEqual(second.claim(3), [due[2].pk])
+        owners = dict(Job.objects.filter(status=Job.RUNNING).values_list("pk", "locked_by"))
+        self.assertEqual(owners, {due[0].pk: first.name, due[1].pk: first.name, due[2].pk: "other:1"})
+
+    def test_jobs_of_a_dead_worker_are_claimed_again(self):
+        stale = self.queue(status=Job.RUNNING, locked_by="gone:1", started_at=timezone.now() - timedelta(hours=1))
+        self.queue(status=Job.RUNNING, locked_by="busy:1", started_at=timezone.now())
+        self.assertEqual(jobs.Worker().claim(5), [stale.pk])
+
+    def test_failures_are_retried_then_given_up(self):
+        job = self.queue(max_attempts=2)
+        worker = jobs.Worker()
+        with mock.patch("forum.stats.refresh", side_effect=RuntimeError("boom")), self.assertLogs("forum.jobs"):
+            worker.active = 1
+            worker.run_job(worker.claim(1)[0])
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertGreater(job.run_at, timezone.now())
+            self.assertIn("boom", job.last_error)
+
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            worker.active = 1
+            worker.run_job(worker.claim(1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, worker.failed), (Job.FAILED, 2, 2))
+
+
+# ------------------------
+# Admin stats
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES, JOBS_EAGER=False, ADMIN_STATS_MAX_AGE=300)
+class AdminStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@example.com", "pw", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def posts_total(self):
+        return self.client.get("/api/admin/stats/").data["totals"]["posts"]
+
+    def test_stale_rollups_are_served_while_one_job_refreshes_them(self):
+        self.assertEqual(self.posts_total(), 0)
+        Post.objects.create(user=self.admin, title="new")
+        # Fresh enough: one cache read, no recount
+        self.assertEqual(self.posts_total(), 0)
+        self.assertFalse(Job.objects.exists())
+
+        entry = cache.get(stats.STATS_KEY)
+        cache.set(stats.STATS_KEY, {**entry, "generated_ts": entry["generated_ts"] - 301}, None)
+        self.assertEqual(self.posts_total(), 0)
+        self.assertEqual(self.posts_total(), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, "forum.tasks.refresh_admin_stats")
+
+        tasks.refresh_admin_stats()
+        self.assertEqual(self.posts_total(), 1)
+        self.assertIsNone(cache.get(stats.REFRESH_LOCK_KEY))
+
+
+# ------------------------
+# Reference data snapshot
+# ------------------------
+# Not a TestCase: the snapshot is only kept outside transactions
+@override_settings(CACHES=LOCMEM_CACHES, REFDATA_CHECK_INTERVAL=60)
+class RefdataTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        refdata.clear()
+        self.addCleanup(refdata.clear)
+        self.general = Category.objects.create(name="General")
+
+    def test_local_write_is_visible_at_once(self):
+        self.assertEqual(refdata.get().category("general"), self.general)
+        with self.assertNumQueries(0):
+            refdata.get()
+        news = Category.objects.create(name="News")
+        self.assertEqual(refdata.get().category("NEWS"), news)
+
+    def test_other_processes_see_a_write_after_the_check_interval(self):
+        snapshot = refdata.get()
+        # Another process saved a category: only the shared counter moved here
+        Category.objects.bulk_create([Category(name="News")])
+        cache.incr(refdata.VERSION_KEY)
+        self.assertIs(refdata.get(), snapshot)
+        with mock.patch("forum.refdata.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNotNone(refdata.get().category("news"))
+
+    def test_rolled_back_rows_are_never_shared(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Category.objects.create(name="Draft")
+                self.assertIsNotNone(refdata.get().category("draft"))
+                raise RuntimeError
+        self.assertIsNone(refdata.get().category("draft"))
+
+# ------------------------
+# Management commands
+# ------------------------
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReconcileCountersTests(TestCase):
+    def test_drifted_counters_are_rewritten(self):
+        author = User.objects.create_user("author", "author@example.com", "pw")
+        reader = User.objects.create_user("reader", "reader@example.com", "pw")
+        posts = [Post.objects.create(user=author, title=f"post {i}") for i in range(3)]
+        posts[0].like(reader)
+        Comment.objects.create(post=posts[1], user=reader, body="hi")
+        Post.objects.filter(pk=posts[0].pk).update(like_count=9)
+        Post.objects.filter(pk=posts[1].pk).update(comment_count=0)
+        User.objects.filter(pk=author.pk).update(post_count=0, likes_received=9)
+
+        out = StringIO()
+        call_command("reconcile_counters", batch_size=1, stdout=out)
+        self.assertIn("2 posts, 0 comments and 1 users corrected", out.getvalue())
+        counts = {
+            pk: (likes, comments)
+            for pk, likes, comments in Post.objects.values_list("pk", "like_count", "comment_count")
+        }
+        self.assertEqual(counts, {posts[0].pk: (1, 0), posts[1].pk: (0, 1), posts[2].pk: (0, 0)})
+        author.refresh_from_db()
+        self.assertEqual((author.post_count, author.likes_received), (3, 1))
+
+
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class SeedLoadTests(TestCase):
+    def test_seeded_counters_are_consistent(self):
+        out = StringIO()
+        call_command(
+            "seed_load", users=20, posts=60, comments=200, likes=150, comment_likes=40, tags=12,
+            batch_size=25, stdout=out,
+        )
+        self.assertIn("Created 20 users, 60 posts", out.getvalue())
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertGreater(Post.likes.through.objects.count(), 0)
+        self.assertTrue(User.objects.get(username="load1_0").check_password("loadtest1234"))
+
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("0 posts, 0 comments and 0 users corrected", out.getvalue())
+
+        with self.assertRaisesMessage(CommandError, "use another --seed"):
+            call_command("seed_load", users=1, posts=0, comments=0, likes=0, comment_likes=0, stdout=StringIO())
+
+
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_load", users=20, posts=60, comments=200, likes=100, comment_likes=20, tags=12,
+                     stdout=StringIO())
+
+    def check_plans(self):
+        out = StringIO()
+        call_command("check_query_plans", min_rows=0, stdout=out)
+        return out.getvalue()
+
+    @skipUnless(connection.vendor in ("postgresql", "sqlite"), "check_query_plans supports postgresql and sqlite")
+    def test_hot_queries_seek_their_indexes(self):
+        self.assertIn("All hot queries seek an index.", self.check_plans())
+
+        # An unindexed filter and a full walk of an index where a seek is expected
+        bad = [
+            ("posts by title", Post.objects.filter(title="x"), ("title",)),
+            ("posts by likes", Post.objects.filter(like_count__gte=0).order_by("-created_at", "-id")[:21],
+             ("like_count",)),
+        ]
+        with mock.patch("forum.management.commands.check_query_plans.hot_queries", return_value=bad):
+            with self.assertRaisesMessage(CommandError, "2 hot queries scan instead of seeking"):
+                self.check_plans()
+
+
+@no_live_events
+@override_settings(CACHES=LOCMEM_CACHES, RESPONSE_CACHE_TIMEOUT=0)
+class BenchmarkTests(TestCase):
+    def test_query_count_header(self):
+        Post.objects.create(user=User.objects.create_user("author", "author@example.com", "pw"), title="hi")
+        middleware = ["forum.benchmark.QueryCountMiddleware", *settings.MIDDLEWARE]
+        with override_settings(MIDDLEWARE=middleware), CaptureQueriesContext(connection) as queries:
+            res = self.client.get("/api/posts/")
+        self.assertEqual(int(res[QUERY_COUNT_HEADER]), len(queries))
+
+    def test_mix_parsing(self):
+        mix = benchmark_http.parse_mix("like=0, post=7")
+        self.assertEqual((mix["like"], mix["post"], mix["home"]), (0, 7, benchmark_http.MIX["home"]))
+        for bad in ("likes=1", "home=x", ",".join(f"{name}=0" for name in benchmark_http.MIX)):
+            with self.assertRaises(CommandError):
+                benchmark_http.parse_mix(bad)
+
+    def test_baseline_comparison(self):
+        def run(rps, p50, queries, requests=100):
+            route = {"requests": requests, "p50_ms": p50, "p95_ms": p50 * 2, "queries": queries}
+            return {"server": "wsgi", "database": "sqlite", "rps": rps, "routes": {"GET /api/posts/": route}}
+
+        command = benchmark_http.Command(stdout=StringIO())
+        baseline = run(100, 10.0, 4.0)
+        self.assertEqual(command.compare(baseline, run(90, 12.0, 4.0), 0.25), [])
+        # Slower than the threshold allows and one more query per request
+        self.assertEqual(len(command.compare(baseline, run(70, 20.0, 5.0), 0.25)), 4)
+        # Too few samples for latencies to count; query counts still do
+        self.assertEqual(len(command.compare(baseline, run(100, 20.0, 5.0, requests=5), 0.25)), 1)
+        # Within the noise floor
+        self.assertEqual(command.compare(run(100, 1.0, 4.0), run(100, 2.0, 4.0), 0.25), [])
@@ -10,13 +10,14 @@ from .views import (
     CategoryViewSet,
     TagViewSet,
     ReportViewSet,
-    PostLikeToggleAPIView,
+    AdminStatsView,
 )
 
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
 from .views import PasswordResetRequestView, PasswordResetConfirmView
+from .live import live_events
 
 # --- Router ---
 router = DefaultRouter()
@@ -32,7 +33,8 @@ urlpatterns = [
     path("api/", include(router.urls)),  # เพิ่ม prefix api/
     path("api/users/me/", UserMeView.as_view(), name="user-me"),
     path("api/posts/<int:post_id>/comments/", CommentListCreateView.as_view(), name="comment-list-create"),
-    path("api/posts/<int:pk>/like-toggle/", PostLikeToggleAPIView.as_view(), name="post-like-toggle"),
+    path("api/live/", live_events, name="live-events"),
+    path("api/admin/stats/", AdminStatsView.as_view(), name="admin-stats"),
     path("api/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/auth/password-reset/", PasswordResetRequestView.as_view(), name="password_reset_request"),
@@ -1,35 +1,399 @@
-from django.core.cache import cache
+import threading
 import time
 
+from django.db import transaction
+
+
+# 🔹 After commit
+class CommitBatch:
+    """
+    Items collected during a transaction and handed to `flush(batch)` once it commits.
+
+    Calls made in the same transaction share one batch and one on_commit
+    callback, so `flush` runs once however many rows were written. A batch lives
+    exactly as long as its callback: when the transaction (or the savepoint the
+    batch was started in) rolls back, Django discards the callback and the next
+    call starts a new batch instead of adding to the dead one.
+    Outside a transaction `flush` runs immediately.
+    """
+
+    def __init__(self, flush, factory=set):
+        self.flush = flush
+        self.factory = factory
+        self.local = threading.local()
+
+    def add(self, items, using=None):
+        """Merge `items` into the batch (`batch.update(items)`: ids for a set, pairs for a dict)."""
+        items = list(items)
+        if not items:
+            return
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            batch = self.factory()
+            batch.update(items)
+            self.flush(batch)
+            return
+        pending = {entry[1] for entry in connection.run_on_commit}
+        batches = getattr(self.local, "batches", {})
+        # Keyed by savepoint so a rolled back savepoint only loses its own items
+        key = (connection.alias, tuple(connection.savepoint_ids))
+        entry = batches.get(key)
+        if entry is None or entry[0] not in pending:
+            batch = self.factory()
+            callback = _BatchCallback(self, key, batch)
+            entry = (callback, batch)
+            self.local.batches = batches = {k: v for k, v in batches.items() if v[0] in pending}
+            batches[key] = entry
+            transaction.on_commit(callback, using=using)
+        entry[1].update(items)
+
+
+class _BatchCallback:
+    def __init__(self, owner, key, batch):
+        self.owner = owner
+        self.key = key
+        self.batch = batch
+
+    def __call__(self):
+        batches = getattr(self.owner.local, "batches", {})
+        if batches.get(self.key, (None,))[0] is self:
+            del batches[self.key]
+        self.owner.flush(self.batch)
+
+
 # 🔹 Rate Limit
+# Token bucket in one script, so concurrent requests can never both take the
+# last token. The bucket holds `capacity` tokens and refills at `rate` per
+# second; the hash expires once it would be full again. Redis' own clock is
+# used so every app server agrees on the refill.
+# KEYS: bucket. ARGV: capacity, rate (tokens/second)
+# Returns {allowed (0/1), seconds until the next token (string)}
+RATE_LIMIT_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+_rate_limit_script = None
+
+
+def consume_rate_limit(key: str, limit: int, window: float):
+    """
+    ใช้ 1 token จาก bucket `key` (limit ครั้งต่อ window วินาที)
+    Returns (allowed, seconds to wait before the next request is allowed).
+    """
+    global _rate_limit_script
+    client = get_redis()
+    if _rate_limit_script is None:
+        # EVALSHA after the first call: only the hash crosses the wire
+        _rate_limit_script = client.register_script(RATE_LIMIT_SCRIPT)
+    allowed, wait = _rate_limit_script(keys=[key], args=[limit, limit / window], client=client)
+    return bool(allowed), float(wait)
+
+
 def is_rate_limited(user_id: int, action: str, limit: int = 5, window: int = 60):
     """
     limit = จำนวนครั้งสูงสุด
     window = วินาที
+    Fails open: a Redis outage does not block requests.
     """
-    key = f"rate_limit:{user_id}:{action}"
-    count = cache.get(key, 0)
+    try:
+        allowed, _ = consume_rate_limit(f"rate_limit:{user_id}:{action}", limit, window)
+    except Exception:
+        return False
+    return not allowed
+
 
-    if count >= limit:
-        return True  # เกิน limit
+# 🔹 Hot Posts
+HOT_POSTS_KEY = "hot_posts"
+HOT_POSTS_EPOCH_KEY = "hot_posts:epoch"
+HOT_POSTS_LIKE_KEY = "hot_posts:like:{}:{}"
+POPULAR_POSTS_KEY = "popular_posts"
+# Set once `popular_posts` holds every liked post; gone after a Redis flush
+POPULAR_SEEDED_KEY = "popular_posts:seeded"
 
-    cache.incr(key)
-    cache.expire(key, window)
-    return False
+# Add `weight` to a post's time-decayed score.
+# Scores are stored relative to an epoch: an event at time t adds
+# weight * 2^((t - epoch) / half_life), so older events weigh exponentially less
+# without rewriting every member. When the exponent grows large the whole set is
+# rescaled to a new epoch with one ZUNIONSTORE, and the set is trimmed to `max` members.
+# With a third key (one per post and liker) the event is a like: its time is kept
+# for `like_ttl` seconds and the matching unlike (mode "undo") is weighed at that
+# time, so it takes back what the like added instead of the larger present-day
+# weight. An unlike without a remembered like adds nothing; scores never go below 0.
+# KEYS: zset, epoch key[, like key]. ARGV: member, weight, now, half_life, max[, mode, like_ttl]
+HOT_POST_SCRIPT = """
+local now = tonumber(ARGV[3])
+local half_life = tonumber(ARGV[4])
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+  epoch = now
+  redis.call('SET', KEYS[2], now)
+end
+if (now - epoch) / half_life > 32 then
+  redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', 2 ^ (-(now - epoch) / half_life))
+  redis.call('SET', KEYS[2], now)
+  epoch = now
+end
+local at = now
+if KEYS[3] and ARGV[6] == 'undo' then
+  at = tonumber(redis.call('GET', KEYS[3]))
+  if not at then
+    return redis.call('ZSCORE', KEYS[1], ARGV[1]) or '0'
+  end
+  redis.call('DEL', KEYS[3])
+elseif KEYS[3] then
+  redis.call('SET', KEYS[3], now, 'EX', tonumber(ARGV[7]))
+end
+local score = tonumber(redis.call('ZINCRBY', KEYS[1], tonumber(ARGV[2]) * 2 ^ ((at - epoch) / half_life), ARGV[1]))
+if score < 0 then
+  redis.call('ZADD', KEYS[1], 0, ARGV[1])
+  score = 0
+end
+local max = tonumber(ARGV[5])
+if redis.call('ZCARD', KEYS[1]) > max * 2 then
+  redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(max + 1))
+end
+return tostring(score)
+"""
 
 
-# 🔹 Hot Posts
-def add_hot_post(post_id: int, score: int = 1):
+def get_redis():
+    """Raw Redis client behind the default cache."""
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def _hot_settings():
+    from django.conf import settings
+    half_life = getattr(settings, "HOT_POSTS_HALF_LIFE", 12 * 3600)
+    max_size = getattr(settings, "HOT_POSTS_MAX", 1000)
+    weights = getattr(settings, "HOT_POST_WEIGHTS", {})
+    return half_life, max_size, weights
+
+
+def add_hot_post(post_id: int, score: float = 1, now: float = None, liker: int = None, undo: bool = False):
+    """
+    เพิ่มคะแนนให้โพสต์ใน ZSET `hot_posts` (คะแนนลดลงตามเวลาแบบ half-life)
+    With `liker` the event is that user's like; `undo=True` is the unlike that
+    takes it back at the like's own decay factor.
+    """
+    half_life, max_size, _ = _hot_settings()
+    now = time.time() if now is None else now
+    keys = [HOT_POSTS_KEY, HOT_POSTS_EPOCH_KEY]
+    args = [post_id, score, now, half_life, max_size]
+    if liker is not None:
+        # Past ten half-lives a like weighs under 0.1%; nothing left to take back
+        keys.append(HOT_POSTS_LIKE_KEY.format(post_id, liker))
+        args += ["undo" if undo else "do", int(half_life * 10)]
+    return float(get_redis().eval(HOT_POST_SCRIPT, len(keys), *keys, *args))
+
+
+def record_post_event(post_id: int, event: str, user_id: int = None):
+    """
+    บันทึก event ของโพสต์ (like / unlike / comment / view / create) ลงใน hot ranking
+    Pass `user_id` with like/unlike so an unlike cancels exactly its like.
+    Ranking is best-effort: a Redis outage must not fail the request.
+    """
+    _, _, weights = _hot_settings()
+    weight = weights.get(event)
+    if not weight:
+        return None
+    liker = user_id if event in ("like", "unlike") else None
+    try:
+        return add_hot_post(post_id, weight, liker=liker, undo=event == "unlike")
+    except Exception:
+        return None
+
+
+def set_popular_score(post_id: int, like_count: int):
     """
-    ใช้ ZSET ใน Redis
+    เก็บจำนวนไลก์ล่าสุดของโพสต์ใน ZSET `popular_posts` (all-time popular)
     """
-    key = "hot_posts"
-    cache.get_client().zadd(key, {post_id: score})
+    _, max_size, _ = _hot_settings()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(POPULAR_POSTS_KEY, {post_id: like_count})
+        pipe.zremrangebyrank(POPULAR_POSTS_KEY, 0, -(max_size + 1))
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def forget_post(post_id: int):
+    """
+    ลบโพสต์ออกจาก ranking ทั้งหมด (เมื่อโพสต์ถูกลบ)
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zrem(HOT_POSTS_KEY, post_id)
+        pipe.zrem(POPULAR_POSTS_KEY, post_id)
+        pipe.execute()
+    except Exception:
+        pass
 
 
 def get_hot_posts(limit: int = 10):
     """
-    คืนค่า post_id ที่ hot ที่สุด
+    คืนค่า (post_id, score) ที่ hot ที่สุด
+    """
+    rows = get_redis().zrevrange(HOT_POSTS_KEY, 0, limit - 1, withscores=True)
+    return [(int(member), score) for member, score in rows]
+
+
+def seed_popular_posts(client=None):
+    """
+    ใส่โพสต์ที่มีไลก์จากฐานข้อมูลลงใน `popular_posts` (ครั้งเดียวต่อ Redis หนึ่งชุด)
+    The ZSET only learns about a post when its like count changes, so after a
+    fresh start or a flush it must be seeded before it can be trusted. Scores
+    already in the set came from later like events and are kept (ZADD NX).
+    """
+    from .models import Post
+    client = client or get_redis()
+    if not client.set(POPULAR_SEEDED_KEY, 1, nx=True):
+        return False
+    _, max_size, _ = _hot_settings()
+    try:
+        popular = dict(
+            Post.objects.filter(like_count__gt=0)
+            .order_by("-like_count", "-id")
+            .values_list("pk", "like_count")[:max_size]
+        )
+        if popular:
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(POPULAR_POSTS_KEY, popular, nx=True)
+            pipe.zremrangebyrank(POPULAR_POSTS_KEY, 0, -(max_size + 1))
+            pipe.execute()
+    except Exception:
+        # Let the next reader try again
+        client.delete(POPULAR_SEEDED_KEY)
+        raise
+    return True
+
+
+def get_popular_posts(limit: int = 5):
+    """
+    คืนค่า (post_id, like_count) ที่มีไลก์มากที่สุด
+    """
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    pipe.exists(POPULAR_SEEDED_KEY)
+    pipe.zrevrange(POPULAR_POSTS_KEY, 0, limit - 1, withscores=True)
+    seeded, rows = pipe.execute()
+    if not seeded and seed_popular_posts(client):
+        rows = client.zrevrange(POPULAR_POSTS_KEY, 0, limit - 1, withscores=True)
+    return [(int(member), int(score)) for member, score in rows]
+
+
+def rescale_hot_posts(now: float = None):
+    """
+    Move the hot ZSET to a new epoch (now) and drop members whose decayed score
+    is negligible. Returns the number of members left.
+    """
+    half_life, max_size, _ = _hot_settings()
+    now = time.time() if now is None else now
+    client = get_redis()
+    epoch = client.get(HOT_POSTS_EPOCH_KEY)
+    if epoch is None:
+        client.set(HOT_POSTS_EPOCH_KEY, now)
+        return client.zcard(HOT_POSTS_KEY)
+    factor = 2 ** (-(now - float(epoch)) / half_life)
+    pipe = client.pipeline(transaction=True)
+    pipe.zunionstore(HOT_POSTS_KEY, {HOT_POSTS_KEY: factor})
+    pipe.set(HOT_POSTS_EPOCH_KEY, now)
+    pipe.zremrangebyscore(HOT_POSTS_KEY, "-inf", 0.01)
+    pipe.zremrangebyrank(HOT_POSTS_KEY, 0, -(max_size + 1))
+    pipe.zcard(HOT_POSTS_KEY)
+    return pipe.execute()[-1]
+
+
+# 🔹 Popular Tags
+TAG_COUNTS_KEY = "tag_counts"
+TAG_BUCKET_SECONDS = 3600
+# Hourly buckets are kept a little longer than the widest window
+TAG_BUCKET_TTL = 8 * 24 * 3600
+TAG_WINDOWS = {"24h": 24, "7d": 7 * 24}
+
+
+def _tag_bucket_key(hour: int):
+    return f"tag_counts:h:{hour}"
+
+
+def _hour_of(dt):
+    return int(dt.timestamp()) // TAG_BUCKET_SECONDS
+
+
+def update_tag_counts(changes):
+    """
+    ปรับจำนวนโพสต์ของแต่ละแท็ก
+    changes = [(tag_id, post_created_at, delta), ...]
+
+    The all-time ZSET always moves; the hourly bucket of the post's creation time
+    moves too while it is still retained, so windows count posts created in them.
+    """
+    if not changes:
+        return
+    oldest_hour = int(time.time() - TAG_BUCKET_TTL) // TAG_BUCKET_SECONDS
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for tag_id, created_at, delta in changes:
+            pipe.zincrby(TAG_COUNTS_KEY, delta, tag_id)
+            if created_at is None:
+                continue
+            hour = _hour_of(created_at)
+            if hour >= oldest_hour:
+                key = _tag_bucket_key(hour)
+                pipe.zincrby(key, delta, tag_id)
+                pipe.expireat(key, (hour * TAG_BUCKET_SECONDS) + TAG_BUCKET_TTL)
+        pipe.execute()
+    except Exception:
+        # Counters are repaired by `manage.py reconcile_tag_counts`
+        pass
+
+
+def forget_tag(tag_id: int):
+    try:
+        get_redis().zrem(TAG_COUNTS_KEY, tag_id)
+    except Exception:
+        pass
+
+
+def get_popular_tags(limit: int = 5, window: str = None):
+    """
+    คืนค่า (tag_id, จำนวนโพสต์) ของแท็กยอดนิยม
+    window = None (ตลอดกาล), "24h" หรือ "7d"
     """
-    key = "hot_posts"
-    return cache.get_client().zrevrange(key, 0, limit - 1, withscores=True)
+    client = get_redis()
+    key = TAG_COUNTS_KEY
+    if window:
+        hours = TAG_WINDOWS[window]
+        now_hour = int(time.time()) // TAG_BUCKET_SECONDS
+        # Union of the hourly buckets, memoized briefly so polling clients share it
+        key = f"tag_counts:window:{window}:{now_hour}"
+        if not client.exists(key):
+            buckets = [_tag_bucket_key(h) for h in range(now_hour - hours + 1, now_hour + 1)]
+            pipe = client.pipeline(transaction=True)
+            pipe.zunionstore(key, buckets)
+            pipe.expire(key, 60)
+            pipe.execute()
+    rows = client.zrevrangebyscore(key, "+inf", 1, start=0, num=limit, withscores=True)
+    return [(int(member), int(score)) for member, score in rows]
@@ -1,27 +1,43 @@
+from datetime import timedelta
+
 from rest_framework import viewsets, generics, permissions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import User, Post, Comment, Category, Report, Tag
+from .models import User, Post, Comment, Category, Report, Tag, find_user
 from .serializers import (
     UserSerializer,
     PostSerializer,
+    PostListSerializer,
     CommentSerializer,
     CommentCreateSerializer,
     CategorySerializer,
     ReportSerializer,
     TagSerializer,
+    user_summary,
 )
 from .serializers import PasswordResetRequestSerializer, PasswordResetConfirmSerializer
-from .permissions import IsOwnerOrAdmin, IsAdminUser
+from .permissions import IsOwnerOrAdmin, IsAdminUser, is_admin
+from .authentication import full_user
+from .pagination import CommentCursorPagination, PostCursorPagination, SearchPagination
+from .search import get_backend as get_search_backend
+from . import changes, like_buffer, live, refdata, response_cache, stats, tasks
+from .response_cache import CachedResponseMixin
+from .utils import (
+    TAG_WINDOWS,
+    get_hot_posts,
+    get_popular_posts,
+    get_popular_tags,
+    record_post_event,
+    set_popular_score,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .serializers import CustomTokenObtainPairSerializer
 from rest_framework.decorators import action
-from django.db.models import Count
-from rest_framework.permissions import IsAuthenticated as DRFIsAuthenticated
-from django.core.mail import send_mail
+from django.db.models import Count, Prefetch, QuerySet
+from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -38,69 +54,293 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def partial_update(self, request, *args, **kwargs):
         # Only admin users can change is_staff or role
-        user = request.user
-        is_admin = (
-            getattr(user, "role", None) == "admin"
-            or getattr(user, "is_staff", False)
-            or getattr(user, "is_superuser", False)
-        )
         # If the payload tries to change is_staff or role and user is not admin, forbid
         data = request.data
-        if ("is_staff" in data or "role" in data) and not is_admin:
+        if ("is_staff" in data or "role" in data) and not is_admin(request.user):
             return Response({"detail": "ต้องเป็น Admin เท่านั้นที่จะเปลี่ยน role/is_staff"}, status=403)
         return super().partial_update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
         # Only admins can delete users
-        user = request.user
-        is_admin = (
-            getattr(user, "role", None) == "admin"
-            or getattr(user, "is_staff", False)
-            or getattr(user, "is_superuser", False)
-        )
-        if not is_admin:
+        if not is_admin(request.user):
             return Response({"detail": "ต้องเป็น Admin เท่านั้นที่จะลบผู้ใช้"}, status=403)
         return super().destroy(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(full_user(request.user))
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'], url_path='activity')
+    def activity(self, request, pk=None):
+        """Profile data: denormalized totals plus the user's posts and comments, newest first.
+
+        Each list pages on its own keyset cursor (?posts_cursor= / ?comments_cursor=,
+        ?page_size=) over the (user, created_at, id) indexes, so the cost follows
+        the user's activity rather than the size of the forum.
+        """
+        user = self.get_object()
+        posts = with_feed_relations(Post.objects.filter(user=user), request.user)
+        comments = Comment.objects.filter(user=user).select_related('user').with_like_info(request.user)
+        context = self.get_serializer_context()
+        data = {
+            'user': user_summary(user, request),
+            'totals': {
+                'posts': user.post_count,
+                'comments': user.comment_count,
+                'likes_received': user.likes_received,
+            },
+        }
+        for name, qs, paginator, serializer_class in (
+            ('posts', posts, PostCursorPagination(), PostListSerializer),
+            ('comments', comments, CommentCursorPagination(), CommentSerializer),
+        ):
+            paginator.cursor_query_param = f'{name}_cursor'
+            page = paginator.paginate_queryset(qs, request, self)
+            like_buffer.apply_to(page, request.user)
+            data[name] = {
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'results': serializer_class(page, many=True, context=context).data,
+            }
+        return Response(data)
+
 
 # สำหรับดึงข้อมูลตัวเอง
 class UserMeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        user = full_user(request.user)
         serializer = UserSerializer(user)
         return Response(serializer.data)
 
 
+# -------------------------------
+# Likes (shared by posts and comments)
+# -------------------------------
+class BufferedLikesMixin:
+    """Overlay likes still sitting in the Redis write-behind buffer (see like_buffer)
+    onto objects before they are serialized, so readers see their own clicks."""
+
+    def get_serializer(self, *args, **kwargs):
+        if args and like_buffer.is_enabled():
+            instance = args[0]
+            many = isinstance(instance, (list, tuple, QuerySet))
+            objs = list(instance) if many else [instance]
+            like_buffer.apply_to(objs, self.request.user)
+            for obj in objs:
+                comments = getattr(obj, '_prefetched_objects_cache', {}).get('comments')
+                if comments is not None:
+                    like_buffer.apply_to(list(comments), self.request.user)
+        return super().get_serializer(*args, **kwargs)
+
+
+class LikeActionsMixin(BufferedLikesMixin):
+    """Like endpoints for viewsets whose model uses LikeCounterMixin.
+
+    - PUT    <obj>/like/         like (idempotent)
+    - DELETE <obj>/like/         unlike (idempotent)
+    - POST   <obj>/like-toggle/  legacy toggle built on the same statements
+
+    The through-table is written with one conditional statement and the new
+    total is read back from the persisted counter. With LIKE_WRITE_BEHIND the
+    intent is buffered in Redis instead and flushed by `manage.py flush_likes`.
+    """
+
+    def set_like(self, obj, user, liked):
+        if like_buffer.is_enabled():
+            return like_buffer.record(obj, user, liked)
+        return obj.like(user) if liked else obj.unlike(user)
+
+    def like_response(self, obj, liked, changed=True):
+        if like_buffer.is_enabled():
+            total = like_buffer.effective_count(obj)
+        else:
+            total = obj.refresh_like_count()
+        if changed:
+            response_cache.bump_on_commit(f'{obj._meta.model_name}s')
+            live.like_changed(obj, total)
+            self.like_changed(obj, liked, total)
+        return Response({'liked': liked, 'total_likes': total})
+
+    def like_changed(self, obj, liked, total):
+        """Hook called after a like state actually changed."""
+
+    @action(detail=True, methods=['put', 'delete'], url_path='like', permission_classes=[permissions.IsAuthenticated])
+    def like(self, request, pk=None):
+        obj = self.get_object()
+        liked = request.method == 'PUT'
+        changed = self.set_like(obj, request.user, liked)
+        return self.like_response(obj, liked, changed)
+
+    @action(detail=True, methods=['post'], url_path='like-toggle', permission_classes=[permissions.IsAuthenticated])
+    def like_toggle(self, request, pk=None):
+        obj = self.get_object()
+        if like_buffer.is_enabled():
+            liked = not like_buffer.is_liked(obj, request.user)
+            self.set_like(obj, request.user, liked)
+        else:
+            # Try the DELETE first: if nothing was removed the user had not liked it yet
+            liked = not obj.unlike(request.user)
+            if liked:
+                obj.like(request.user)
+        return self.like_response(obj, liked)
+
+
 # -------------------------------
 # Post ViewSet
 # -------------------------------
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('-created_at')
+def with_feed_relations(qs, viewer):
+    """Load what PostListSerializer needs in a fixed number of queries.
+
+    Like/comment counters are columns and the viewer's liked flag is annotated
+    on the page query itself, so the query count does not depend on like volume.
+    """
+    limit = getattr(settings, 'FEED_COMMENT_PREVIEWS', 3)
+    previews = Comment.objects.select_related('user').order_by('-created_at', '-id')[:limit]
+    return qs.select_related('user', 'category').prefetch_related(
+        'tags',
+        Prefetch('comments', queryset=previews, to_attr='comment_previews'),
+    ).with_like_info(viewer)
+
+
+class PostViewSet(LikeActionsMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.all().order_by('-created_at', '-id')
     serializer_class = PostSerializer
+    # GET responses are cached per generation of everything a post payload embeds
+    cache_resources = ('posts', 'comments', 'tags', 'categories', 'users')
+    cache_kind = 'post'
+    # Keyset pagination on (created_at, id): ?cursor=<opaque>&page_size=<n>
+    pagination_class = PostCursorPagination
     # allow anyone to read; creating requires auth; editing/deleting allowed for owner or admin
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrAdmin]
     # Accept JSON and multipart/form-data (for file uploads)
     parser_classes = [JSONParser, MultiPartParser, FormParser]
+    # Write budgets (REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"])
+    throttle_scopes = {'create': 'post_create', 'like': 'like', 'like_toggle': 'like'}
+
+    # Actions that render the lightweight feed projection instead of the full tree
+    feed_actions = ('list', 'popular', 'hot', 'changes')
+
+    def get_serializer_class(self):
+        if getattr(self, 'action', None) in self.feed_actions:
+            return PostListSerializer
+        return PostSerializer
+
+    def with_feed_relations(self, qs):
+        return with_feed_relations(qs, self.request.user)
+
+    def with_detail_relations(self, qs):
+        """Load the full comment tree with authors and per-viewer like info."""
+        user = self.request.user
+        comments = Comment.objects.select_related('user').with_like_info(user).order_by('-created_at')
+        return qs.select_related('user', 'category').prefetch_related(
+            'tags',
+            Prefetch('comments', queryset=comments),
+        ).with_like_info(user)
+
+    def ranked_limit(self, default, maximum=50):
+        try:
+            return max(1, min(int(self.request.query_params.get('limit', default)), maximum))
+        except (TypeError, ValueError):
+            return default
+
+    def hydrate_ranked(self, post_ids):
+        """Load ranked posts in one batched query, keeping the ranking order."""
+        posts = self.with_feed_relations(Post.objects.filter(pk__in=post_ids)).in_bulk()
+        return [posts[pk] for pk in post_ids if pk in posts]
 
     @action(detail=False, methods=['get'], url_path='popular')
     def popular(self, request):
-        # Example: order by like count
-        popular_posts = Post.objects.annotate(like_count=Count('likes')).order_by('-like_count')[:5]
+        """Most liked posts, served from the `popular_posts` ZSET (see utils)."""
+        return self.cached_response(request, self.render_popular)
+
+    def render_popular(self):
+        limit = self.ranked_limit(5)
+        try:
+            ranked = [pk for pk, _ in get_popular_posts(limit)]
+        except Exception:
+            ranked = []
+        popular_posts = self.hydrate_ranked(ranked) if ranked else []
+        if len(popular_posts) < limit:
+            # Redis unavailable, or fewer liked posts than asked for: fill up from
+            # the counter column (post_like_count_idx)
+            rest = (
+                self.with_feed_relations(Post.objects.exclude(pk__in=ranked))
+                .order_by('-like_count', '-id')[:limit - len(popular_posts)]
+            )
+            popular_posts = list(popular_posts) + list(rest)
         serializer = self.get_serializer(popular_posts, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='hot')
+    def hot(self, request):
+        """Trending posts: like/comment/view activity with time decay (see utils)."""
+        limit = self.ranked_limit(10)
+        try:
+            ranked = [pk for pk, _ in get_hot_posts(limit)]
+        except Exception:
+            ranked = []
+        if ranked:
+            hot_posts = self.hydrate_ranked(ranked)
+        else:
+            hot_posts = self.with_feed_relations(Post.objects.all()).order_by('-created_at', '-id')[:limit]
+        serializer = self.get_serializer(hot_posts, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """Delta feed: posts created, updated or deleted after ?since=<token>.
+
+        Without `since` only the current token is returned. Each response carries
+        `next`, the token to send on the following poll; `has_more` means the
+        client should fetch again right away. ?limit=<n> caps log entries read.
+        Not served from the response cache: the log is written after the cache
+        generations are bumped, so a cached body could miss the newest entries.
+        """
+        since = request.query_params.get('since')
+        if not since:
+            return Response({'results': [], 'deleted': [], 'next': changes.head(), 'has_more': False})
+        limit = self.ranked_limit(100, maximum=500)
+        updated, deleted, last_id, has_more = changes.read(changes.decode_token(since), limit)
+        posts = self.hydrate_ranked(updated)
+        # Updated posts that are gone by now were deleted after this batch
+        found = {post.pk for post in posts}
+        deleted += [pk for pk in updated if pk not in found]
+        return Response({
+            'results': self.get_serializer(posts, many=True).data,
+            'deleted': deleted,
+            'next': changes.encode_token(last_id),
+            'has_more': has_more,
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # Only an existing post gets here with 200/304: the lookup ran or was checked
+        if response.status_code in (200, 304):
+            record_post_event(int(kwargs[self.lookup_field]), 'view')
+        return response
+
+    def like_changed(self, obj, liked, total):
+        changes.record([obj.pk])
+        record_post_event(obj.pk, 'like' if liked else 'unlike', self.request.user.pk)
+        set_popular_score(obj.pk, total)
+
     def perform_create(self, serializer):
         # Attach the requesting user as the post author
         serializer.save(user=self.request.user)
 
     def get_queryset(self):
+        qs = self.filter_posts()
+        action_name = getattr(self, 'action', None)
+        if action_name in self.feed_actions:
+            qs = self.with_feed_relations(qs)
+        elif action_name == 'retrieve':
+            qs = self.with_detail_relations(qs)
+        return qs
+
+    def filter_posts(self):
         """Allow filtering posts by query params: ?tag=<id|name> and ?category=<id|name>
 
         Examples:
@@ -108,12 +348,24 @@ class PostViewSet(viewsets.ModelViewSet):
         - /api/posts/?tag=python (filter by tag name, case-insensitive)
         - /api/posts/?category=3 (filter by category id)
         - /api/posts/?category=General (filter by category name)
+        - /api/posts/?user=7 (one author's posts, e.g. a profile page)
+        - /api/posts/?search=django (full-text search, ranked)
+
+        Results are paginated with an opaque cursor (see PostCursorPagination),
+        or by page number for ranked search results (SearchPagination).
         """
-        qs = Post.objects.all().order_by('-created_at')
+        qs = Post.objects.all().order_by('-created_at', '-id')
         req = getattr(self, 'request', None)
         if not req:
             return qs
 
+        # Author filter (post_user_created_idx); combined with the filters below
+        user_id = req.query_params.get('user')
+        if user_id is not None:
+            if not str(user_id).isdigit():
+                return qs.none()
+            qs = qs.filter(user_id=user_id)
+
         # Support multiple filters:
         # - repeated params: /api/posts/?tag=1&tag=2
         # - csv params: /api/posts/?tags=1,2
@@ -129,93 +381,49 @@ class PostViewSet(viewsets.ModelViewSet):
         if cats_csv and not categories:
             categories = [c.strip() for c in str(cats_csv).split(',') if c.strip()]
 
-        try:
-            # Build tag Q
+        # Ids and names are resolved against the in-memory snapshot, so the
+        # filter is a plain id lookup without joins on forum_tag/forum_category
+        if tags or categories:
             from django.db.models import Q
-            tag_q = Q()
-            if tags:
-                id_vals = [int(t) for t in tags if str(t).isdigit()]
-                name_vals = [t for t in tags if not str(t).isdigit()]
-                if id_vals:
-                    tag_q |= Q(tags__id__in=id_vals)
-                for n in name_vals:
-                    tag_q |= Q(tags__name__iexact=n)
-
-            # Build category Q
-            cat_q = Q()
-            if categories:
-                id_vals = [int(c) for c in categories if str(c).isdigit()]
-                name_vals = [c for c in categories if not str(c).isdigit()]
-                if id_vals:
-                    cat_q |= Q(category_id__in=id_vals)
-                for n in name_vals:
-                    cat_q |= Q(category__name__iexact=n)
-
+            snapshot = refdata.get()
             # Combine: if both tag and category filters present, return posts that match ANY (OR)
-            combined_q = Q()
+            combined_q = Q(pk__in=[])
             if tags:
-                combined_q |= tag_q
+                combined_q |= Q(tags__id__in=snapshot.tag_ids(tags))
             if categories:
-                combined_q |= cat_q
+                combined_q |= Q(category_id__in=snapshot.category_ids(categories))
+            qs = qs.filter(combined_q)
 
-            if combined_q:
-                qs = qs.filter(combined_q)
-                return qs.distinct()
-        except Exception:
-            # In case of bad param values, just return unfiltered qs
-            return qs
-
-        # Support a generic search param to match title partially (case-insensitive)
-        try:
-            q = req.query_params.get('search') or req.query_params.get('q')
-            if q:
-                # simple partial match on title
-                qs = qs.filter(title__icontains=str(q))
-                return qs.distinct()
-        except Exception:
-            pass
+        # Full-text search over title/body/tags (see forum/search.py), best match first.
+        # Combines with the tag/category filters above.
+        q = self.search_query()
+        if q:
+            qs = get_search_backend().search(qs, q).order_by('-search_rank', '-id')
 
         # If filtering by many-to-many (tags), avoid duplicates
         return qs.distinct()
 
-    @action(detail=True, methods=['post'], url_path='like-toggle', permission_classes=[permissions.IsAuthenticated])
-    def like_toggle(self, request, pk=None):
-        post = self.get_object()
-        user = request.user
-        if user in post.likes.all():
-            post.likes.remove(user)
-            liked = False
-        else:
-            post.likes.add(user)
-            liked = True
-        return Response({
-            'liked': liked,
-            'total_likes': post.total_likes()
-        })
-
-
-class PostLikeToggleAPIView(APIView):
-    permission_classes = [DRFIsAuthenticated]
-
-    def post(self, request, pk):
-        try:
-            post = Post.objects.get(pk=pk)
-        except Post.DoesNotExist:
-            return Response({'detail': 'Not found.'}, status=404)
-        user = request.user
-        if user in post.likes.all():
-            post.likes.remove(user)
-            liked = False
-        else:
-            post.likes.add(user)
-            liked = True
-        return Response({'liked': liked, 'total_likes': post.total_likes()})
+    def search_query(self):
+        req = getattr(self, 'request', None)
+        if not req:
+            return ''
+        return str(req.query_params.get('search') or req.query_params.get('q') or '').strip()
+
+    @property
+    def paginator(self):
+        # Ranked search results page by rank/offset; the plain feed pages by (created_at, id)
+        if not hasattr(self, '_paginator'):
+            if self.search_query() and getattr(self, 'action', None) == 'list':
+                self._paginator = SearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
 
 # -------------------------------
 # Comment ViewSet
 # -------------------------------
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(LikeActionsMixin, CachedResponseMixin, viewsets.ModelViewSet):
     # Base queryset; we'll further filter based on query params (e.g. ?post=123)
     queryset = Comment.objects.all().order_by('-created_at')
     # Default serializer (used for GET). For POST we prefer the create serializer which accepts multipart/form-data
@@ -224,6 +432,11 @@ class CommentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrAdmin]
     # Accept JSON and multipart for comment edits/creates
     parser_classes = [JSONParser, MultiPartParser, FormParser]
+    cache_resources = ('comments', 'users')
+    cache_kind = 'comment'
+    throttle_scopes = {'create': 'comment_create', 'like': 'like', 'like_toggle': 'like'}
+    # ?cursor=<opaque>&order=newest|oldest&page_size=<n>
+    pagination_class = CommentCursorPagination
 
     def get_queryset(self):
         """Filter comments by query parameters.
@@ -231,8 +444,11 @@ class CommentViewSet(viewsets.ModelViewSet):
         Frontend calls `/comments/?post=<id>` or `/comments/?user=<id>`.
         Ensure we return only the comments that match those filters so comments are scoped per-post.
         """
-        qs = Comment.objects.all().order_by('-created_at')
+        qs = Comment.objects.select_related('user').order_by('-created_at')
         req = getattr(self, 'request', None)
+        if req and getattr(self, 'action', None) in ('list', 'retrieve'):
+            # Annotated counters are read-only snapshots; write actions recount.
+            qs = qs.with_like_info(req.user)
         if req:
             post_id = req.query_params.get('post')
             user_id = req.query_params.get('user')
@@ -249,27 +465,16 @@ class CommentViewSet(viewsets.ModelViewSet):
             return CommentCreateSerializer
         return CommentSerializer
 
-    @action(detail=True, methods=['post'], url_path='like-toggle', permission_classes=[permissions.IsAuthenticated])
-    def like_toggle(self, request, pk=None):
-        comment = self.get_object()
-        user = request.user
-        if user in comment.likes.all():
-            comment.likes.remove(user)
-            liked = False
-        else:
-            comment.likes.add(user)
-            liked = True
-        return Response({
-            'liked': liked,
-            'total_likes': comment.total_likes()
-        })
-
 
 # สำหรับสร้างและดึง comment ของ post หนึ่ง
-class CommentListCreateView(generics.ListCreateAPIView):
+class CommentListCreateView(BufferedLikesMixin, CachedResponseMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     # Accept both JSON payloads and multipart/form-data (image uploads)
     parser_classes = [JSONParser, MultiPartParser, FormParser]
+    cache_resources = ('comments', 'users')
+    cache_kind = 'comment'
+    throttle_scopes = {'post': 'comment_create'}
+    pagination_class = CommentCursorPagination
 
     def get_serializer_class(self):
         # Use the create serializer for POST, and the full serializer for GET
@@ -279,7 +484,12 @@ class CommentListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         post_id = self.kwargs.get('post_id')
-        return Comment.objects.filter(post_id=post_id).order_by('-created_at')
+        return (
+            Comment.objects.filter(post_id=post_id)
+            .select_related('user')
+            .with_like_info(self.request.user)
+            .order_by('-created_at')
+        )
 
     def perform_create(self, serializer):
         post_id = self.kwargs.get('post_id')
@@ -289,54 +499,126 @@ class CommentListCreateView(generics.ListCreateAPIView):
 # -------------------------------
 # Category ViewSet
 # -------------------------------
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    cache_resources = ('categories',)
+
+    def list(self, request, *args, **kwargs):
+        # Served from the reference data snapshot (forum/refdata.py)
+        return self.cached_response(
+            request, lambda: Response(self.get_serializer(refdata.get().categories, many=True).data)
+        )
 
 
 # -------------------------------
 # Tag ViewSet
 # -------------------------------
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_resources = ('tags',)
+
+    def get_cache_resources(self):
+        # Popularity changes whenever posts gain or lose tags
+        if getattr(self, 'action', None) == 'popular':
+            return ('tags', 'posts')
+        return self.cache_resources
+
+    def list(self, request, *args, **kwargs):
+        # Served from the reference data snapshot (forum/refdata.py)
+        return self.cached_response(
+            request, lambda: Response(self.get_serializer(refdata.get().tags, many=True).data)
+        )
 
     @action(detail=False, methods=['get'], url_path='popular')
     def popular(self, request):
-        # Count posts per tag then order
-        popular_tags = Tag.objects.annotate(num_posts=Count('posts')).order_by('-num_posts')[:5]
-        serializer = self.get_serializer(popular_tags, many=True)
-        return Response(serializer.data)
+        """Top tags by post count from the incremental leaderboard (see utils).
+
+        ?window=24h|7d limits the count to posts created in that window; ?limit=<n>.
+        """
+        return self.cached_response(request, self.render_popular)
+
+    def render_popular(self):
+        request = self.request
+        window = request.query_params.get('window') or None
+        if window and window not in TAG_WINDOWS:
+            return Response({'detail': f"window must be one of: {', '.join(TAG_WINDOWS)}"}, status=400)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 5)), 50))
+        except (TypeError, ValueError):
+            limit = 5
+
+        try:
+            ranked = get_popular_tags(limit, window)
+        except Exception:
+            ranked = None
+        if ranked is None or (not ranked and not window):
+            # Leaderboard unavailable or never built: count posts per tag in the database
+            tags = Tag.objects.annotate(num_posts=Count('posts')).filter(num_posts__gt=0).order_by('-num_posts')
+            if window:
+                since = timezone.now() - timedelta(hours=TAG_WINDOWS[window])
+                tags = Tag.objects.filter(posts__created_at__gte=since).annotate(
+                    num_posts=Count('posts')).order_by('-num_posts')
+            ranked = [(t.pk, t.num_posts) for t in tags[:limit]]
+
+        tags = refdata.get().tags_by_id
+        data = []
+        for pk, num_posts in ranked:
+            if pk in tags:
+                item = self.get_serializer(tags[pk]).data
+                item['num_posts'] = num_posts
+                data.append(item)
+        return Response(data)
 
 
 # -------------------------------
 # Report ViewSet
 # -------------------------------
 class ReportViewSet(viewsets.ModelViewSet):
-    queryset = Report.objects.all()
+    # Open reports first, newest first (report_resolved_created_idx)
+    queryset = Report.objects.order_by('resolved', '-created_at', '-id')
     serializer_class = ReportSerializer
     permission_classes = [IsOwnerOrAdmin]
+    throttle_scopes = {'create': 'report_create'}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # ?resolved=false for the moderation queue
+        resolved = self.request.query_params.get('resolved')
+        if resolved in ('true', 'false'):
+            qs = qs.filter(resolved=resolved == 'true')
+        return qs
 
     def destroy(self, request, *args, **kwargs):
         # Allow deletion only by the report owner or admin-like users
         report = self.get_object()
-        user = request.user
-        is_admin = (
-            getattr(user, "role", None) == "admin"
-            or getattr(user, "is_staff", False)
-            or getattr(user, "is_superuser", False)
-        )
-        if report.user == user or is_admin:
+        if report.user_id == request.user.pk or is_admin(request.user):
             return super().destroy(request, *args, **kwargs)
         return Response({"detail": "ต้องเป็นเจ้าของรายงานหรือแอดมินเท่านั้นที่จะลบ"}, status=403)
 
 
+# -------------------------------
+# Admin dashboard stats
+# -------------------------------
+class AdminStatsView(APIView):
+    """Totals, daily activity, open reports and top categories/tags (see forum/stats.py)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        data = dict(stats.get_stats())
+        data.pop('generated_ts', None)
+        return Response(data)
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     # Use the application-level serializer which handles email-or-username
     # resolution and returns helpful validation messages.
     serializer_class = CustomTokenObtainPairSerializer
+    # Per client IP: slows down password guessing
+    throttle_scopes = {'post': 'login'}
 
 
 # -------------------------------
@@ -344,6 +626,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 # -------------------------------
 class PasswordResetRequestView(APIView):
     permission_classes = [AllowAny]
+    # Every accepted request queues an email
+    throttle_scopes = {'post': 'password_reset'}
 
     def post(self, request):
         serializer = PasswordResetRequestSerializer(data=request.data)
@@ -354,12 +638,8 @@ class PasswordResetRequestView(APIView):
         user = None
         ident = identifier.strip() if isinstance(identifier, str) else identifier
         try:
-            if '@' in ident:
-                # lookup by email (case-insensitive). If multiple users share an email, pick the first.
-                user = User.objects.filter(email__iexact=ident).first()
-            else:
-                # lookup by username (case-insensitive)
-                user = User.objects.filter(username__iexact=ident).first()
+            # lookup by email or username (case-insensitive)
+            user = find_user(ident)
         except Exception:
             user = None
 
@@ -377,10 +657,10 @@ class PasswordResetRequestView(APIView):
             frontend_base = frontend_base[:-1]
         reset_link = f"{frontend_base}/reset-password/confirm?uid={uid}&token={token}"
 
-        # Send email (console backend will print in dev)
+        # Sent by the job worker so a slow mail server never holds up the request
         subject = 'Password reset for Mini Forum'
         message = f'Use the following link to reset your password:\n{reset_link}\nIf you did not request this, ignore.'
-        send_mail(subject, message, 'no-reply@localhost', [email], fail_silently=True)
+        tasks.send_email.delay(subject, message, 'no-reply@localhost', [email])
 
         # In DEBUG, include the reset link in the API response to ease local development/testing.
         include_link = getattr(settings, 'DEBUG', False) or getattr(settings, 'INCLUDE_RESET_LINK_IN_RESPONSE', False)
@@ -1,4 +1,4 @@
-export default function Avatar({ src, size = 40 }) {
+export default function Avatar({ src, size = 40, variants = null }) {
   const defaultAvatar = "/default-avatar.png"; // รูป default in frontend/public
 
   // Normalize src: treat 'null'/'None'/'undefined' strings as missing
@@ -23,11 +23,25 @@ export default function Avatar({ src, size = 40 }) {
       className="rounded-full overflow-hidden border"
       style={{ width: size, height: size }}
     >
-      <img
-        src={finalSrc}
-        alt="avatar"
-        className="w-full h-full object-cover"
-      />
+      {variants ? (
+        // 64/128px WebP variants from the backend image pipeline, JPEG/PNG fallback
+        <picture>
+          <source type="image/webp" srcSet={variants.srcset} sizes={`${size}px`} />
+          <img
+            src={(size <= 64 ? variants["64"] : variants["128"])?.fallback || finalSrc}
+            srcSet={variants.fallback_srcset}
+            sizes={`${size}px`}
+            alt="avatar"
+            className="w-full h-full object-cover"
+          />
+        </picture>
+      ) : (
+        <img
+          src={finalSrc}
+          alt="avatar"
+          className="w-full h-full object-cover"
+        />
+      )}
     </div>
   );
 }
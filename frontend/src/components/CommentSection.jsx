@@ -5,6 +5,8 @@ import ActionButton from "./ActionButton";
 
 export default function CommentSection({ postId, user }) {
   const [comments, setComments] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [body, setBody] = useState("");
   const [image, setImage] = useState(null);
   const [submitting, setSubmitting] = useState(false);
@@ -19,21 +21,84 @@ export default function CommentSection({ postId, user }) {
     return /^\d+$/.test(String(val));
   };
 
+  // Comments are paginated newest first (?cursor=...); merge the first page
+  // into what is already loaded so "load more" pages are kept.
+  const mergeLatest = (latest) => {
+    setComments((prev) => {
+      const known = new Set(prev.map((c) => c.id));
+      return [...latest.filter((c) => !known.has(c.id)), ...prev];
+    });
+  };
+
+  const fetchLatest = async () => {
+    const res = await API.get(`/comments/?post=${postId}`);
+    mergeLatest(res.data.results);
+  };
+
+  const loadMore = async () => {
+    if (!nextUrl) return;
+    setLoadingMore(true);
+    try {
+      const res = await API.get(nextUrl);
+      setComments((prev) => {
+        const known = new Set(prev.map((c) => c.id));
+        return [...prev, ...res.data.results.filter((c) => !known.has(c.id))];
+      });
+      setNextUrl(res.data.next);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     (async () => {
       try {
         if (!isValidId(postId)) {
           setComments([]);
+          setNextUrl(null);
           return;
         }
         const res = await API.get(`/comments/?post=${postId}`);
-        setComments(res.data);
+        setComments(res.data.results);
+        setNextUrl(res.data.next);
       } catch (err) {
         console.error(err);
       }
     })();
   }, [postId]);
 
+  // Live comment stream for this post (backend/forum/live.py)
+  useEffect(() => {
+    if (!isValidId(postId)) return undefined;
+    const source = new EventSource(`${API.defaults.baseURL}live/?post=${postId}&feed=0`);
+    let refetchTimer = null;
+    const refetchSoon = () => {
+      clearTimeout(refetchTimer);
+      refetchTimer = setTimeout(async () => {
+        try {
+          await fetchLatest();
+        } catch (err) {
+          console.error(err);
+        }
+      }, 500);
+    };
+    source.addEventListener("comment_created", refetchSoon);
+    source.addEventListener("comment_deleted", (e) => {
+      const { id } = JSON.parse(e.data);
+      setComments((prev) => prev.filter((c) => c.id !== id));
+    });
+    source.addEventListener("comment_likes", (e) => {
+      const { id, like_count } = JSON.parse(e.data);
+      setComments((prev) => prev.map((c) => (c.id === id ? { ...c, likes_count: like_count } : c)));
+    });
+    return () => {
+      clearTimeout(refetchTimer);
+      source.close();
+    };
+  }, [postId]);
+
   // If navigated with an edit comment request (?editComment=<id> or navigation state), open that comment in edit mode
   useEffect(() => {
     try {
@@ -69,8 +134,7 @@ export default function CommentSection({ postId, user }) {
       setImage(null);
       // refresh comments after submit
       try {
-        const r = await API.get(`/comments/?post=${postId}`);
-        setComments(r.data);
+        await fetchLatest();
       } catch (e) {
         console.error(e);
       }
@@ -115,7 +179,9 @@ export default function CommentSection({ postId, user }) {
 
   const toggleLike = async (c) => {
     try {
-      const res = await API.post(`/comments/${c.id}/like-toggle/`);
+      const res = c.liked_by_user
+        ? await API.delete(`/comments/${c.id}/like/`)
+        : await API.put(`/comments/${c.id}/like/`);
       // update local comment liked state and count
       const { liked, total_likes } = res.data;
       setComments(prev => prev.map(x => x.id === c.id ? { ...x, liked_by_user: liked, likes_count: total_likes } : x));
@@ -181,6 +247,12 @@ export default function CommentSection({ postId, user }) {
         </div>
       ))}
 
+      {nextUrl && (
+        <ActionButton variant="outline" size="sm" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "กำลังโหลด..." : "โหลดคอมเมนต์เพิ่มเติม"}
+        </ActionButton>
+      )}
+
       {user && (
         <div className="flex gap-2">
           <input
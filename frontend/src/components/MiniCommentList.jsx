@@ -13,9 +13,9 @@ export default function MiniCommentList({ postId, limit = 2 }) {
     const fetchComments = async () => {
       try {
         if (!postId) return setComments([]);
-        const res = await API.get(`/comments/?post=${postId}`);
+        const res = await API.get(`/comments/?post=${postId}&page_size=${limit}`);
         if (!mounted) return;
-        setComments(res.data.slice(0, limit));
+        setComments(res.data.results);
       } catch (err) {
         console.error('MiniCommentList fetch error', err);
         if (mounted) setComments([]);
@@ -41,7 +41,7 @@ export default function Navbar() {
                 <>
                   <Link to="/profile" className={linkClass}>
                     <div className="inline-flex items-center gap-2 text-white">
-                      <Avatar src={user.avatar} size={28} />
+                      <Avatar src={user.avatar} variants={user.avatar_variants} size={28} />
                       Hi, {user.username}
                     </div>
                   </Link>
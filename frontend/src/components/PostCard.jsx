@@ -8,7 +8,20 @@ export default function PostCard({ post }) {
     <h2 className="text-lg font-semibold text-primary hover:underline">{post.title}</h2>
   </Link>
   {/* Thumbnail if available (accepts string URL or object with url) */}
-  {(post.image?.url || post.image) && (
+  {post.image_variants ? (
+    // Card-sized WebP/JPEG variants instead of the full-resolution upload
+    <picture>
+      <source type="image/webp" srcSet={post.image_variants.srcset} sizes="(max-width: 640px) 100vw, 640px" />
+      <img
+        src={post.image_variants.card?.fallback}
+        srcSet={post.image_variants.fallback_srcset}
+        sizes="(max-width: 640px) 100vw, 640px"
+        alt={post.title}
+        loading="lazy"
+        className="w-full h-40 object-cover rounded mt-2 mb-2"
+      />
+    </picture>
+  ) : (post.image?.url || post.image) && (
     <img src={post.image?.url || post.image} alt={post.title} className="w-full h-40 object-cover rounded mt-2 mb-2" />
   )}
   <p className="text-secondary-dark text-sm mt-1">{post.body.slice(0,120)}...</p>
@@ -56,7 +56,7 @@ export default function Sidebar({ popularPosts = [], recentComments = [], catego
                 to={`/thread/${p.id}`}
                 className="flex items-center gap-2 text-blue-600 dark:text-blue-400 hover:underline"
               >
-                <Avatar src={p.user?.avatar} size={24} />
+                <Avatar src={p.user?.avatar} variants={p.user?.avatar_variants} size={24} />
                 <span className="truncate">{p.title}</span>
               </Link>
             </li>
@@ -72,7 +72,7 @@ export default function Sidebar({ popularPosts = [], recentComments = [], catego
         <ul className="space-y-2 text-gray-700 dark:text-gray-300 text-sm">
           {recentComments.map((c) => (
             <li key={c.id} className="flex items-center gap-2">
-              <Avatar src={c.user?.avatar} size={24} />
+              <Avatar src={c.user?.avatar} variants={c.user?.avatar_variants} size={24} />
               <span>
                 <b>{c.user?.username || "Anonymous"}:</b> {c.body.slice(0, 40)}...
               </span>
@@ -18,7 +18,7 @@ export default function AdminDashboard() {
           API.get("/categories/"),
         ]);
         setUsers(uRes.data);
-        setPosts(pRes.data);
+        setPosts(pRes.data.results ?? pRes.data);
         setCategories(cRes.data);
       } catch (err) {
         console.error(err);
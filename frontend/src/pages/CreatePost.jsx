@@ -41,13 +41,9 @@ export default function CreatePost() {
       setCategories(prev => [...prev, res.data]);
       setSelectedCategory(res.data);
     } catch (err) {
-      // if it already exists or other error, try refetch
-      if (err?.response?.status === 400) {
-        const r = await API.get("/categories/");
-        setCategories(r.data);
-        const pick = r.data.find(c => String(c.name).toLowerCase() === String(categoryInput).trim().toLowerCase());
-        if (pick) setSelectedCategory(pick);
-      } else {
+      // 400: it already exists (created since the page loaded); the post is
+      // then submitted with the category name, which the API resolves
+      if (err?.response?.status !== 400) {
         console.error(err);
         alert('ไม่สามารถสร้างหมวดหมู่ได้');
       }
@@ -99,37 +95,23 @@ export default function CreatePost() {
     }
 
     try {
-      let categoryId = selectedCategory?.id;
-      if (!categoryId) {
+      // Category id, or its name when it exists but is not in the list loaded with the page
+      let category = selectedCategory?.id;
+      if (!category) {
+        const name = String(categoryInput).trim();
         // First try to find a category with the same name (case-insensitive)
-        const found = categories.find(c => String(c.name).toLowerCase() === String(categoryInput).trim().toLowerCase());
+        const found = categories.find(c => String(c.name).toLowerCase() === name.toLowerCase());
         if (found) {
-          categoryId = found.id;
+          category = found.id;
         } else {
-          // Try creating it; handle 400 (race / already exists) by refetching categories
           try {
-            const res = await API.post("/categories/", { name: categoryInput });
-            categoryId = res.data.id;
+            const res = await API.post("/categories/", { name });
+            category = res.data.id;
             setCategories(prev => [...prev, res.data]);
           } catch (err) {
-            // If creation failed because it already exists (race), reload categories and pick the matching one
-            if (err?.response?.status === 400) {
-              try {
-                const r = await API.get("/categories/");
-                setCategories(r.data);
-                const pick = r.data.find(c => String(c.name).toLowerCase() === String(categoryInput).trim().toLowerCase());
-                if (pick) {
-                  categoryId = pick.id;
-                } else {
-                  // Re-throw to be handled by outer catch
-                  throw err;
-                }
-              } catch {
-                throw err;
-              }
-            } else {
-              throw err;
-            }
+            // 400: created elsewhere in the meantime; the API accepts the name
+            if (err?.response?.status !== 400) throw err;
+            category = name;
           }
         }
       }
@@ -138,7 +120,7 @@ export default function CreatePost() {
       data.append("user", user.id);
       data.append("title", title);
       data.append("body", body);
-      data.append("category", categoryId);
+      data.append("category", category);
       data.append("tags", JSON.stringify(tags.map(t => ({ name: t.name }))));
       if (imageFile) data.append("image", imageFile);
 
@@ -13,6 +13,9 @@ export default function ForumList() {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [currentPage, setCurrentPage] = useState(1);
+  // posts/ is paginated ({ next, results }): older posts are fetched on demand
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const postsPerPage = 4;
   const navigate = useNavigate();
   const [searchParams, setSearchParams] = useSearchParams();
@@ -50,7 +53,8 @@ export default function ForumList() {
         if (qParam) params.q = qParam;
 
         const res = await API.get('/posts/', { params });
-        setPosts(res.data);
+        setPosts(res.data.results ?? res.data);
+        setNextUrl(res.data.next ?? null);
       } catch (err) {
         console.error('Error fetching posts:', err);
       } finally {
@@ -61,6 +65,23 @@ export default function ForumList() {
     fetchPosts();
   }, [searchParams]);
 
+  const loadMore = async () => {
+    if (!nextUrl) return;
+    setLoadingMore(true);
+    try {
+      const res = await API.get(nextUrl);
+      setPosts((prev) => {
+        const known = new Set(prev.map((p) => p.id));
+        return [...prev, ...res.data.results.filter((p) => !known.has(p.id))];
+      });
+      setNextUrl(res.data.next);
+    } catch (err) {
+      console.error('Error fetching more posts:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Keep local query state in sync with URL
   useEffect(() => {
     setQuery(activeQuery);
@@ -290,6 +311,14 @@ export default function ForumList() {
 
           <ActionButton variant="outline" size="sm" onClick={() => setCurrentPage(p => Math.min(Math.ceil(posts.length / postsPerPage), p + 1))} disabled={currentPage === Math.ceil(posts.length / postsPerPage) || posts.length === 0}>ถัดไป</ActionButton>
         </div>
+
+        {nextUrl && (
+          <div className="flex justify-center mt-4">
+            <ActionButton variant="outline" size="sm" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'กำลังโหลด...' : 'โหลดกระทู้เก่ากว่านี้'}
+            </ActionButton>
+          </div>
+        )}
         </>
       ) : (
         <p className="text-gray-700 dark:text-gray-300">ยังไม่มีกระทู้</p>
@@ -13,6 +13,8 @@ export default function Home() {
   // ----- Posts & Tags -----
   const [posts, setPosts] = useState([]);
   const [postsCount, setPostsCount] = useState(0);
+  // Only the newest page is loaded here; the full list lives in /forum
+  const [hasMorePosts, setHasMorePosts] = useState(false);
   const [popularPosts, setPopularPosts] = useState([]);
   const [popularTags, setPopularTags] = useState([]);
   const [currentPage] = useState(1); // pagination
@@ -36,8 +38,11 @@ export default function Home() {
   const fetchData = async () => {
     try {
       const postsRes = await API.get("posts/").catch(err => (err.response?.status === 401 ? { data: [] } : Promise.reject(err)));
-      setPosts(postsRes.data);
-      setPostsCount(postsRes.data.length);
+      // posts/ is cursor-paginated: { next, previous, results }
+      const feed = postsRes.data.results ?? postsRes.data;
+      setPosts(feed);
+      setPostsCount(feed.length);
+      setHasMorePosts(Boolean(postsRes.data.next));
 
       const popularPostsRes = await API.get("posts/popular/").catch(() => ({ data: [] }));
       setPopularPosts(popularPostsRes.data);
@@ -49,25 +54,51 @@ export default function Home() {
     }
   };
 
+  // ---------- Live updates ----------
+  // Server-sent events from backend/forum/live.py replace the old 60s polling:
+  // counters are patched in place, new/deleted posts trigger one debounced refetch.
+  const subscribeLive = () => {
+    const source = new EventSource(`${API.defaults.baseURL}live/`);
+    let refetchTimer = null;
+    let connected = false;
+    const refetchSoon = () => {
+      clearTimeout(refetchTimer);
+      refetchTimer = setTimeout(fetchData, 1000);
+    };
+    // Events are not replayed, so catch up after a reconnect
+    source.onopen = () => {
+      if (connected) refetchSoon();
+      connected = true;
+    };
+    source.addEventListener("post_created", refetchSoon);
+    source.addEventListener("post_deleted", refetchSoon);
+    source.addEventListener("post_counts", (e) => {
+      const { id, ...counts } = JSON.parse(e.data);
+      const patch = (list) => list.map((p) => (p.id === id ? { ...p, ...counts } : p));
+      setPosts(patch);
+      setPopularPosts(patch);
+    });
+    return source;
+  };
+
   // Prevent double-fetch in React StrictMode (dev) where effects mount/unmount/remount.
-  // Use a module-scoped flag so the fetch and interval are only set up once per full page load.
+  // Use a module-scoped flag so the fetch and live stream are only set up once per full page load.
   // This avoids duplicate identical network requests showing up in the server logs.
   if (typeof window !== 'undefined' && !window.__mini_forum_home_initialized) {
     window.__mini_forum_home_initialized = true;
-    // run initial fetch and start interval
+    // run initial fetch and open the live stream
     fetchData();
-    const intervalId = setInterval(fetchData, 60000);
-    // store interval id so it can be cleared if the user performs a hard navigation/reload
-    window.__mini_forum_home_interval = intervalId;
+    // store the stream so it can be closed if the user performs a hard navigation/reload
+    window.__mini_forum_home_events = subscribeLive();
   }
 
   useEffect(() => {
-    // If the page is unloaded (hard navigation), clear any interval we set on the window
+    // If the page is unloaded (hard navigation), close the live stream we opened on the window
     return () => {
       try {
-        if (window.__mini_forum_home_interval) {
-          clearInterval(window.__mini_forum_home_interval);
-          window.__mini_forum_home_interval = null;
+        if (window.__mini_forum_home_events) {
+          window.__mini_forum_home_events.close();
+          window.__mini_forum_home_events = null;
           window.__mini_forum_home_initialized = false;
         }
       } catch {
@@ -181,7 +212,13 @@ export default function Home() {
         {/* Main posts */}
         <div className="col-span-2 space-y-4">
           <h2 className="text-2xl font-bold text-gray-800 dark:text-gray-100">กระทู้ล่าสุด</h2>
-          <p className="text-sm text-gray-500 dark:text-gray-400 mb-2">มีกระทู้ทั้งหมด <b>{postsCount}</b> กระทู้</p>
+          <p className="text-sm text-gray-500 dark:text-gray-400 mb-2">
+            {hasMorePosts ? (
+              <>แสดง <b>{postsCount}</b> กระทู้ล่าสุด · <Link to="/forum" className="text-blue-600 dark:text-blue-400 hover:underline">ดูกระทู้ทั้งหมด</Link></>
+            ) : (
+              <>มีกระทู้ทั้งหมด <b>{postsCount}</b> กระทู้</>
+            )}
+          </p>
 
           {currentPosts.length ? (
             <ul className="space-y-4">
@@ -243,7 +280,7 @@ export default function Home() {
                             <p className="text-gray-700 dark:text-gray-300 mt-2">{post.body ? (post.body.slice(0,120) + (post.body.length > 120 ? '...' : '')) : ''}</p>
                           <div className="flex items-center mt-3 text-gray-500 dark:text-gray-400 text-sm justify-between">
                             <div className="flex items-center gap-2">
-                              <Avatar src={post.user?.avatar} size={32} />
+                              <Avatar src={post.user?.avatar} variants={post.user?.avatar_variants} size={32} />
                               <span>โพสต์โดย {post.user?.username || "Anonymous"}</span>
                             </div>
                             <ReportButton targetId={post.id} targetType="post" ownerId={post.user?.id} currentUserId={user?.id} />
@@ -20,7 +20,7 @@ export default function Profile() {
   const [editing, setEditing] = useState(false);
   const [message, setMessage] = useState("");
   const [submitting, setSubmitting] = useState(false);
-  const [stats, setStats] = useState({ posts: 0, comments: 0 });
+  const [stats, setStats] = useState({ posts: 0, comments: 0, likes: 0 });
   const [userPosts, setUserPosts] = useState([]);
   const [fade, setFade] = useState(true);
 
@@ -43,14 +43,11 @@ export default function Profile() {
           },
         });
 
-  // Always request posts for the authenticated user only
-  const postsRes = await API.get("/posts/", { params: { user: res.data.id } });
-  const commentsRes = await API.get("/comments/", { params: { user: res.data.id } });
-  // Safety: also filter client-side so even if API returned extra items, we only show the user's posts
-  const postsForUser = Array.isArray(postsRes.data) ? postsRes.data.filter(p => p.user && p.user.id === res.data.id) : [];
-  const commentsForUser = Array.isArray(commentsRes.data) ? commentsRes.data : [];
-  setStats({ posts: postsForUser.length, comments: commentsForUser.length });
-  setUserPosts(postsForUser.slice(0, 5));
+        // Totals are denormalized server-side; only the 5 latest posts are transferred
+        const activityRes = await API.get(`/users/${res.data.id}/activity/`, { params: { page_size: 5 } });
+        const { totals, posts } = activityRes.data;
+        setStats({ posts: totals.posts, comments: totals.comments, likes: totals.likes_received });
+        setUserPosts(posts.results);
       } catch (err) {
         console.error(err);
       }
@@ -157,6 +154,10 @@ export default function Profile() {
                 <p className="text-2xl font-bold">{stats.comments}</p>
                 <p className="text-sm">ความคิดเห็น</p>
               </div>
+              <div className="p-6 bg-pink-100 dark:bg-pink-900 rounded-lg shadow">
+                <p className="text-2xl font-bold">{stats.likes}</p>
+                <p className="text-sm">ไลก์ที่ได้รับ</p>
+              </div>
             </div>
 
             {/* Recent Posts */}
@@ -168,7 +169,7 @@ export default function Profile() {
                     <Link to={`/thread/${p.id}`} key={p.id}>
                       <li className="p-4 border rounded-lg bg-gray-50 dark:bg-gray-700 shadow-sm hover:shadow-md transition cursor-pointer">
                         <p className="font-semibold text-blue-600">{p.title}</p>
-                        <p className="text-gray-700 dark:text-gray-300 text-sm mt-1">{p.body.slice(0, 100)}...</p>
+                        <p className="text-gray-700 dark:text-gray-300 text-sm mt-1">{(p.body || "").slice(0, 100)}...</p>
                       </li>
                     </Link>
                   ))}
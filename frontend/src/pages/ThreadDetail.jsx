@@ -92,7 +92,10 @@ export default function ThreadDetail() {
     setLiking(true);
     try {
       if (!isValidId(id)) throw new Error('post id missing');
-      const res = await API.post(`/posts/${id}/like-toggle/`);
+      // PUT likes / DELETE unlikes; both are idempotent so double clicks are harmless
+      const res = thread.liked_by_user
+        ? await API.delete(`/posts/${id}/like/`)
+        : await API.put(`/posts/${id}/like/`);
       setThread({ ...thread, liked_by_user: res.data.liked, total_likes: res.data.total_likes });
     } catch (err) {
       console.error(err);
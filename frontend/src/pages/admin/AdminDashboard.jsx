@@ -5,22 +5,15 @@ import AdminSidebar from "../../components/admin/AdminSidebar";
 import { Link } from "react-router-dom";
 
 export default function AdminDashboard() {
-  const [users, setUsers] = useState([]);
-  const [posts, setPosts] = useState([]);
-  const [categories, setCategories] = useState([]);
+  // Aggregates computed server-side (/admin/stats/) instead of downloading every user and post
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [uRes, pRes, cRes] = await Promise.all([
-          API.get("/users/"),
-          API.get("/posts/"),
-          API.get("/categories/"),
-        ]);
-        setUsers(uRes.data);
-        setPosts(pRes.data);
-        setCategories(cRes.data);
+        const res = await API.get("/admin/stats/");
+        setStats(res.data);
       } catch (err) {
         console.error(err);
       } finally {
@@ -31,6 +24,17 @@ export default function AdminDashboard() {
   }, []);
 
   if (loading) return <p className="p-8 text-gray-700 dark:text-gray-300">Loading...</p>;
+  if (!stats) return <p className="p-8 text-gray-700 dark:text-gray-300">Could not load stats.</p>;
+
+  const cards = [
+    { label: "Users", value: stats.totals.users },
+    { label: "Posts", value: stats.totals.posts },
+    { label: "Comments", value: stats.totals.comments },
+    { label: "Categories", value: stats.totals.categories },
+    { label: "Tags", value: stats.totals.tags },
+    { label: "Open reports", value: stats.open_reports },
+  ];
+  const lastWeek = (series) => series.slice(-7).reduce((sum, d) => sum + d.count, 0);
 
   return (
     <div className="flex min-h-screen bg-gray-100 dark:bg-gray-900">
@@ -41,18 +45,46 @@ export default function AdminDashboard() {
         <h1 className="text-3xl font-bold text-gray-800 dark:text-gray-100 mb-6">Dashboard</h1>
 
         {/* Stats Cards */}
+        <div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8">
+          {cards.map((card) => (
+            <div key={card.label} className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow">
+              <h3 className="text-sm font-medium text-gray-500 dark:text-gray-400">{card.label}</h3>
+              <p className="mt-2 text-2xl font-bold text-gray-800 dark:text-gray-100">{card.value}</p>
+            </div>
+          ))}
+        </div>
+
+        {/* Activity */}
         <div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8">
           <div className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow">
-            <h3 className="text-sm font-medium text-gray-500 dark:text-gray-400">Users</h3>
-            <p className="mt-2 text-2xl font-bold text-gray-800 dark:text-gray-100">{users.length}</p>
+            <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100 mb-4">Last 7 days</h2>
+            <ul className="space-y-2 text-gray-700 dark:text-gray-300">
+              <li>New posts: <span className="font-semibold">{lastWeek(stats.daily.posts)}</span></li>
+              <li>New comments: <span className="font-semibold">{lastWeek(stats.daily.comments)}</span></li>
+              <li>New users: <span className="font-semibold">{lastWeek(stats.daily.users)}</span></li>
+            </ul>
           </div>
           <div className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow">
-            <h3 className="text-sm font-medium text-gray-500 dark:text-gray-400">Posts</h3>
-            <p className="mt-2 text-2xl font-bold text-gray-800 dark:text-gray-100">{posts.length}</p>
+            <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100 mb-4">Top Categories</h2>
+            <ul className="divide-y divide-gray-200 dark:divide-gray-700">
+              {stats.top_categories.map((c) => (
+                <li key={c.id} className="py-2 flex justify-between text-gray-700 dark:text-gray-300">
+                  <span>{c.name}</span>
+                  <span className="text-sm text-gray-500 dark:text-gray-400">{c.num_posts} posts</span>
+                </li>
+              ))}
+            </ul>
           </div>
           <div className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow">
-            <h3 className="text-sm font-medium text-gray-500 dark:text-gray-400">Categories</h3>
-            <p className="mt-2 text-2xl font-bold text-gray-800 dark:text-gray-100">{categories.length}</p>
+            <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100 mb-4">Top Tags</h2>
+            <ul className="divide-y divide-gray-200 dark:divide-gray-700">
+              {stats.top_tags.map((t) => (
+                <li key={t.id} className="py-2 flex justify-between text-gray-700 dark:text-gray-300">
+                  <span>#{t.name}</span>
+                  <span className="text-sm text-gray-500 dark:text-gray-400">{t.num_posts} posts</span>
+                </li>
+              ))}
+            </ul>
           </div>
         </div>
 
@@ -60,7 +92,7 @@ export default function AdminDashboard() {
         <div className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow mb-8">
           <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100 mb-4">Recent Posts</h2>
           <ul className="divide-y divide-gray-200 dark:divide-gray-700">
-            {posts.slice(0, 5).map((post) => (
+            {stats.recent_posts.map((post) => (
               <li key={post.id} className="py-3 flex items-center justify-between">
                 <div>
                   <Link to={`/thread/${post.id}`} className="font-medium text-blue-600 dark:text-blue-400 hover:underline">
@@ -71,7 +103,7 @@ export default function AdminDashboard() {
                   </p>
                 </div>
                 <span className="bg-gray-100 dark:bg-gray-700 text-gray-800 dark:text-gray-200 text-xs font-semibold px-2 py-1 rounded-full">
-                  {post.category?.name || "No Category"}
+                  {post.category || "No Category"}
                 </span>
               </li>
             ))}
@@ -82,9 +114,9 @@ export default function AdminDashboard() {
         <div className="bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-2xl p-6 shadow">
           <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100 mb-4">Recent Users</h2>
           <ul className="divide-y divide-gray-200 dark:divide-gray-700">
-            {users.slice(-5).reverse().map((u) => (
+            {stats.recent_users.map((u) => (
               <li key={u.id} className="py-3 flex items-center gap-3">
-                <Avatar src={u.avatar} size={32} />
+                <Avatar src={u.avatar} variants={u.avatar_variants} size={32} />
                 <span className="text-gray-700 dark:text-gray-300">{u.username}</span>
               </li>
             ))}
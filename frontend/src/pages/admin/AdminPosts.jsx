@@ -6,13 +6,17 @@ import { Link } from "react-router-dom";
 export default function AdminPosts() {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
+  // posts/ is cursor-paginated: older posts are loaded with "load more"
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // ดึงโพสต์ทั้งหมด
   useEffect(() => {
     const fetchPosts = async () => {
       try {
         const res = await API.get("/posts/");
-        setPosts(res.data);
+        setPosts(res.data.results ?? res.data);
+        setNextUrl(res.data.next ?? null);
       } catch (err) {
         console.error(err);
         alert("ไม่สามารถโหลดโพสต์ได้");
@@ -23,12 +27,31 @@ export default function AdminPosts() {
     fetchPosts();
   }, []);
 
+  // โหลดโพสต์หน้าถัดไป
+  const loadMore = async () => {
+    if (!nextUrl) return;
+    setLoadingMore(true);
+    try {
+      const res = await API.get(nextUrl);
+      setPosts((prev) => {
+        const known = new Set(prev.map((p) => p.id));
+        return [...prev, ...res.data.results.filter((p) => !known.has(p.id))];
+      });
+      setNextUrl(res.data.next);
+    } catch (err) {
+      console.error(err);
+      alert("ไม่สามารถโหลดโพสต์ได้");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // ลบโพสต์
   const handleDelete = async (postId) => {
     if (!window.confirm("คุณแน่ใจว่าจะลบโพสต์นี้?")) return;
     try {
       await API.delete(`/posts/${postId}/`);
-      setPosts(posts.filter((p) => p.id !== postId));
+      setPosts((prev) => prev.filter((p) => p.id !== postId));
       alert("ลบโพสต์สำเร็จ");
     } catch (err) {
       console.error(err);
@@ -70,6 +93,15 @@ export default function AdminPosts() {
             </li>
           ))}
         </ul>
+        {nextUrl && (
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="mt-4 px-4 py-2 rounded border border-gray-300 dark:border-gray-600 text-gray-700 dark:text-gray-200 hover:bg-gray-200 dark:hover:bg-gray-800 disabled:opacity-50"
+          >
+            {loadingMore ? "Loading..." : "Load older posts"}
+          </button>
+        )}
       </main>
     </div>
   );